@@ -0,0 +1,113 @@
+"""
+Websocket delivery latency vs number of connections and api worker processes.
+
+Workers are the real api app (SO_REUSEPORT) fed by a local publisher instead of redis.
+
+python -m byn.commands.benchmark_api_workers [workers,...] [connections,...]
+"""
+import asyncio
+import multiprocessing
+import sys
+import time
+
+import numpy as np
+import simplejson
+from aiohttp import ClientSession, TCPConnector, web
+
+from byn.realtime.api import create_app
+
+
+PORT = 5099
+CLIENT_PROCESSES = 4
+PUBLISH_INTERVAL = 0.1  # seconds
+MESSAGES = 30
+
+
+async def _publisher(app):
+    for seq in range(1, MESSAGES + 1):
+        await asyncio.sleep(PUBLISH_INTERVAL)
+        app['websockets'].publish(simplejson.dumps({
+            'type': 'prediction',
+            'seq': seq,
+            'sent': time.time(),
+            'external': {'eur': '1.1234', 'rub': '64.5123', 'uah': '26.4512', 'dxy': '97.0512'},
+        }))
+
+
+async def _start_publisher(app):
+    # Let clients connect first.
+    async def _delayed():
+        await asyncio.sleep(app['start_delay'])
+        await _publisher(app)
+
+    asyncio.create_task(_delayed())
+
+
+def _run_worker(start_delay: float):
+    app = create_app()
+    app['start_delay'] = start_delay
+    app.on_startup.append(_start_publisher)
+    web.run_app(app, port=PORT, reuse_port=True, print=None, handle_signals=False)
+
+
+async def _client(session: ClientSession, latencies: list):
+    async with session.ws_connect(f'http://127.0.0.1:{PORT}/predict.ws') as ws:
+        async for msg in ws:
+            data = simplejson.loads(msg.data)
+            latencies.append(time.time() - data['sent'])
+            if data['seq'] == MESSAGES:
+                break
+
+
+def _run_clients(connections: int, queue: multiprocessing.Queue):
+    async def _implementation():
+        latencies = []
+        async with ClientSession(connector=TCPConnector(limit=0)) as session:
+            await asyncio.wait_for(
+                asyncio.gather(*(_client(session, latencies) for _ in range(connections)), return_exceptions=True),
+                timeout=MESSAGES * PUBLISH_INTERVAL + 60
+            )
+        return latencies
+
+    queue.put(asyncio.run(_implementation()))
+
+
+def run(workers: int, connections: int):
+    start_delay = 3 + connections / 100
+    servers = [
+        multiprocessing.Process(target=_run_worker, args=(start_delay, ), daemon=True)
+        for _ in range(workers)
+    ]
+    for process in servers:
+        process.start()
+    time.sleep(1)
+
+    queue = multiprocessing.Queue()
+    clients = [
+        multiprocessing.Process(target=_run_clients, args=(connections // CLIENT_PROCESSES, queue))
+        for _ in range(CLIENT_PROCESSES)
+    ]
+    for process in clients:
+        process.start()
+
+    latencies = []
+    for _ in clients:
+        latencies.extend(queue.get())
+
+    for process in clients:
+        process.join()
+    for process in servers:
+        process.terminate()
+
+    latencies = np.array(latencies) * 1000
+    print(
+        f'{workers} worker(s), {connections} connections: '
+        f'{len(latencies)}/{connections // CLIENT_PROCESSES * CLIENT_PROCESSES * MESSAGES} messages, '
+        f'latency p50 {np.percentile(latencies, 50):.1f} ms, p99 {np.percentile(latencies, 99):.1f} ms'
+    )
+
+
+if __name__ == '__main__':
+    for workers in map(int, (sys.argv[1] if len(sys.argv) > 1 else '1,2,4').split(',')):
+        for connections in map(int, (sys.argv[2] if len(sys.argv) > 2 else '100,1000,4000').split(',')):
+            run(workers, connections)
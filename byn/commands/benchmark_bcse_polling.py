@@ -0,0 +1,142 @@
+"""
+bcse polling: fixed interval with full parsing vs adaptive conditional polling (BcsePoller).
+
+A session (9:55 - 13:15) with Poisson trades, denser around the open, is simulated in virtual time.
+The server body lists all trades of the day, its ETag changes with every trade.
+
+python -m byn.commands.benchmark_bcse_polling [sessions] [trades_per_hour_at_open] [trades_per_hour_later]
+"""
+import datetime
+import random
+import sys
+import time
+
+import simplejson
+
+import byn.constants as const
+from byn.realtime.bcse_polling import BcsePoller
+
+
+OPEN_DT = datetime.datetime(2019, 5, 6, 9, 55)
+FINISH_DT = datetime.datetime(2019, 5, 6, 13, 15)
+
+
+def _generate_trades(trades_per_hour_at_open: float, trades_per_hour_later: float) -> list:
+    start = OPEN_DT.timestamp()
+    finish = FINISH_DT.timestamp()
+    busy_till = (OPEN_DT + const.BCSE_OPEN_PERIOD).timestamp()
+
+    trades = []
+    rate = 2.1
+    timestamp = start
+    while True:
+        per_hour = trades_per_hour_at_open if timestamp < busy_till else trades_per_hour_later
+        timestamp += random.expovariate(per_hour / 3600)
+        if timestamp >= finish:
+            return trades
+
+        rate = round(rate + random.choice((-1, 1)) * 0.0001, 4)
+        trades.append((int(timestamp), rate))
+
+
+class FakeServer:
+    def __init__(self, trades: list, etag: bool):
+        self.trades = trades
+        self.etag = etag
+        self._bodies = {}
+
+    def get(self, current_timestamp: float, headers: dict):
+        count = sum(1 for x in self.trades if x[0] <= current_timestamp)
+        etag = f'"{count}"'
+
+        if self.etag and headers.get('If-None-Match') == etag:
+            return 304, {}, b''
+
+        if count not in self._bodies:
+            self._bodies[count] = simplejson.dumps([{
+                'color': const.BCSE_LAST_OPERATION_COLOR,
+                'data': [[timestamp * 1000, rate] for timestamp, rate in self.trades[:count]],
+            }]).encode()
+
+        return 200, ({'ETag': etag} if self.etag else {}), self._bodies[count]
+
+
+def _parse(body: bytes) -> list:
+    return simplejson.loads(body.decode(), parse_float=str)[0]['data']
+
+
+def _poll(server: FakeServer, adaptive: bool) -> dict:
+    current_timestamp = OPEN_DT.timestamp()
+    finish = FINISH_DT.timestamp()
+    poller = BcsePoller(open_datetime=OPEN_DT, start_timestamp=current_timestamp)
+    known = set()
+    latencies = []
+    polls = 0
+    parsed_bytes = 0
+    parse_seconds = 0
+
+    while current_timestamp < finish:
+        polls += 1
+        headers = poller.get_request_headers() if adaptive else {}
+        status, response_headers, body = server.get(current_timestamp, headers)
+
+        new_trades = []
+        if not adaptive or poller.is_changed(status, response_headers, body):
+            started = time.perf_counter()
+            data = _parse(body)
+            parse_seconds += time.perf_counter() - started
+            parsed_bytes += len(body)
+
+            new_trades = [timestamp // 1000 for timestamp, _ in data if timestamp // 1000 not in known]
+            known.update(new_trades)
+            latencies.extend(current_timestamp - x for x in new_trades)
+
+        if adaptive:
+            interval = poller.get_next_interval(
+                datetime.datetime.fromtimestamp(current_timestamp),
+                has_new_trades=bool(new_trades)
+            )
+        else:
+            interval = const.BCSE_UPDATE_INTERVAL
+
+        current_timestamp += interval
+
+    return {
+        'polls': polls,
+        'latencies': latencies,
+        'parsed_bytes': parsed_bytes,
+        'parse_seconds': parse_seconds,
+    }
+
+
+def _report(name: str, results: list):
+    hours = (FINISH_DT - OPEN_DT).total_seconds() / 3600
+    latencies = sorted(x for result in results for x in result['latencies'])
+    polls = sum(x['polls'] for x in results) / len(results)
+    parsed_bytes = sum(x['parsed_bytes'] for x in results) / len(results)
+    parse_seconds = sum(x['parse_seconds'] for x in results) / len(results)
+
+    print(
+        f'{name}: {polls:.0f} polls/session, '
+        f'detection latency mean {sum(latencies) / len(latencies):.1f}s '
+        f'p95 {latencies[len(latencies) * 95 // 100]:.1f}s, '
+        f'parsed {parsed_bytes / hours / 1024:.0f} KiB/h ({parse_seconds * 1000 / hours:.1f} ms/h)'
+    )
+
+
+def run(sessions: int, trades_per_hour_at_open: float, trades_per_hour_later: float):
+    random.seed(1)
+    days = [_generate_trades(trades_per_hour_at_open, trades_per_hour_later) for _ in range(sessions)]
+    print(f'{sessions} sessions, {sum(len(x) for x in days) / sessions:.0f} trades/session')
+
+    _report(f'fixed {const.BCSE_UPDATE_INTERVAL}s', [_poll(FakeServer(x, etag=False), adaptive=False) for x in days])
+    _report('adaptive, no ETag', [_poll(FakeServer(x, etag=False), adaptive=True) for x in days])
+    _report('adaptive, ETag', [_poll(FakeServer(x, etag=True), adaptive=True) for x in days])
+
+
+if __name__ == '__main__':
+    run(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 20,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 120,
+        float(sys.argv[3]) if len(sys.argv) > 3 else 20,
+    )
@@ -0,0 +1,65 @@
+"""
+Day-scale interpolation of external rates: per-point scipy interp1d vs batch np.interp.
+
+python -m byn.commands.benchmark_detailed_rates [points_per_currency] [timestamps]
+"""
+import sys
+import time
+
+import numpy as np
+from scipy.interpolate import interp1d
+
+from byn.realtime.detailed_rates import RatesDetailedExtractor, CURRENCIES
+
+
+def _build_day(points: int) -> dict:
+    start = 1557000000
+    timestamps = np.sort(start + np.random.uniform(0, 24 * 60 * 60, points))
+
+    return {
+        currency: np.column_stack((timestamps, 1 + np.random.random(points).cumsum() / points))
+        for currency in CURRENCIES
+    }
+
+
+def _per_point(currency_to_pairs: dict, timestamps) -> list:
+    models = {
+        currency: interp1d(pairs[:, 0], pairs[:, 1])
+        for currency, pairs in currency_to_pairs.items()
+    }
+
+    return [
+        [
+            models[currency](x).item() if x <= currency_to_pairs[currency][-1, 0]
+            else currency_to_pairs[currency][-1, 1]
+            for currency in CURRENCIES
+        ]
+        for x in timestamps
+    ]
+
+
+def run(points: int, number_of_timestamps: int):
+    currency_to_pairs = _build_day(points)
+    first, last = currency_to_pairs['EUR'][0, 0], currency_to_pairs['EUR'][-1, 0]
+    timestamps = np.random.uniform(first, last + 60, number_of_timestamps).round()
+
+    start = time.perf_counter()
+    expected = _per_point(currency_to_pairs, timestamps)
+    per_point_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = RatesDetailedExtractor(currency_to_pairs).get_array_by_timestamps(timestamps)
+    batch_seconds = time.perf_counter() - start
+
+    np.testing.assert_allclose(actual, expected)
+
+    print(f'{points} points per currency, {number_of_timestamps} timestamps')
+    print(f'per point (interp1d): {per_point_seconds * 1000:.2f} ms')
+    print(f'batch (np.interp): {batch_seconds * 1000:.2f} ms')
+
+
+if __name__ == '__main__':
+    run(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 40000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 2000,
+    )
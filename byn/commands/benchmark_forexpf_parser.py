@@ -0,0 +1,173 @@
+"""
+forexpf long poll stream parsing: per-line sse_to_tuple vs incremental SseTickParser
+vs the same parser which scans a memoryview for newlines and copies only the incomplete tail.
+
+The stream is replayed at *speedup* times the live rate,
+reads are as large as the network would deliver in READ_INTERVAL.
+
+python -m byn.commands.benchmark_forexpf_parser [speedup] [seconds_of_stream] [recorded_stream_file]
+"""
+import datetime
+import random
+import re
+import sys
+import time
+
+from byn.datatypes import ExternalRateData
+from byn.forexpf import CODE_TO_CURRENCY, CURRENCY_CODES, SSE_DATA_PREFIX, SseTickParser, sse_to_tuple
+
+
+# Roughly what forexpf sends for 4 subscribed currencies.
+LIVE_TICKS_PER_SECOND = 8
+READ_INTERVAL = 0.01
+
+_NEWLINE = re.compile(b'\n')
+
+
+def _record_stream(seconds: int) -> bytes:
+    start = 1557000000
+    rates = {'EUR': 1.12, 'RUB': 64.5, 'UAH': 26.4, 'DXY': 97.1}
+    lines = []
+
+    for i in range(seconds * LIVE_TICKS_PER_SECOND):
+        currency = random.choice(tuple(rates))
+        rates[currency] *= 1 + random.gauss(0, 0.0001)
+        rate = round(rates[currency], 4)
+        timestamp = start + i // LIVE_TICKS_PER_SECOND
+        lines.append(
+            f'data: 1;{CURRENCY_CODES[currency]};1;{timestamp - timestamp % 60};'
+            f'{rate};{rate};{rate};{rate};{random.randint(1, 50)}\n\n'
+        )
+
+        if i % (5 * LIVE_TICKS_PER_SECOND) == 0:
+            lines.append('data: 0\n\n')
+
+    return ''.join(lines).encode()
+
+
+def _split_into_reads(stream: bytes, speedup: int) -> list:
+    ticks_per_read = max(1, int(LIVE_TICKS_PER_SECOND * speedup * READ_INTERVAL))
+    average_line = len(stream) // max(1, stream.count(b'\n\n'))
+    read_size = ticks_per_read * average_line
+
+    return [stream[i:i + read_size] for i in range(0, len(stream), read_size)]
+
+
+def _per_line(reads: list) -> list:
+    ticks = []
+    tail = b''
+
+    for chunk in reads:
+        lines = (tail + chunk).split(b'\n')
+        tail = lines.pop()
+
+        for line in lines:
+            data = sse_to_tuple(line)
+            if data is None:
+                continue
+
+            _, product_id, resolution, timestamp_open, rate_open, high, low, close, volume = data
+            ticks.append(ExternalRateData(
+                currency=CODE_TO_CURRENCY[int(product_id)],
+                timestamp_open=int(timestamp_open),
+                rate_open=rate_open,
+                close=close,
+                low=low,
+                high=high,
+                volume=int(volume),
+                timestamp_received=datetime.datetime.now().timestamp(),
+            ))
+
+    return ticks
+
+
+def _incremental(reads: list) -> list:
+    parser = SseTickParser()
+    ticks = []
+
+    for chunk in reads:
+        ticks.extend(parser.feed(memoryview(chunk), time.monotonic()))
+
+    return ticks
+
+
+def _memoryview_scan(reads: list) -> list:
+    ticks = []
+    tail = b''
+
+    for chunk in reads:
+        view = memoryview(chunk)
+        timestamp_received = time.monotonic()
+        start = 0
+
+        for newline in _NEWLINE.finditer(view):
+            end = newline.start()
+            line = tail + view[start:end] if tail else bytes(view[start:end])
+            tail = b''
+            start = end + 1
+
+            fields = line.split(b';')
+            if len(fields) != 9 or not line.startswith(SSE_DATA_PREFIX):
+                continue
+
+            ticks.append(ExternalRateData(
+                CODE_TO_CURRENCY[int(fields[1])],
+                int(fields[3]),
+                float(fields[4]),
+                float(fields[7]),
+                float(fields[6]),
+                float(fields[5]),
+                int(fields[8]),
+                timestamp_received,
+            ))
+
+        tail += view[start:]
+
+    return ticks
+
+
+def run(speedup: int, seconds: int, path: str=None):
+    if path is None:
+        stream = _record_stream(seconds)
+    else:
+        with open(path, 'rb') as f:
+            stream = f.read()
+
+    reads = _split_into_reads(stream, speedup)
+
+    start = time.perf_counter()
+    expected = _per_line(reads)
+    per_line_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = _incremental(reads)
+    incremental_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scanned = _memoryview_scan(reads)
+    memoryview_seconds = time.perf_counter() - start
+
+    assert [(x.currency, x.timestamp_open, float(x.close), x.volume) for x in expected] == \
+           [(x.currency, x.timestamp_open, x.close, x.volume) for x in actual] == \
+           [(x.currency, x.timestamp_open, x.close, x.volume) for x in scanned]
+
+    stream_seconds = len(actual) / LIVE_TICKS_PER_SECOND / speedup
+    print(f'{len(actual)} ticks in {len(reads)} reads, {stream_seconds:.1f}s of stream at {speedup}x')
+
+    for name, seconds_spent in (
+            ('per line', per_line_seconds),
+            ('incremental', incremental_seconds),
+            ('memoryview scan', memoryview_seconds),
+    ):
+        print(
+            f'{name}: {seconds_spent * 1e6 / len(actual):.2f} us/tick, '
+            f'{100 * seconds_spent / stream_seconds:.1f}% of a core'
+        )
+
+
+if __name__ == '__main__':
+    run(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 100,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 3600,
+        sys.argv[3] if len(sys.argv) > 3 else None,
+    )
@@ -0,0 +1,67 @@
+"""
+load_rolling_average computation: np.mean of every window vs prefix sums (byn.rolling_average).
+
+Rates are DECIMAL(31, 26) Decimals as nbrb GLOBAL ones are.
+
+python -m byn.commands.benchmark_rolling_average [years]
+"""
+import random
+import sys
+import time
+from decimal import Decimal
+
+import numpy as np
+
+import byn.constants as const
+from byn.rolling_average import compute_rolling_averages
+
+
+TRADING_DAYS_PER_YEAR = 252
+
+
+def _build_rates(days: int) -> np.ndarray:
+    random.seed(0)
+    return np.array([
+        [Decimal(random.uniform(0.5, 40)).quantize(Decimal('1e-26')) for _ in range(4)]
+        for _ in range(days)
+    ])
+
+
+def _np_mean(rates: np.ndarray) -> int:
+    """
+    :return: number of computed averages.
+    """
+    computed = 0
+
+    for i in range(len(rates) + 1):
+        for duration in const.ROLLING_AVERAGE_DURATIONS:
+            if i < duration:
+                continue
+
+            for data_column in range(4):
+                Decimal(np.mean(rates[i - duration:i, data_column]))
+                computed += 1
+
+    return computed
+
+
+def _prefix_sums(rates: np.ndarray) -> int:
+    return sum(
+        averages.size
+        for _, averages in compute_rolling_averages(rates, const.ROLLING_AVERAGE_DURATIONS).values()
+    )
+
+
+def run(years: int):
+    rates = _build_rates(years * TRADING_DAYS_PER_YEAR)
+    print(f'{len(rates)} days, durations {const.ROLLING_AVERAGE_DURATIONS}')
+
+    for name, function in (('np.mean', _np_mean), ('prefix sums', _prefix_sums)):
+        start = time.perf_counter()
+        computed = function(rates)
+        seconds = time.perf_counter() - start
+        print(f'{name}: {seconds:.3f}s, {computed} averages, {seconds * 1e6 / computed:.2f} us/average')
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
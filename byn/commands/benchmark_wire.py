@@ -0,0 +1,49 @@
+"""
+Encode/decode cost of a PREDICT command: json vs binary wire format.
+
+python -m byn.commands.benchmark_wire [number]
+"""
+import sys
+import timeit
+from functools import partial
+
+import simplejson
+
+from byn.realtime import wire
+from byn.utils import EnumAwareEncoder
+
+
+COMMAND = {
+    'eur': '1.1234',
+    'rub': '64.5123',
+    'uah': '26.4512',
+    'dxy': '97.0512',
+    'message_guid': 1557000000123,
+    'expires': 1557000000623,
+}
+
+
+def _json_encode_command():
+    return simplejson.dumps({'command': 'PREDICT', 'data': COMMAND}, cls=EnumAwareEncoder)
+
+
+def run(number: int):
+    json_command = _json_encode_command()
+    binary_command = wire.encode_predict_command(COMMAND)
+
+    cases = (
+        ('command, json encode', _json_encode_command),
+        ('command, binary encode', partial(wire.encode_predict_command, COMMAND)),
+        ('command, json decode', partial(simplejson.loads, json_command, use_decimal=True)),
+        ('command, binary decode', partial(wire.decode_predict_command, binary_command)),
+    )
+
+    print(f'command size: json {len(json_command)} B, binary {len(binary_command)} B')
+
+    for name, func in cases:
+        seconds = timeit.timeit(func, number=number)
+        print(f'{name}: {seconds / number * 10**6:.2f} us per message')
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
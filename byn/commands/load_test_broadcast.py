@@ -0,0 +1,131 @@
+"""
+Websocket fan-out with simulated clients: a per-client send_json task for every message
+vs serialize-once broadcasting with bounded per-client queues.
+
+python -m byn.commands.load_test_broadcast [clients] [messages]
+"""
+import asyncio
+import random
+import sys
+import time
+from functools import partial
+
+import simplejson
+
+from byn.realtime.broadcast import Broadcaster
+from byn.utils import EnumAwareEncoder
+
+
+MESSAGE = {
+    'type': 'prediction',
+    'external': {'eur': '1.1234', 'rub': '64.5123', 'uah': '26.4512', 'dxy': '97.0512'},
+    'predicted': {
+        'timestamp': 1557000000,
+        'predicted': 2.051234,
+        'ridge_info': {'predicted': 2.051234, 'std': 0.0016},
+        'std': 0.0016,
+    },
+}
+PUBLISH_INTERVAL = 0.1  # seconds
+SEND_TIMEOUT = 1        # seconds
+
+
+class SimulatedClient:
+    def __init__(self, send_delay: float):
+        self.send_delay = send_delay
+        self.received = 0
+        self.closed = False
+
+    async def _send(self):
+        await asyncio.sleep(self.send_delay)
+        self.received += 1
+
+    async def send_str(self, payload: str):
+        await self._send()
+
+    async def send_json(self, data, *, dumps):
+        dumps(data)
+        await self._send()
+
+    async def close(self, code=None):
+        self.closed = True
+
+
+def _build_clients(number: int):
+    clients = []
+    for _ in range(number):
+        kind = random.random()
+        if kind < 0.01:
+            # Stuck.
+            send_delay = 60 * 60
+        elif kind < 0.1:
+            send_delay = random.uniform(0.2, 0.5)
+        else:
+            send_delay = 0
+        clients.append(SimulatedClient(send_delay))
+
+    return clients
+
+
+async def _run_per_client_tasks(clients, messages: int):
+    publish_seconds = 0
+    tasks = set()
+
+    for _ in range(messages):
+        start = time.perf_counter()
+        for ws in clients:
+            tasks.add(asyncio.create_task(
+                ws.send_json(MESSAGE, dumps=partial(simplejson.dumps, cls=EnumAwareEncoder))
+            ))
+        publish_seconds += time.perf_counter() - start
+        await asyncio.sleep(PUBLISH_INTERVAL)
+
+    pending = sum(not x.done() for x in tasks)
+    for task in tasks:
+        task.cancel()
+
+    return publish_seconds, pending, 0
+
+
+async def _run_broadcaster(clients, messages: int):
+    publish_seconds = 0
+    broadcaster = Broadcaster(send_timeout=SEND_TIMEOUT)
+    for ws in clients:
+        broadcaster.add(ws)
+
+    for _ in range(messages):
+        start = time.perf_counter()
+        broadcaster.publish(simplejson.dumps(MESSAGE, cls=EnumAwareEncoder))
+        publish_seconds += time.perf_counter() - start
+        await asyncio.sleep(PUBLISH_INTERVAL)
+
+    metrics = broadcaster.get_metrics()
+    for ws in clients:
+        broadcaster.remove(ws)
+
+    return publish_seconds, metrics['pending'], metrics['stuck']
+
+
+async def run(number_of_clients: int, messages: int):
+    for name, implementation in (
+        ('per client tasks', _run_per_client_tasks),
+        ('broadcaster', _run_broadcaster),
+    ):
+        random.seed(0)
+        clients = _build_clients(number_of_clients)
+        fast_clients = [x for x in clients if x.send_delay == 0]
+
+        publish_seconds, pending, stuck = await implementation(clients, messages)
+
+        print(
+            f'{name}: {publish_seconds / messages * 1000:.2f} ms per publish, '
+            f'fast clients got {sum(x.received for x in fast_clients) / len(fast_clients):.1f}/{messages}, '
+            f'{pending} pending sends, {stuck} stuck clients disconnected'
+        )
+
+
+if __name__ == '__main__':
+    asyncio.run(run(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 10000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 30,
+    ))
@@ -0,0 +1,168 @@
+"""
+Local stand-in for charts.profinance.ru and banki24.by which replays recorded files (see byn.realtime.recording).
+
+python -m byn.commands.replay_server --forexpf forexpf-2019-05-06.rec \
+    --bcse USD=bcse-USD-2019-05-06.rec --bcse EUR=bcse-EUR-2019-05-06.rec --speed 100
+FOREXPF_BASE_URL=http://localhost:8080 BCSE_BASE_URL=http://localhost:8080 python -m byn.realtime.launch \
+    --clock-start 2019-05-06T09:00:00 --clock-speed 100
+
+Replay time starts with the first record of any file once the server is started.
+Run the pipeline on a virtual clock which starts at the same time and goes at the same speed
+(--clock-start is the local time of the first record), so its market hours and dates match the replay.
+Every forexpf session gets the stream from the current replay time,
+bcse polls get the latest response of their currency recorded before the current replay time.
+"""
+import argparse
+import asyncio
+import bisect
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+from byn.realtime.recording import read_records
+
+
+logger = logging.getLogger(__name__)
+
+MIN_SPEED = 1
+MAX_SPEED = 1000
+
+
+class Replay:
+    def __init__(
+            self,
+            forexpf: List[Tuple[float, bytes]],
+            bcse: Dict[str, List[Tuple[float, bytes]]],
+            *,
+            speed: float=1
+    ):
+        if not MIN_SPEED <= speed <= MAX_SPEED:
+            raise ValueError(f'Speed is expected to be from {MIN_SPEED} to {MAX_SPEED}.')
+
+        if not forexpf and not any(bcse.values()):
+            raise ValueError('Nothing to replay.')
+
+        self.forexpf = forexpf
+        self.bcse = bcse
+        self.speed = speed
+
+        self._forexpf_timestamps = [x[0] for x in forexpf]
+        self._bcse_timestamps = {currency: [x[0] for x in records] for currency, records in bcse.items()}
+        self.start_timestamp = min(x[0][0] for x in (forexpf, *bcse.values()) if x)
+        self._started = None
+
+    def start(self):
+        self._started = time.monotonic()
+
+    def get_time(self) -> float:
+        """
+        :return: current replay timestamp.
+        """
+        return self.start_timestamp + (time.monotonic() - self._started) * self.speed
+
+    async def sleep_till(self, timestamp: float):
+        delay = (timestamp - self.get_time()) / self.speed
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def get_forexpf_index(self) -> int:
+        return bisect.bisect_left(self._forexpf_timestamps, self.get_time())
+
+    def get_bcse_response(self, currency: str) -> Optional[bytes]:
+        """
+        :return: None if *currency* wasn't recorded.
+        """
+        if not self.bcse.get(currency):
+            return None
+
+        index = bisect.bisect_right(self._bcse_timestamps[currency], self.get_time()) - 1
+        # Nothing was polled that early, the first response is the closest one.
+        return self.bcse[currency][max(index, 0)][1]
+
+
+def create_app(replay: Replay) -> web.Application:
+    app = web.Application()
+    app['replay'] = replay
+    app.add_routes([
+        web.get('/html/tw/sse', sse_handler),
+        web.get('/html/tw/subscribe', subscribe_handler),
+        web.get('/exchange/last/{currency}/{date}', bcse_handler),
+    ])
+    app.on_startup.append(_start_replay)
+    return app
+
+
+async def _start_replay(app):
+    app['replay'].start()
+
+
+async def sse_handler(request):
+    replay = request.app['replay']  # type: Replay
+
+    response = web.StreamResponse(headers={'Content-Type': 'text/event-stream'})
+    await response.prepare(request)
+    await response.write(b'data: 1;replay\n\n')
+
+    for timestamp, payload in replay.forexpf[replay.get_forexpf_index():]:
+        await replay.sleep_till(timestamp)
+        await response.write(payload)
+
+    logger.info('forexpf recording is over.')
+
+    # forexpf keeps a session open when there are no ticks.
+    while True:
+        await asyncio.sleep(3600)
+
+
+async def subscribe_handler(request):
+    return web.Response()
+
+
+async def bcse_handler(request):
+    replay = request.app['replay']  # type: Replay
+
+    response = replay.get_bcse_response(request.match_info['currency'])
+
+    if response is None:
+        raise web.HTTPNotFound()
+
+    return web.Response(body=response, content_type='application/json')
+
+
+def _parse_bcse_arg(value: str) -> Tuple[str, str]:
+    """
+    :param value: CURRENCY=path or just a path of a USD record file.
+    """
+    currency, separator, path = value.partition('=')
+    return (currency, path) if separator else ('USD', value)
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--forexpf', help='forexpf record file.')
+    parser.add_argument(
+        '--bcse',
+        type=_parse_bcse_arg,
+        action='append',
+        default=[],
+        help='CURRENCY=bcse record file. May be repeated.'
+    )
+    parser.add_argument('--speed', type=float, default=1, help=f'{MIN_SPEED}..{MAX_SPEED}')
+    parser.add_argument('--port', type=int, default=8080)
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    args = _parse_args()
+
+    web.run_app(
+        create_app(Replay(
+            list(read_records(args.forexpf)) if args.forexpf else [],
+            {currency: list(read_records(path)) for currency, path in args.bcse},
+            speed=args.speed,
+        )),
+        port=args.port,
+    )
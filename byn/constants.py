@@ -1,21 +1,68 @@
+import datetime
+import os
+
+
 CASSANDRA_KEYSPACE = 'byn'
 
 CLEAN_NBRB_DATA = 'data/bcse-rates.json'
 DXY_12MSK_DARA = 'data/dxy-12MSK.json'
 EXTERNAL_RATE_DATA = 'data/forexpf-%s.json'
 RIDGE_CACHE_FOLDER = 'data/ridge_cache/'
+TRADING_CALENDAR_DATA = os.path.join(os.path.dirname(__file__), 'data', 'trading-calendar.json')
 
-FOREXPF_LONG_POLL_SSE = 'https://charts.profinance.ru/html/tw/sse'
+# Base urls are overridden to point the pipeline to byn.commands.replay_server.
+FOREXPF_BASE_URL = os.environ.get('FOREXPF_BASE_URL', 'https://charts.profinance.ru')
+FOREXPF_LONG_POLL_SSE = f'{FOREXPF_BASE_URL}/html/tw/sse'
+FOREXPF_SUBSCRIBE_URL = f'{FOREXPF_BASE_URL}/html/tw/subscribe'
+BCSE_BASE_URL = os.environ.get('BCSE_BASE_URL', 'https://banki24.by')
+# Raw forexpf and bcse responses are recorded there when it's set.
+RECORD_DIR = os.environ.get('BYN_RECORD_DIR')
+FOREXPF_SESSIONS = 2            # concurrent long poll sessions, ticks are deduplicated.
+FOREXPF_RECONNECT_DELAY = 1     # seconds
+FOREXPF_DEDUP_SIZE = 10000      # ticks
 REDIS_CACHE_DB = 1
 
 BCSE_UPDATE_INTERVAL = 15       # seconds
+# Adaptive bcse polling: the min interval is used around the session open and after a trade,
+# then the interval grows by BCSE_UPDATE_BACKOFF times per quiet poll.
+BCSE_MIN_UPDATE_INTERVAL = 5    # seconds
+BCSE_MAX_UPDATE_INTERVAL = 15   # seconds
+BCSE_UPDATE_BACKOFF = 1.5
+BCSE_OPEN_PERIOD = datetime.timedelta(minutes=20)
 PREDICT_UPDATE_INTERVAL = 2     # seconds
 BCSE_LAST_OPERATION_COLOR = '#7cb5ec'
 FOREXPF_WORKERS_COUNT = 2
+FOREXPF_MAX_PENDING_TICKS = 10000   # older ticks are dropped without being persisted.
+FOREXPF_PERSIST_BATCH_SIZE = 500
 BCSE_USD_REDIS_KEY = 'USD/BYN'
+BCSE_CURRENCIES = 'USD', 'EUR', 'RUB'
+# Keep-alive connections to bcse: one per currency, so polls of a round run concurrently.
+BCSE_CONNECTIONS = len(BCSE_CURRENCIES)
+# NEW_BCSE commands are sent for this currency only.
+BCSE_PREDICTOR_CURRENCY = 'USD'
+LIVE_RATES_REDIS_KEY = 'live_rates'
+PREDICT_SNAPSHOT_REDIS_KEY = 'predict_snapshot'
 FOREXPF_CURRENCIES_TO_LISTEN = 'EUR', 'RUB', 'UAH', 'DXY'
 PUBLISH_PREDICT_REDIS_CHANNEL = 'publish_predict'
+PUBLISH_EXTERNAL_REDIS_CHANNEL = 'publish_external'
+PUBLISH_BCSE_REDIS_CHANNEL = 'publish_bcse'
+PUBLISH_MODEL_REDIS_CHANNEL = 'publish_model'
 FIX_BCSE_TIMESTAMP = 3  # hours
+API_PORT = 5000
+API_WORKER_CHECK_INTERVAL = 1   # seconds
+WS_SEND_TIMEOUT = 10            # seconds
+WS_MAX_PENDING_MESSAGES = 1     # per client, older pending messages are dropped.
+WS_DELTA_PROTOCOL = 'byn.delta.v1'
+WS_PREDICTION_TOPIC = 'prediction'
+WS_EXTERNAL_TOPIC = 'external'
+WS_BCSE_TOPIC = 'bcse'
+WS_MODEL_TOPIC = 'model'
+WS_TOPICS = WS_PREDICTION_TOPIC, WS_EXTERNAL_TOPIC, WS_BCSE_TOPIC, WS_MODEL_TOPIC
+WS_DEFAULT_TOPICS = WS_PREDICTION_TOPIC,
+SSE_HEARTBEAT_INTERVAL = 15
+SSE_REPLAY_SIZE = 256
+SSE_RETRY_MS = 3000
+WS_KEYFRAME_INTERVAL = 30       # messages
 
 # Standard deviation for USD/BYN exchange rate during a day.
 STD_USD_BYN = 0.0016
@@ -23,4 +70,7 @@ ENOUGH_FOR_BUILDING_STD = 20
 # All model input data is normalized: 1
 MAX_PREDICTABLE_DISTANCE = 1
 
+BAR_RESOLUTIONS = (60, 5 * 60, 15 * 60, 60 * 60)    # seconds
+BAR_FLUSH_INTERVAL = 10         # seconds
+
 ROLLING_AVERAGE_DURATIONS = (2, 5, 10, 20, 40, 120, 240)
@@ -10,10 +10,10 @@ from typing import Collection, Tuple, Optional
 class ExternalRateData:
     currency: str
     timestamp_open: int
-    rate_open: str
-    close: str
-    low: str
-    high: str
+    rate_open: float
+    close: float
+    low: float
+    high: float
     volume: int
     timestamp_received: float
 
@@ -26,6 +26,21 @@ class BcseData:
     rate: str
 
 
+@dataclass
+class Bar:
+    # Open time of the bar.
+    timestamp: int
+    open: float
+    high: float
+    low: float
+    close: float
+
+    def update(self, value: float):
+        self.high = max(self.high, value)
+        self.low = min(self.low, value)
+        self.close = value
+
+
 @dataclass
 class LocalRates:
     # eur/usd
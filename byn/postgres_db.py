@@ -7,7 +7,7 @@ from contextlib import asynccontextmanager
 from dataclasses import asdict
 from decimal import Decimal
 from enum import Enum
-from typing import Collection, Dict, Iterable, Iterator, Optional, Sequence, Tuple
+from typing import AsyncIterator, Collection, Dict, Iterable, Iterator, Optional, Sequence, Tuple
 
 import aiopg
 import aiopg.sa
@@ -15,8 +15,9 @@ import sqlalchemy as sa
 from sqlalchemy.dialects.postgresql import insert as psql_insert
 from aiopg.connection import _ContextManager
 
-from byn.datatypes import BcseData, ExternalRateData
+from byn.datatypes import Bar, BcseData, ExternalRateData
 from byn.predict.predictor import PredictionRecord
+from byn.realtime.rate_timeline import get_tick_timestamp
 from byn.utils import (
     EnumAwareEncoder,
     anext,
@@ -89,6 +90,17 @@ rolling_average = sa.Table('rolling_average', metadata,
                    sa.Column('dxy', sa.DECIMAL(31, 26)),
                )
 
+bar = sa.Table('bar', metadata,
+               sa.Column('series', sa.String(15), primary_key=True),
+               sa.Column('resolution', sa.Integer, primary_key=True),
+               sa.Column('timestamp', sa.Integer, primary_key=True),
+               sa.Column('open', sa.DECIMAL(12, 6)),
+               sa.Column('high', sa.DECIMAL(12, 6)),
+               sa.Column('low', sa.DECIMAL(12, 6)),
+               sa.Column('close', sa.DECIMAL(12, 6)),
+               )
+
+
 
 LAST_ROLLING_AVERAGE_MAGIC_DATE = datetime.date(2100, 1, 1)
 
@@ -303,17 +315,13 @@ async def get_external_rate_live(start_dt: datetime.datetime,
 
     for records in currency_to_rows.values():
         for i in range(len(records) - 1):
-            ts_close = records[i+1]['ts_open'] - 1
-
-            records[i]['ts_real'] = min(
-                max(
-                    records[i]['ts_open'],
-                    records[i]['ts_received']
-                ),
-                ts_close
+            records[i]['ts_real'] = get_tick_timestamp(
+                records[i]['ts_open'],
+                records[i]['ts_received'],
+                records[i+1]['ts_open']
             )
 
-        records[-1]['ts_real'] = max(
+        records[-1]['ts_real'] = get_tick_timestamp(
             records[-1]['ts_open'],
             records[-1]['ts_received']
         )
@@ -424,6 +432,168 @@ async def get_last_predicted_trade_date():
         ), None)
 
 
+# Id of the transaction which has written the row. It changes on every insert and update.
+_XMIN = sa.literal_column('xmin::text::bigint')
+
+DEFAULT_PAGE_SIZE = 500
+
+
+async def _iterate_pages(table: sa.Table, condition, key: sa.Column, page_size: int) -> AsyncIterator:
+    """
+    Keyset pagination: only one page of rows is fetched at once
+    and the connection is returned to the pool while the caller consumes it.
+
+    :param key: unique within the condition.
+    """
+    page_condition = condition
+
+    while True:
+        async with connection() as cur:
+            rows = [x async for x in cur.execute(
+                table.select(page_condition).order_by(key).limit(page_size)
+            )]
+
+        for row in rows:
+            yield row
+
+        if len(rows) < page_size:
+            return
+
+        page_condition = condition & (key > rows[-1][key.name])
+
+
+async def _get_version(table: sa.Table, condition) -> Tuple[int, int]:
+    """
+    :return: number of rows and the latest transaction which has written one of them.
+        Inserts, updates and deletes within the condition change it,
+        though the rows themselves are not read.
+    """
+    async with connection() as cur:
+        count, xmin = await (await cur.execute(
+            sa.select([sa.func.count(), sa.func.max(_XMIN)]).select_from(table).where(condition)
+        )).first()
+
+    return count, xmin
+
+
+def _bcse_condition(currency: str, start_dt: datetime.datetime, end_dt: datetime.datetime):
+    return (
+        (bcse.c.currency == currency) &
+        (bcse.c.timestamp >= start_dt.timestamp()) &
+        (bcse.c.timestamp < end_dt.timestamp())
+    )
+
+
+def _prediction_condition(start_dt: datetime.datetime, end_dt: datetime.datetime):
+    """
+    Prediction timestamps are in milliseconds.
+    """
+    return (
+        (prediction.c.timestamp >= int(start_dt.timestamp() * 1000)) &
+        (prediction.c.timestamp < int(end_dt.timestamp() * 1000))
+    )
+
+
+def _trade_date_condition(start_date: datetime.date, end_date: datetime.date):
+    return (
+        (trade_date.c.date >= start_date) &
+        (trade_date.c.date <= end_date)
+    )
+
+
+def _nbrb_condition(kind: NbrbKind, start_date: datetime.date, end_date: datetime.date):
+    return (
+        (nbrb.c.kind == kind.value) &
+        (nbrb.c.date >= start_date) &
+        (nbrb.c.date <= end_date)
+    )
+
+
+def _bar_condition(series: str, resolution: int, start_dt: datetime.datetime, end_dt: datetime.datetime):
+    return (
+        (bar.c.series == series) &
+        (bar.c.resolution == resolution) &
+        (bar.c.timestamp >= start_dt.timestamp()) &
+        (bar.c.timestamp < end_dt.timestamp())
+    )
+
+
+def iterate_bcse(
+        currency: str,
+        start_dt: datetime.datetime,
+        end_dt: datetime.datetime,
+        *,
+        page_size: int=DEFAULT_PAGE_SIZE
+) -> AsyncIterator:
+    return _iterate_pages(bcse, _bcse_condition(currency, start_dt, end_dt), bcse.c.timestamp, page_size)
+
+
+async def get_bcse_version(currency: str, start_dt: datetime.datetime, end_dt: datetime.datetime) -> Tuple[int, int]:
+    return await _get_version(bcse, _bcse_condition(currency, start_dt, end_dt))
+
+
+def iterate_predictions(
+        start_dt: datetime.datetime,
+        end_dt: datetime.datetime,
+        *,
+        page_size: int=DEFAULT_PAGE_SIZE
+) -> AsyncIterator:
+    return _iterate_pages(prediction, _prediction_condition(start_dt, end_dt), prediction.c.timestamp, page_size)
+
+
+async def get_predictions_version(start_dt: datetime.datetime, end_dt: datetime.datetime) -> Tuple[int, int]:
+    return await _get_version(prediction, _prediction_condition(start_dt, end_dt))
+
+
+def iterate_trade_dates(
+        start_date: datetime.date,
+        end_date: datetime.date,
+        *,
+        page_size: int=DEFAULT_PAGE_SIZE
+) -> AsyncIterator:
+    return _iterate_pages(trade_date, _trade_date_condition(start_date, end_date), trade_date.c.date, page_size)
+
+
+async def get_trade_dates_version(start_date: datetime.date, end_date: datetime.date) -> Tuple[int, int]:
+    return await _get_version(trade_date, _trade_date_condition(start_date, end_date))
+
+
+def iterate_nbrb(
+        kind: NbrbKind,
+        start_date: datetime.date,
+        end_date: datetime.date,
+        *,
+        page_size: int=DEFAULT_PAGE_SIZE
+) -> AsyncIterator:
+    return _iterate_pages(nbrb, _nbrb_condition(kind, start_date, end_date), nbrb.c.date, page_size)
+
+
+async def get_nbrb_version(kind: NbrbKind, start_date: datetime.date, end_date: datetime.date) -> Tuple[int, int]:
+    return await _get_version(nbrb, _nbrb_condition(kind, start_date, end_date))
+
+
+def iterate_bars(
+        series: str,
+        resolution: int,
+        start_dt: datetime.datetime,
+        end_dt: datetime.datetime,
+        *,
+        page_size: int=DEFAULT_PAGE_SIZE
+) -> AsyncIterator:
+    return _iterate_pages(
+        bar, _bar_condition(series, resolution, start_dt, end_dt), bar.c.timestamp, page_size
+    )
+
+
+async def get_bars_version(
+        series: str,
+        resolution: int,
+        start_dt: datetime.datetime,
+        end_dt: datetime.datetime
+) -> Tuple[int, int]:
+    return await _get_version(bar, _bar_condition(series, resolution, start_dt, end_dt))
+
+
 ############## INSERT ############
 
 async def insert_nbrb(data: Iterable[dict], *, kind: NbrbKind):
@@ -513,20 +683,31 @@ async def insert_external_rates(
         )
 
 
-async def insert_external_rate_live(row: ExternalRateData):
+async def insert_external_rates_live(data: Iterable[ExternalRateData]):
+    # The same tick may come twice in one batch: the latest wins.
+    values = list({
+        (x.currency, x.timestamp_open, x.volume): {
+            'currency': x.currency,
+            'timestamp': x.timestamp_open,
+            'volume': x.volume,
+            'timestamp_received': x.timestamp_received,
+            'rate': x.close,
+        } for x in data
+    }.values())
+
+    if not values:
+        return
+
+    query = psql_insert(external_rate_live, values)
+
     async with connection() as cur:
-        await cur.execute(
-            psql_insert(external_rate_live, dict(
-                currency=row.currency,
-                timestamp=row.timestamp_open,
-                volume=row.volume,
-                timestamp_received=row.timestamp_received,
-                rate=row.close,
-            )).on_conflict_do_update(index_elements=['currency', 'timestamp', 'volume'], set_={
-                'timestamp_received': row.timestamp_received,
-                'rate': row.close,
-            })
-        )
+        await cur.execute(query.on_conflict_do_update(
+            index_elements=['currency', 'timestamp', 'volume'],
+            set_={
+                'timestamp_received': query.excluded.timestamp_received,
+                'rate': query.excluded.rate,
+            }
+        ))
 
 
 async def insert_bcse(data: Iterable[BcseData]):
@@ -546,6 +727,37 @@ async def insert_bcse(data: Iterable[BcseData]):
         )
 
 
+async def insert_bars(data: Iterable[Tuple[str, int, Bar]]):
+    """
+    Bars are merged with stored ones: the stored open is kept, high/low are extended.
+    So a partial bar built after a restart doesn't overwrite the stored one.
+    """
+    values = [{
+        'series': series,
+        'resolution': resolution,
+        'timestamp': x.timestamp,
+        'open': x.open,
+        'high': x.high,
+        'low': x.low,
+        'close': x.close,
+    } for series, resolution, x in data]
+
+    if not values:
+        return
+
+    query = psql_insert(bar, values)
+
+    async with connection() as cur:
+        await cur.execute(query.on_conflict_do_update(
+            index_elements=['series', 'resolution', 'timestamp'],
+            set_={
+                'high': sa.func.greatest(bar.c.high, query.excluded.high),
+                'low': sa.func.least(bar.c.low, query.excluded.low),
+                'close': query.excluded.close,
+            }
+        ))
+
+
 def _ndarray_to_tuple_of_tuples(numpy_array):
     return tuple(tuple(row) for row in numpy_array)
 
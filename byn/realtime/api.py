@@ -1,72 +1,337 @@
 """
-register clients' websockets
+register clients' websockets and event streams
 """
 import asyncio
+import multiprocessing
+import signal
 import simplejson
 import logging
-from functools import partial
+import time
+from typing import List, Optional
 
 import aiohttp
 from aiohttp import web
 from aiohttp import WSCloseCode
+from aioredis.pubsub import Receiver
 
 import byn.constants as const
-from byn.utils import create_redis, always_on_coroutine, EnumAwareEncoder
+from byn.utils import create_redis, always_on_coroutine, once_per, EnumAwareEncoder
+from byn.realtime.broadcast import Broadcaster
+from byn.realtime import history_api
+from byn.realtime.delta import get_delta
+from byn.realtime.sse import EventStream, ReplayRing, HEARTBEAT_FRAME, HEARTBEAT_TOPIC
 
 
 logger = logging.getLogger(__name__)
 
+CHANNEL_TO_TOPIC = {
+    const.PUBLISH_PREDICT_REDIS_CHANNEL: const.WS_PREDICTION_TOPIC,
+    const.PUBLISH_EXTERNAL_REDIS_CHANNEL: const.WS_EXTERNAL_TOPIC,
+    const.PUBLISH_BCSE_REDIS_CHANNEL: const.WS_BCSE_TOPIC,
+    const.PUBLISH_MODEL_REDIS_CHANNEL: const.WS_MODEL_TOPIC,
+}
+# Replies to subscribe/unsubscribe messages.
+SUBSCRIPTIONS_TYPE = 'subscriptions'
 
-async def listen_api():
+
+def create_app() -> web.Application:
     app = web.Application()
 
-    app['websockets'] = []
-    app.add_routes([web.get('/predict.ws', websocket_handler)])
+    app['websockets'] = Broadcaster()
+    app['event_streams'] = Broadcaster()
+    app['replay_ring'] = ReplayRing()
+    app.add_routes([
+        web.get('/predict.ws', websocket_handler),
+        web.get('/predict.sse', event_stream_handler),
+    ])
+    app['history_db'] = history_api.LazyDbPool()
+    app.add_routes(history_api.routes)
 
     app.on_shutdown.append(close_ws)
-    asyncio.create_task(_subscribe_for_predictions(app))
+    return app
+
+
+async def listen_api(*, reuse_port: bool=False):
+    app = create_app()
+    asyncio.create_task(_subscribe_for_topics(app))
+
+    await web._run_app(app, port=const.API_PORT, reuse_port=reuse_port)
+
+
+class ApiWorkerError(RuntimeError):
+    pass
+
+
+def run_api_worker():
+    """
+    Entry point of a separate api process. Workers share the port (SO_REUSEPORT)
+    and subscribe for redis channels independently.
+    """
+    # The parent may have its own SIGTERM handler. A worker just stops.
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    asyncio.run(listen_api(reuse_port=True))
+
+
+def start_api_worker(number: int) -> multiprocessing.Process:
+    process = multiprocessing.Process(target=run_api_worker, name=f'api-worker-{number}', daemon=True)
+    process.start()
+    return process
+
+
+def start_api_workers(number: int) -> List[multiprocessing.Process]:
+    processes = [start_api_worker(i) for i in range(number)]
+    logger.info('%s api worker(s) started.', number)
+    return processes
+
+
+def _get_exited_workers(processes: List[multiprocessing.Process]) -> List[int]:
+    """
+    Workers never exit on their own, so any exit code means a failure.
+
+    :return: indexes of exited workers.
+    """
+    exited = [i for i, x in enumerate(processes) if x.exitcode is not None]
+
+    for i in exited:
+        logger.error('%s has exited with code %s.', processes[i].name, processes[i].exitcode)
+
+    return exited
+
+
+def restart_exited_api_workers(processes: List[multiprocessing.Process]) -> int:
+    """
+    :return: number of restarted workers.
+    """
+    exited = _get_exited_workers(processes)
+
+    for i in exited:
+        processes[i] = start_api_worker(i)
+
+    return len(exited)
+
+
+def supervise_api_workers(processes: List[multiprocessing.Process]):
+    """
+    Restart failed workers of a separate api process (no event loop) until it's stopped.
+    """
+    try:
+        while True:
+            restart_exited_api_workers(processes)
+            time.sleep(const.API_WORKER_CHECK_INTERVAL)
+    finally:
+        stop_api_workers(processes)
+
+
+async def watch_api_workers(processes: List[multiprocessing.Process]):
+    """
+    Workers can't be forked from a running event loop, so the pipeline stops if one of them fails.
+    """
+    while True:
+        exited = _get_exited_workers(processes)
+        if exited:
+            raise ApiWorkerError(f'{len(exited)} api worker(s) have exited.')
+
+        await asyncio.sleep(const.API_WORKER_CHECK_INTERVAL)
+
+
+def stop_api_workers(processes: List[multiprocessing.Process], *, timeout: float=5):
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
 
-    await web._run_app(app, port=5000)
+    for process in processes:
+        process.join(timeout)
+
+        if process.is_alive():
+            logger.warning('%s is not terminated in %s seconds. Killing it.', process.name, timeout)
+            process.kill()
+            process.join()
 
 
 async def close_ws(app):
     for ws in app['websockets']:
         await ws.close(code=WSCloseCode.GOING_AWAY)
 
+    for stream in app['event_streams']:
+        await stream.close()
+
 
 async def websocket_handler(request):
-    ws = web.WebSocketResponse()
+    """
+    Clients get predictions by default and may change their topics with
+        {"action": "subscribe" | "unsubscribe", "topics": ["prediction", "external", "bcse", "model"]}
+    Current subscriptions are sent back as a "subscriptions" message.
+    """
+    # Clients which don't ask for the delta protocol get full messages.
+    # permessage-deflate is used if a client offers it.
+    ws = web.WebSocketResponse(protocols=(const.WS_DELTA_PROTOCOL, ), compress=True)
     await ws.prepare(request)
 
-    request.app['websockets'].append(ws)
-    logger.debug('New client. %s client(s) are connected', len(request.app['websockets']))
+    websockets = request.app['websockets']
+    websockets.add(ws, delta=ws.ws_protocol == const.WS_DELTA_PROTOCOL)
+    logger.debug(
+        'New client (protocol: %s, permessage-deflate: %s). %s client(s) are connected',
+        ws.ws_protocol, bool(ws.compress), len(websockets)
+    )
 
-    # Actually, do nothing and wait for disconnection.
     try:
         async for msg in ws:
-            if msg.type == aiohttp.WSMsgType.ERROR:
+            if msg.type == aiohttp.WSMsgType.TEXT:
+                _handle_client_message(websockets, ws, msg.data)
+
+            elif msg.type == aiohttp.WSMsgType.ERROR:
                 logger.info('ws is closing with an expect exception: %s', ws.exception())
     finally:
-        request.app['websockets'].remove(ws)
-        logger.debug('Client disconnected. %s client(s) connected.', len(request.app['websockets']))
+        websockets.remove(ws)
+        logger.debug('Client disconnected. %s client(s) connected.', len(websockets))
 
     return ws
 
 
+def _handle_client_message(websockets: Broadcaster, ws, raw_message: str):
+    try:
+        message = simplejson.loads(raw_message)
+        action = message['action']
+        topics = [x for x in message['topics'] if x in const.WS_TOPICS]
+    except (ValueError, KeyError, TypeError):
+        logger.debug('Unexpected client message: %s', raw_message)
+        return
+
+    if action == 'subscribe':
+        websockets.subscribe(ws, topics)
+    elif action == 'unsubscribe':
+        websockets.unsubscribe(ws, topics)
+    else:
+        logger.debug('Unexpected client action: %s', action)
+        return
+
+    subscriber = websockets.get(ws)
+    if subscriber is not None:
+        subscriber.push(SUBSCRIPTIONS_TYPE, simplejson.dumps({
+            'type': SUBSCRIPTIONS_TYPE,
+            'topics': sorted(subscriber.topics),
+        }))
+
+
+async def event_stream_handler(request):
+    """
+    text/event-stream of full messages. Topics are chosen with ?topics=prediction,bcse
+    A reconnecting client gets missed events if its Last-Event-ID is still in the replay ring.
+    """
+    topics = [
+        x for x in request.query.get('topics', ','.join(const.WS_DEFAULT_TOPICS)).split(',')
+        if x in const.WS_TOPICS
+    ]
+    if not topics:
+        raise web.HTTPBadRequest(text=f'Topics are some of {const.WS_TOPICS}.')
+
+    response = web.StreamResponse(headers={
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        # Don't let nginx buffer the stream.
+        'X-Accel-Buffering': 'no',
+    })
+    await response.prepare(request)
+    await response.write(f'retry: {const.SSE_RETRY_MS}\n\n'.encode())
+
+    ring = request.app['replay_ring']     # type: ReplayRing
+    event_streams = request.app['event_streams']    # type: Broadcaster
+    stream = EventStream(response)
+
+    last_id = ring.parse_event_id(request.headers.get('Last-Event-ID'))
+    missed = None if last_id is None else ring.get_since(last_id, topics)
+
+    # New events may be published while missed ones are written,
+    # so repeat until the client is in sync and register it without awaiting.
+    while missed:
+        for last_id, frame in missed:
+            await response.write(frame)
+
+        missed = ring.get_since(last_id, topics)
+
+    subscriber = event_streams.add(stream, topics=topics, with_snapshots=missed is None)
+    logger.debug('New event stream. %s stream(s) are connected', len(event_streams))
+
+    try:
+        while not stream.closed.is_set():
+            try:
+                await asyncio.wait_for(stream.closed.wait(), const.SSE_HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                subscriber.push(HEARTBEAT_TOPIC, HEARTBEAT_FRAME)
+    finally:
+        event_streams.remove(stream)
+        logger.debug('Event stream closed. %s stream(s) connected.', len(event_streams))
+
+    return response
+
+
 @always_on_coroutine
-async def _subscribe_for_predictions(app):
+async def _subscribe_for_topics(app):
     redis = await create_redis()
-    channel,  = await redis.subscribe(const.PUBLISH_PREDICT_REDIS_CHANNEL)
+    receiver = Receiver()
+    await redis.subscribe(*(receiver.channel(x) for x in CHANNEL_TO_TOPIC))
+
+    websockets = app['websockets']     # type: Broadcaster
+    event_streams = app['event_streams']    # type: Broadcaster
+    ring = app['replay_ring']     # type: ReplayRing
+    previous_prediction = None
+
+    async for channel, raw_message in receiver.iter():
+        topic = CHANNEL_TO_TOPIC[channel.name.decode()]
+
+        # Prediction is always processed to keep its snapshot and delta base up to date.
+        if (
+                topic != const.WS_PREDICTION_TOPIC and
+                not websockets.has_subscribers(topic) and
+                not event_streams.has_subscribers(topic)
+        ):
+            websockets.forget(topic)
+            event_streams.forget(topic)
+            ring.skip(topic)
+            continue
 
-    while True:
-        raw_message = await channel.get()
         message = simplejson.loads(raw_message, use_decimal=True)
         logger.debug(message)
 
-        message['type'] = 'prediction'
+        message['type'] = topic
+
+        if topic == const.WS_PREDICTION_TOPIC:
+            delta_payload = _build_delta_payload(previous_prediction, message)
+            previous_prediction = message
+            seq = message['seq']
+        else:
+            delta_payload = None
+            seq = None
+
+        payload = simplejson.dumps(message, cls=EnumAwareEncoder)
+        websockets.publish(payload, delta_payload, topic=topic)
+        event_streams.publish(ring.append(topic, payload, seq=seq), topic=topic)
+        _inspect_websockets(websockets, event_streams)
+
+
+def _build_delta_payload(previous_message: Optional[dict], message: dict) -> Optional[str]:
+    """
+    :return: None when a keyframe should be sent to everybody.
+    """
+    if previous_message is None or message['seq'] % const.WS_KEYFRAME_INTERVAL == 0:
+        return None
+
+    return simplejson.dumps({
+        'type': message['type'],
+        'seq': message['seq'],
+        'base': previous_message['seq'],
+        'delta': get_delta(
+            {k: v for k, v in previous_message.items() if k not in ('type', 'seq')},
+            {k: v for k, v in message.items() if k not in ('type', 'seq')},
+        ),
+    }, cls=EnumAwareEncoder)
+
 
-        for ws in app['websockets']:
-            asyncio.create_task(
-                ws.send_json(message, dumps=partial(simplejson.dumps, cls=EnumAwareEncoder))
-            )
+@once_per(period=30)
+def _inspect_websockets(websockets: Broadcaster, event_streams: Broadcaster):
+    """
+    Log fan-out metrics.
+    """
+    logger.info('Websockets: %s', websockets.get_metrics())
+    logger.info('Event streams: %s', event_streams.get_metrics())
 
@@ -0,0 +1,89 @@
+"""
+Multi-resolution OHLC bars of bcse rates and predicted USD/BYN.
+
+Bars are updated in memory from the live pipeline and periodically merged into the *bar* table.
+Only the current bar of every series & resolution is kept in memory.
+"""
+import dataclasses
+import logging
+from typing import List, Tuple
+
+import byn.constants as const
+from byn.datatypes import Bar
+from byn.postgres_db import insert_bars
+from byn.utils import always_on_coroutine
+from byn.realtime import clock
+
+
+logger = logging.getLogger(__name__)
+
+BCSE_SERIES = 'bcse_%s'
+PREDICTED_USD_SERIES = 'predicted_USD'
+
+
+class BarStore:
+    def __init__(self, resolutions=const.BAR_RESOLUTIONS):
+        self.resolutions = resolutions
+        self._current = {}  # type: Dict[str, Dict[int, Bar]]
+        self._dirty = {}    # type: Dict[Tuple[str, int, int], Bar]
+        self._last_timestamps = {}  # type: Dict[str, int]
+
+    def add(self, series: str, timestamp: int, value: float):
+        """
+        Points which are older than the latest point of the series are ignored by bars of all resolutions.
+        """
+        timestamp = int(timestamp)
+
+        if timestamp < self._last_timestamps.get(series, timestamp):
+            logger.debug('Late %s point %s is ignored.', series, timestamp)
+            return
+
+        self._last_timestamps[series] = timestamp
+        current = self._current.setdefault(series, {})
+
+        for resolution in self.resolutions:
+            bar_timestamp = timestamp - timestamp % resolution
+            bar = current.get(resolution)
+
+            if bar is None or bar.timestamp < bar_timestamp:
+                bar = Bar(timestamp=bar_timestamp, open=value, high=value, low=value, close=value)
+                current[resolution] = bar
+
+            else:
+                bar.update(value)
+
+            self._dirty[(series, resolution, bar.timestamp)] = bar
+
+    def get_current(self, series: str, resolution: int) -> Bar:
+        return self._current[series][resolution]
+
+    def pop_dirty(self) -> List[Tuple[str, int, Bar]]:
+        dirty, self._dirty = self._dirty, {}
+        return [
+            (series, resolution, dataclasses.replace(bar))
+            for (series, resolution, _), bar in dirty.items()
+        ]
+
+    def restore_dirty(self, dirty: List[Tuple[str, int, Bar]]):
+        """
+        Put back bars which are not persisted. Bars updated since they were popped are newer.
+        """
+        for series, resolution, bar in dirty:
+            self._dirty.setdefault((series, resolution, bar.timestamp), bar)
+
+
+# Fed by the bcse reader and the prediction scheduler which run in one event loop.
+bars = BarStore()
+
+
+@always_on_coroutine
+async def persist_bars():
+    while True:
+        await clock.sleep(const.BAR_FLUSH_INTERVAL)
+        dirty = bars.pop_dirty()
+
+        try:
+            await insert_bars(dirty)
+        except:
+            bars.restore_dirty(dirty)
+            raise
@@ -1,21 +1,31 @@
 """
-There is no live api for bcse, so let's try to read it periodically. Once per 15 seconds.
+There is no live api for bcse, so let's try to read it periodically (every currency of BCSE_CURRENCIES).
+Every 5 seconds around the open and after a trade, up to every 15 seconds while the market is quiet.
 
 """
 import asyncio
 import datetime
 import simplejson
 import logging
+import math
 from collections import OrderedDict
-from typing import List, Optional, Sequence
+from itertools import chain
+from typing import List, Optional
 
+from aiohttp import TCPConnector
 from aiohttp.client import ClientSession
 from aioredis import Redis
 
 import byn.constants as const
+from byn.trading_calendar import bcse_calendar
 from byn.postgres_db import insert_bcse, get_bcse_in
 from byn.datatypes import BcseData, PredictCommand
-from byn.utils import always_on_coroutine, create_redis, atuple
+from byn.utils import always_on_coroutine, create_redis, atuple, once_per
+from byn.realtime import clock
+from byn.realtime.bars import bars, BCSE_SERIES
+from byn.realtime.bcse_delta import BcseDeltaSender
+from byn.realtime.bcse_polling import BcsePoller
+from byn.realtime.recording import Recorder, get_recorder, BCSE as BCSE_RECORDS
 from byn.realtime.synchronization import (
     mark_as_ready,
     BCSE as BCSE_IS_READY,
@@ -25,50 +35,16 @@ from byn.realtime.synchronization import (
 
 logger = logging.getLogger(__name__)
 
-EXTRA_BCSE_HOLIDAYS_ANY_YEAR = (
-    (1, 1),
-    (1, 7),
-    (3, 8),
-    (5, 1),
-    (5, 9),
-    (5, 9),
-    (7, 3),
-    (11, 7),
-    (12, 25),
-)
-
-EXTRA_BCSE_HOLIDAYS = (
-    datetime.date(2019, 5, 6),
-    datetime.date(2019, 5, 7),
-    datetime.date(2019, 5, 8),
-    datetime.date(2019, 11, 8),
-)
-
-EXTRA_BCSE_WORKDAYS = (
-    datetime.date(2019, 5, 4),
-    datetime.date(2019, 5, 11),
-    datetime.date(2019, 11, 16),
-)
-
-
 def _get_todays_bcse_start(date: datetime.date):
-    return datetime.datetime(date.year, date.month, date.day, 9, 55)
+    return bcse_calendar.get_open(date)
 
 
 def _get_todays_bcse_finish(date: datetime.date):
-    return datetime.datetime(date.year, date.month, date.day, 13, 15)
+    return bcse_calendar.get_close(date)
 
 
 def bcse_is_open(current_dt: datetime.datetime) -> bool:
-    today = current_dt.date()
-
-    if is_holiday(today):
-        return False
-
-    if _get_todays_bcse_start(today) <= current_dt < _get_todays_bcse_finish(today):
-        return True
-
-    return False
+    return bcse_calendar.is_open(current_dt)
 
 
 def _get_open_time(current_dt: datetime.datetime) -> datetime.datetime:
@@ -77,54 +53,111 @@ def _get_open_time(current_dt: datetime.datetime) -> datetime.datetime:
     :param current_dt: we're sure that this is not a bcse work time.
     :return: closest future bcse open time.
     """
+    return bcse_calendar.get_next_open(current_dt)
 
-    if current_dt > _get_todays_bcse_finish(current_dt.date()) or is_holiday(current_dt.date()):
-        current_dt = datetime.datetime(current_dt.year, current_dt.month, current_dt.day) + datetime.timedelta(days=1)
-
-    while is_holiday(current_dt.date()):
-        current_dt += datetime.timedelta(days=1)
-
-
-    return _get_todays_bcse_start(current_dt.date())
 
-
-async def _build_initial_current_records(today: datetime.date):
+async def _build_initial_current_records(today: datetime.date, currency: str):
     return OrderedDict(await get_bcse_in(
-        'USD',
+        currency,
         _get_todays_bcse_start(today),
         datetime.datetime.fromordinal((today + datetime.timedelta(days=1)).toordinal())
     ))
 
 
+class _CurrencyReader:
+    """
+    Polling state of one currency.
+    """
+
+    def __init__(self, currency: str, today: datetime.date, current_records: OrderedDict):
+        self.currency = currency
+        self.current_records = current_records
+        self.poller = BcsePoller(open_datetime=_get_todays_bcse_start(today), start_timestamp=clock.time())
+        self.delta_sender = BcseDeltaSender(currency)
+        self.recorder = get_recorder(f'{BCSE_RECORDS}-{currency}', today)
+        self.next_poll = clock.time()
+
+
 @always_on_coroutine
 async def _listen_to_bcse_till(finish_datetime):
-    today = datetime.date.today()
-    current_records = await _build_initial_current_records(today)
+    """
+    All currencies are polled by one loop on one http session:
+    currencies which are due are polled concurrently and their new trades are inserted at once.
+    """
+    today = clock.today()
+    readers = [
+        _CurrencyReader(currency, today, await _build_initial_current_records(today, currency))
+        for currency in const.BCSE_CURRENCIES
+    ]
     redis = await create_redis()
     await mark_as_ready(BCSE_IS_READY)
 
-    async with ClientSession() as client:
-        while datetime.datetime.now() < finish_datetime:
-            await _extract_and_publish(
-                redis=redis,
-                client=client,
-                today=today,
-                current_records=current_records
-            )
-            await asyncio.sleep(const.BCSE_UPDATE_INTERVAL)
+    try:
+        # Keep-alive connections are reused by the following rounds.
+        connector = TCPConnector(limit_per_host=const.BCSE_CONNECTIONS)
+        async with ClientSession(connector=connector) as client:
+            while clock.now() < finish_datetime:
+                due_readers = [x for x in readers if x.next_poll <= clock.time()]
+
+                new_data = await asyncio.gather(*(
+                    _extract_and_publish(redis=redis, client=client, today=today, reader=x)
+                    for x in due_readers
+                ))
+
+                if any(new_data):
+                    asyncio.create_task(insert_bcse(list(chain.from_iterable(new_data))))
+
+                for reader, reader_new_data in zip(due_readers, new_data):
+                    interval = reader.poller.get_next_interval(clock.now(), has_new_trades=bool(reader_new_data))
+                    reader.next_poll = _align_poll_time(clock.time() + interval)
 
+                _inspect_pollers(readers)
 
-async def _extract_and_publish(today, current_records, redis, client):
-    data = await _extract_bcse_rates(client, today)
+                await clock.sleep(min(
+                    max(min(x.next_poll for x in readers) - clock.time(), 0),
+                    max((finish_datetime - clock.now()).total_seconds(), 0)
+                ))
+    finally:
+        for reader in readers:
+            if reader.recorder is not None:
+                reader.recorder.close()
+
+
+def _align_poll_time(timestamp: float) -> float:
+    """
+    Round poll time to the grid of the min interval,
+    so currencies are polled together and their trades are inserted at once.
+    """
+    step = const.BCSE_MIN_UPDATE_INTERVAL
+    return max(round(timestamp / step), math.floor(clock.time() / step) + 1) * step
+
+
+async def _extract_and_publish(
+        today: datetime.date,
+        redis: Redis,
+        client: ClientSession,
+        reader: _CurrencyReader
+) -> List[BcseData]:
+    """
+    :return: new trades. They are not inserted into the db yet.
+    """
+    data = await _extract_bcse_rates(
+        client,
+        today,
+        currency=reader.currency,
+        poller=reader.poller,
+        recorder=reader.recorder
+    )
     if data is None:
-        return
+        return []
 
     data = [(dt // 1000 - 60 * 60 * const.FIX_BCSE_TIMESTAMP, rate) for dt, rate in data]
-    current_timestamp = int(datetime.datetime.now().timestamp())
+    current_timestamp = int(clock.time())
+    current_records = reader.current_records
 
     new_data = [
         BcseData(
-            currency='USD',
+            currency=reader.currency,
             timestamp_operation=dt,
             timestamp_received=current_timestamp,
             rate=rate
@@ -135,78 +168,115 @@ async def _extract_and_publish(today, current_records, redis, client):
 
     logger.debug('New bcse data: %s', new_data)
 
-    asyncio.create_task(insert_bcse(new_data))
+    for x in new_data:
+        bars.add(BCSE_SERIES % x.currency, x.timestamp_operation, float(x.rate))
 
     if len(new_data) > 0:
-        asyncio.create_task(_notify_about_new_bcse(redis, data))
+        if reader.currency == const.BCSE_PREDICTOR_CURRENCY:
+            # Command data is built right away, so sequence numbers follow the order of trades.
+            asyncio.create_task(_notify_about_new_bcse(redis, reader.delta_sender.build(
+                all_rates=data,
+                new_rates=[(x.timestamp_operation, x.rate) for x in new_data]
+            )))
+
+        asyncio.create_task(_publish_new_bcse(redis, new_data))
 
+    reader.poller.add_new_trades((x.timestamp_operation for x in new_data), current_timestamp)
     current_records.update([(x.timestamp_operation, x.rate) for x in new_data])
+    return new_data
 
 
-async def _extract_bcse_rates(client: ClientSession, date: datetime.date) -> Optional[List[List]]:
+async def _extract_bcse_rates(
+        client: ClientSession,
+        date: datetime.date,
+        *,
+        currency: str='USD',
+        poller: BcsePoller=None,
+        recorder: Recorder=None
+) -> Optional[List[List]]:
+    """
+    :return: None if there is nothing new.
+    """
     try:
         response = await client.get(
-            f'https://banki24.by/exchange/last/USD/{date.isoformat()}'
+            f'{const.BCSE_BASE_URL}/exchange/last/{currency}/{date.isoformat()}',
+            headers=poller.get_request_headers() if poller is not None else None
         )
     except asyncio.CancelledError as e:
         raise e
     except:
-        logger.exception('Unexpected exception while extracting bcse rates.')
+        logger.exception('Unexpected exception while extracting %s bcse rates.', currency)
         return None
 
     raw_data = await response.read()
+    if recorder is not None and response.status != 304:
+        recorder.write(raw_data)
+
+    if poller is not None and not poller.is_changed(response.status, response.headers, raw_data):
+        return None
+
     raw_data = simplejson.loads(raw_data.decode(), parse_float=str)
     required_raw_data_item = next(
         filter(lambda x: x['color'] == const.BCSE_LAST_OPERATION_COLOR, raw_data),
         None
     )
     if required_raw_data_item is None:
-        logger.error('Unexpected bcse data format: %s', raw_data)
+        logger.error('Unexpected %s bcse data format: %s', currency, raw_data)
         return None
 
     if 'data' not in required_raw_data_item:
-        logger.info('No bcse data.')
+        logger.info('No %s bcse data.', currency)
     elif not required_raw_data_item['data']:
-        logger.debug('Empty bcse data.')
+        logger.debug('Empty %s bcse data.', currency)
 
     return required_raw_data_item.get('data')
 
 
 @always_on_coroutine
-async def _notify_about_new_bcse(redis: Redis, data: List[Sequence]):
+async def _notify_about_new_bcse(redis: Redis, data: dict):
     await send_predictor_command(
         redis,
         command=PredictCommand.NEW_BCSE,
-        data={
-            'rates': data
-        }
+        data=data
     )
 
 
-def is_holiday(date: datetime.date) -> bool:
-    if date in EXTRA_BCSE_WORKDAYS:
-        return False
+async def _publish_new_bcse(redis: Redis, new_data: List[BcseData]):
+    """
+    Notify api subscribers about new trades.
+    """
+    try:
+        await redis.publish(const.PUBLISH_BCSE_REDIS_CHANNEL, simplejson.dumps({
+            'currency': new_data[0].currency,
+            'rates': [(x.timestamp_operation, x.rate) for x in new_data],
+        }))
+    except asyncio.CancelledError as e:
+        raise e
+    except:
+        logger.exception("New bcse rates weren't published.")
 
-    if date in EXTRA_BCSE_HOLIDAYS:
-        return True
 
-    if (date.month, date.day) in EXTRA_BCSE_HOLIDAYS_ANY_YEAR:
-        return True
+@once_per(period=10 * 60)
+def _inspect_pollers(readers: List[_CurrencyReader]):
+    """
+    Log polling metrics.
+    """
+    current_timestamp = clock.time()
+    logger.info('BCSE polling: %s', {x.currency: x.poller.get_metrics(current_timestamp) for x in readers})
 
-    if date.isoweekday() in (6, 7):
-        return True
 
-    return False
+def is_holiday(date: datetime.date) -> bool:
+    return not bcse_calendar.is_trading_day(date)
 
 
 @always_on_coroutine
 async def listen_bcse():
     while True:
-        current_dt = datetime.datetime.now()
+        current_dt = clock.now()
 
         if bcse_is_open(current_dt):
             await _listen_to_bcse_till(_get_todays_bcse_finish(current_dt.date()))
-            current_dt = datetime.datetime.now()
+            current_dt = clock.now()
 
         else:
             await mark_as_ready(BCSE_IS_READY)
@@ -214,4 +284,4 @@ async def listen_bcse():
         next_time = _get_open_time(current_dt)
         wait_for = (next_time - current_dt).total_seconds()
         logger.info('BCSE reader gonna sleep for %s', wait_for)
-        await asyncio.sleep(wait_for)
+        await clock.sleep(wait_for)
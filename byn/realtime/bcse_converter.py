@@ -1,15 +1,17 @@
 import asyncio
 import datetime
 import logging
-from itertools import chain
 
 import numpy as np
 
+import byn.constants as const
 from byn.postgres_db import (
     get_latest_external_rates,
     get_external_rate_live,
 )
+from byn.realtime.day_store import DayScopedStore
 from byn.realtime.detailed_rates import RatesDetailedExtractor
+from byn.realtime.rate_timeline import live_rates
 
 
 logger = logging.getLogger(__name__)
@@ -17,9 +19,23 @@ logger = logging.getLogger(__name__)
 
 class BcseConverter:
     def __init__(self):
-        self.resolved_bcse_rates = {}
-        self.fake_rates = {}
-
+        self.resolved_bcse_rates = DayScopedStore()
+        self.fake_rates = DayScopedStore()
+
+    def start_day(self, day: datetime.date):
+        """
+        Evict everything which belongs to previous trading days.
+        """
+        evicted = self.resolved_bcse_rates.evict_before(day) + self.fake_rates.evict_before(day)
+        live_rates.drop_before(datetime.datetime.fromordinal(day.toordinal()).timestamp())
+        logger.info('%s cached items are evicted. Cache sizes: %s', evicted, self.get_metrics())
+
+    def get_metrics(self) -> dict:
+        return {
+            'resolved_bcse_rates': self.resolved_bcse_rates.get_metrics(),
+            'fake_rates': self.fake_rates.get_metrics(),
+            'rate_timeline': live_rates.get_metrics(),
+        }
 
     async def update(self, bcse_pairs):
         new_bcse = [x for x in bcse_pairs if x[0] not in self.resolved_bcse_rates]
@@ -31,8 +47,10 @@ class BcseConverter:
         start_dt = datetime.datetime.fromtimestamp(new_bcse[0][0])
         external_rates_extractor = await build_rates_extractor(start_dt)
 
-        for point in new_bcse:
-            self.resolved_bcse_rates[point[0]] = external_rates_extractor.get_by_timestamp(point[0])
+        timestamps = [x[0] for x in new_bcse]
+
+        for timestamp, rates in zip(timestamps, external_rates_extractor.get_by_timestamps(timestamps)):
+            self.resolved_bcse_rates[timestamp] = rates
 
     def get_by_timestamp(self, timestamp):
         return self.resolved_bcse_rates[timestamp]
@@ -43,23 +61,64 @@ class BcseConverter:
     def set_fake_rate(self, timestamp: int, rate: float):
         self.fake_rates[timestamp] = rate
 
+    def restore(self, *, resolved: dict, fake_rates: dict):
+        """
+        Put back what was resolved before a restart.
+        """
+        for timestamp, rates in resolved.items():
+            self.resolved_bcse_rates[timestamp] = rates
+
+        for timestamp, rate in fake_rates.items():
+            self.fake_rates[timestamp] = rate
+
 
 async def build_rates_extractor(start_dt: datetime.datetime):
+    start_timestamp = start_dt.timestamp()
+
+    if not live_rates.covers(const.FOREXPF_CURRENCIES_TO_LISTEN, start_timestamp):
+        logger.info('Rate timeline does not cover %s. Loading it from db.', start_dt)
+        live_rates.seed(await load_external_rates(start_dt))
+
+    return RatesDetailedExtractor(live_rates.get_pairs_since(start_timestamp))
+
+
+async def load_external_rates(start_dt: datetime.datetime):
     external_live_data = await get_external_rate_live(start_dt=start_dt - datetime.timedelta(minutes=1))
     external_historical_data = await get_latest_external_rates(start_dt=start_dt, at_least_one=True)
-    return RatesDetailedExtractor(
-        _join_external_rates(external_live_data, external_historical_data)
-    )
+    return _join_external_rates(external_live_data, external_historical_data)
 
 
-def _join_external_rates(one, two):
-    currencies = set(one.keys())
-    currencies.update(two.keys())
+def _join_external_rates(live, historical):
+    """
+    :param live: currency -> (timestamp, rate) pairs of live ticks ordered by timestamp.
+    :param historical: currency -> (timestamp, rate) pairs of bar opens/closes ordered by timestamp.
+    :return: currency -> (n, 2) float64 array ordered by timestamp.
+    """
+    currencies = set(live.keys())
+    currencies.update(historical.keys())
 
     return {
-        currency: np.array(tuple(
-            sorted(chain(one.get(currency, ()), two.get(currency, ())), key=lambda x: x[0])
-        ))
+        currency: _merge_sorted_pairs(
+            _pairs_to_array(live.get(currency, ())),
+            _pairs_to_array(historical.get(currency, ())),
+        )
         for currency in currencies
     }
 
+
+def _pairs_to_array(pairs) -> np.ndarray:
+    return np.array(list(pairs), dtype='float64').reshape(-1, 2)
+
+
+def _merge_sorted_pairs(live: np.ndarray, historical: np.ndarray) -> np.ndarray:
+    """
+    Linear merge of two arrays which are already ordered by timestamp.
+    A live tick wins over a historical pair with the same timestamp.
+    """
+    if not len(live) or not len(historical):
+        return live if len(live) else historical
+
+    positions = np.searchsorted(live[:, 0], historical[:, 0])
+    is_duplicate = live[np.minimum(positions, len(live) - 1), 0] == historical[:, 0]
+
+    return np.insert(live, positions[~is_duplicate], historical[~is_duplicate], axis=0)
@@ -0,0 +1,108 @@
+"""
+NEW_BCSE commands carry only new trades.
+
+Every command has an epoch (a new one per bcse reader start) and a sequence number within the epoch.
+The first command of an epoch carries all trades of the day (*full*).
+A receiver which sees a gap in the sequence has to resync from the full list of today's trades.
+"""
+import logging
+import uuid
+from typing import Iterable, Sequence
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+FULL = 'FULL'
+DELTA = 'DELTA'
+RESYNC = 'RESYNC'
+
+
+class BcseDeltaSender:
+    def __init__(self, currency: str):
+        self.currency = currency
+        self.epoch = uuid.uuid4().hex
+        self.sequence = 0
+
+    def build(self, *, all_rates: Sequence[Sequence], new_rates: Sequence[Sequence]) -> dict:
+        """
+        :return: data of the next NEW_BCSE command.
+        """
+        full = self.sequence == 0
+        data = {
+            'currency': self.currency,
+            'epoch': self.epoch,
+            'sequence': self.sequence,
+            'full': full,
+            'rates': all_rates if full else new_rates,
+        }
+        self.sequence += 1
+        return data
+
+
+class BcseDeltaReceiver:
+    def __init__(self):
+        self.epoch = None
+        self.sequence = None
+        self.resyncs = 0
+
+    def receive(self, data: dict) -> str:
+        """
+        :return: FULL if *data* has all trades of the day,
+            DELTA if it has trades which follow the previous command,
+            RESYNC if some previous commands are missing.
+        """
+        if 'sequence' not in data:
+            # Commands of older bcse readers always carry the full list.
+            self.epoch = self.sequence = None
+            return FULL
+
+        if data['full']:
+            kind = FULL
+        elif data['epoch'] == self.epoch and data['sequence'] == self.sequence + 1:
+            kind = DELTA
+        else:
+            logger.info(
+                'NEW_BCSE %s:%s does not follow %s:%s.',
+                data['epoch'], data['sequence'], self.epoch, self.sequence
+            )
+            self.resyncs += 1
+            kind = RESYNC
+
+        self.epoch = data['epoch']
+        self.sequence = data['sequence']
+        return kind
+
+
+class RowBuffer:
+    """
+    2d array which grows in place: appending k rows costs O(k) amortized.
+    """
+
+    def __init__(self, columns: int, dtype, capacity: int=256):
+        self._data = np.empty((capacity, columns), dtype=dtype)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def extend(self, rows: Iterable[Sequence]):
+        rows = list(rows)
+        required = self._size + len(rows)
+
+        if required > len(self._data):
+            grown = np.empty((max(required, 2 * len(self._data)), self._data.shape[1]), dtype=self._data.dtype)
+            grown[:self._size] = self._data[:self._size]
+            self._data = grown
+
+        for i, row in enumerate(rows, start=self._size):
+            self._data[i] = row
+
+        self._size = required
+
+    def view(self) -> np.ndarray:
+        """
+        :return: rows which were added. They are not copied: rows added later don't change the result.
+        """
+        return self._data[:self._size]
@@ -0,0 +1,106 @@
+"""
+Conditional and adaptive polling of bcse rates.
+
+* A response which is not modified (304) or has the same body as the previous one isn't parsed.
+* Polls are frequent around the session open and after a trade and get rarer while the market is quiet.
+"""
+import datetime
+import hashlib
+from typing import Iterable, Mapping
+
+import byn.constants as const
+from byn.realtime.tick_queue import LatencyStats
+
+
+class BcsePoller:
+    def __init__(
+            self,
+            *,
+            open_datetime: datetime.datetime,
+            start_timestamp: float,
+            min_interval: float=const.BCSE_MIN_UPDATE_INTERVAL,
+            max_interval: float=const.BCSE_MAX_UPDATE_INTERVAL,
+            backoff: float=const.BCSE_UPDATE_BACKOFF,
+            open_period: datetime.timedelta=const.BCSE_OPEN_PERIOD
+    ):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.frequent_till = open_datetime + open_period
+        self.interval = min_interval
+
+        self.etag = None
+        self.last_modified = None
+        self._body_hash = None
+
+        self.start_timestamp = start_timestamp
+        self.polls = 0
+        self.not_modified = 0
+        self.unchanged = 0
+        self.downloaded_bytes = 0
+        self.parsed_bytes = 0
+        self.detection_latency = LatencyStats()
+
+    def get_request_headers(self) -> dict:
+        headers = {}
+
+        if self.etag is not None:
+            headers['If-None-Match'] = self.etag
+
+        if self.last_modified is not None:
+            headers['If-Modified-Since'] = self.last_modified
+
+        return headers
+
+    def is_changed(self, status: int, headers: Mapping[str, str], body: bytes) -> bool:
+        """
+        :return: False if the response body doesn't need to be parsed.
+        """
+        self.polls += 1
+
+        if status == 304:
+            self.not_modified += 1
+            return False
+
+        self.etag = headers.get('ETag')
+        self.last_modified = headers.get('Last-Modified')
+        self.downloaded_bytes += len(body)
+
+        body_hash = hashlib.blake2b(body, digest_size=16).digest()
+        if body_hash == self._body_hash:
+            self.unchanged += 1
+            return False
+
+        self._body_hash = body_hash
+        self.parsed_bytes += len(body)
+        return True
+
+    def add_new_trades(self, timestamps: Iterable[int], current_timestamp: float):
+        """
+        :param timestamps: operation timestamps of newly found trades.
+        """
+        for timestamp in timestamps:
+            # Trades made before the reader has started aren't late detections.
+            if timestamp >= self.start_timestamp:
+                self.detection_latency.add(current_timestamp - timestamp)
+
+    def get_next_interval(self, current_dt: datetime.datetime, *, has_new_trades: bool) -> float:
+        if has_new_trades or current_dt < self.frequent_till:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.interval * self.backoff, self.max_interval)
+
+        return self.interval
+
+    def get_metrics(self, current_timestamp: float) -> dict:
+        hours = max(current_timestamp - self.start_timestamp, 1) / 3600
+
+        return {
+            'polls': self.polls,
+            'not_modified': self.not_modified,
+            'unchanged': self.unchanged,
+            'interval': self.interval,
+            'downloaded_bytes_per_hour': int(self.downloaded_bytes / hours),
+            'parsed_bytes_per_hour': int(self.parsed_bytes / hours),
+            'detection_latency': self.detection_latency.get_metrics(),
+        }
@@ -0,0 +1,218 @@
+"""
+Fan-out of already serialized messages to websocket clients.
+
+Every client has a bounded queue of pending messages per topic and a single sender task.
+When a client can't keep up, the oldest pending messages of a topic are dropped (latest wins),
+a client which is stuck on one message longer than a send timeout is disconnected.
+
+Clients in delta mode get delta frames while they follow a topic without gaps
+and a full message (keyframe) otherwise.
+"""
+import asyncio
+import logging
+from collections import deque
+from typing import Iterable, Iterator, Optional
+
+from aiohttp import WSCloseCode
+
+import byn.constants as const
+
+
+logger = logging.getLogger(__name__)
+
+
+class Subscriber:
+    def __init__(
+            self,
+            ws,
+            *,
+            delta: bool=False,
+            max_pending: int=const.WS_MAX_PENDING_MESSAGES,
+            send_timeout: float=const.WS_SEND_TIMEOUT
+    ):
+        self.ws = ws
+        # Managed by Broadcaster.
+        self.topics = set()
+        self.delta = delta
+        self.max_pending = max_pending
+        self.send_timeout = send_timeout
+        self.dropped = 0
+        self.sent = 0
+        self.is_stuck = False
+
+        self._pending = {}      # type: Dict[str, deque]
+        # Topics which a client follows without gaps, so delta frames are applicable.
+        self._synced = set()
+        self._has_pending = asyncio.Event()
+        self._task = asyncio.create_task(self._sender())
+
+    @property
+    def pending(self) -> int:
+        return sum(len(x) for x in self._pending.values())
+
+    def push(self, topic: str, payload: str, delta_payload: str=None):
+        """
+        :param payload: full message.
+        :param delta_payload: changes since the previously pushed message of the topic.
+        """
+        queue = self._pending.get(topic)
+        if queue is None:
+            queue = self._pending[topic] = deque(maxlen=self.max_pending)
+
+        if len(queue) == queue.maxlen:
+            self.dropped += 1
+            self._synced.discard(topic)
+
+        queue.append((payload, delta_payload))
+        self._has_pending.set()
+
+    def forget(self, topic: str):
+        self._pending.pop(topic, None)
+        self._synced.discard(topic)
+
+    def stop(self):
+        self._task.cancel()
+
+    def _pop(self) -> Optional[str]:
+        for topic, queue in self._pending.items():
+            if not queue:
+                continue
+
+            payload, delta_payload = queue.popleft()
+
+            if self.delta and delta_payload is not None and topic in self._synced:
+                return delta_payload
+
+            self._synced.add(topic)
+            return payload
+
+        return None
+
+    async def _sender(self):
+        while True:
+            await self._has_pending.wait()
+
+            payload = self._pop()
+            while payload is not None:
+                try:
+                    await asyncio.wait_for(self.ws.send_str(payload), self.send_timeout)
+                except asyncio.TimeoutError:
+                    logger.info('Client is stuck for %s seconds. Disconnecting.', self.send_timeout)
+                    self.is_stuck = True
+                    await self._disconnect()
+                    return
+                except asyncio.CancelledError as e:
+                    raise e
+                except Exception as e:
+                    logger.debug('Failed to send a message: %s', e)
+                    return
+
+                self.sent += 1
+                payload = self._pop()
+
+            self._has_pending.clear()
+
+    async def _disconnect(self):
+        try:
+            await asyncio.wait_for(self.ws.close(code=WSCloseCode.GOING_AWAY), self.send_timeout)
+        except asyncio.CancelledError as e:
+            raise e
+        except Exception:
+            logger.debug('Failed to close a stuck client gracefully.')
+
+
+class Broadcaster:
+    """
+    Set of connected websockets with O(1) add/remove and per-topic subscriptions.
+
+    The last published message of every topic is kept as a snapshot
+    and sent to a client once it subscribes for the topic.
+    """
+
+    def __init__(self, **subscriber_kwargs):
+        self._subscribers = {}  # type: Dict[object, Subscriber]
+        self._topic_subscribers = {x: {} for x in const.WS_TOPICS}     # type: Dict[str, Dict[object, Subscriber]]
+        self._subscriber_kwargs = subscriber_kwargs
+        self.snapshots = {}     # type: Dict[str, str]
+
+    def __len__(self):
+        return len(self._subscribers)
+
+    def __iter__(self) -> Iterator:
+        return iter(list(self._subscribers))
+
+    def add(
+            self,
+            ws,
+            *,
+            delta: bool=False,
+            topics: Iterable[str]=const.WS_DEFAULT_TOPICS,
+            with_snapshots: bool=True
+    ) -> Subscriber:
+        subscriber = Subscriber(ws, delta=delta, **self._subscriber_kwargs)
+        self._subscribers[ws] = subscriber
+        self.subscribe(ws, topics, with_snapshots=with_snapshots)
+        return subscriber
+
+    def get(self, ws) -> Optional[Subscriber]:
+        return self._subscribers.get(ws)
+
+    def remove(self, ws):
+        subscriber = self._subscribers.pop(ws, None)
+        if subscriber is None:
+            return
+
+        for topic in subscriber.topics:
+            self._topic_subscribers[topic].pop(ws, None)
+
+        subscriber.stop()
+
+    def subscribe(self, ws, topics: Iterable[str], *, with_snapshots: bool=True):
+        subscriber = self._subscribers.get(ws)
+        if subscriber is None:
+            return
+
+        for topic in topics:
+            if topic not in self._topic_subscribers or topic in subscriber.topics:
+                continue
+
+            subscriber.topics.add(topic)
+            self._topic_subscribers[topic][ws] = subscriber
+
+            if with_snapshots and topic in self.snapshots:
+                subscriber.push(topic, self.snapshots[topic])
+
+    def unsubscribe(self, ws, topics: Iterable[str]):
+        subscriber = self._subscribers.get(ws)
+        if subscriber is None:
+            return
+
+        for topic in topics:
+            if topic in subscriber.topics:
+                subscriber.topics.discard(topic)
+                subscriber.forget(topic)
+                self._topic_subscribers[topic].pop(ws, None)
+
+    def has_subscribers(self, topic: str) -> bool:
+        return bool(self._topic_subscribers[topic])
+
+    def publish(self, payload: str, delta_payload: str=None, *, topic: str=const.WS_PREDICTION_TOPIC):
+        self.snapshots[topic] = payload
+
+        for subscriber in self._topic_subscribers[topic].values():
+            subscriber.push(topic, payload, delta_payload)
+
+    def forget(self, topic: str):
+        """
+        Drop the snapshot of a topic which is skipped while nobody follows it.
+        """
+        self.snapshots.pop(topic, None)
+
+    def get_metrics(self) -> dict:
+        return {
+            'clients': len(self._subscribers),
+            'topics': {topic: len(x) for topic, x in self._topic_subscribers.items()},
+            'pending': sum(x.pending for x in self._subscribers.values()),
+            'dropped': sum(x.dropped for x in self._subscribers.values()),
+            'stuck': sum(x.is_stuck for x in self._subscribers.values()),
+        }
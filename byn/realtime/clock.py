@@ -0,0 +1,90 @@
+"""
+Time source of byn.realtime.
+
+The realtime pipeline reads time and sleeps through this module,
+so a simulation may run a trading day in minutes with an accelerated clock:
+    clock.use(AcceleratedClock(start=datetime.datetime(2019, 5, 6, 9), speed=600))
+"""
+import asyncio
+import datetime
+import time as _time
+from typing import Union
+
+
+class SystemClock:
+    speed = 1
+
+    def time(self) -> float:
+        return _time.time()
+
+    def monotonic(self) -> float:
+        return _time.monotonic()
+
+    async def sleep(self, seconds: float):
+        await asyncio.sleep(seconds)
+
+
+class AcceleratedClock:
+    """
+    Virtual time which starts at *start* and goes *speed* times faster than the real one.
+    """
+
+    def __init__(self, *, start: Union[datetime.datetime, float], speed: float):
+        if speed <= 0:
+            raise ValueError(speed)
+
+        self.speed = speed
+        self._start = start.timestamp() if isinstance(start, datetime.datetime) else start
+        self._started = _time.monotonic()
+
+    def time(self) -> float:
+        return self._start + (_time.monotonic() - self._started) * self.speed
+
+    def monotonic(self) -> float:
+        # Virtual time never goes back.
+        return self.time()
+
+    async def sleep(self, seconds: float):
+        await asyncio.sleep(max(seconds, 0) / self.speed)
+
+
+_clock = SystemClock()
+
+
+def use(clock) -> object:
+    """
+    :return: previous clock.
+    """
+    global _clock
+    previous, _clock = _clock, clock
+    return previous
+
+
+def time() -> float:
+    """
+    Wall clock time: market hours, day rollover and stored timestamps follow it.
+    """
+    return _clock.time()
+
+
+def monotonic() -> float:
+    """
+    Never goes back, even if the system time is stepped. Use it to measure durations.
+    """
+    return _clock.monotonic()
+
+
+def now() -> datetime.datetime:
+    return datetime.datetime.fromtimestamp(_clock.time())
+
+
+def today() -> datetime.date:
+    return now().date()
+
+
+def speed() -> float:
+    return _clock.speed
+
+
+async def sleep(seconds: float):
+    await _clock.sleep(seconds)
@@ -0,0 +1,81 @@
+import datetime
+from typing import Any, Dict
+
+
+class DayScopedStore:
+    """
+    timestamp -> value mapping partitioned by a (local) day of the timestamp.
+
+    Old days are never read again, so only *max_days* latest days are kept
+    and *evict_before* drops everything before a new trading day explicitly.
+    """
+
+    def __init__(self, max_days: int=2):
+        if max_days < 1:
+            raise ValueError(max_days)
+
+        self.max_days = max_days
+        self._days = {}     # type: Dict[datetime.date, Dict[int, Any]]
+
+    @staticmethod
+    def _get_day(timestamp) -> datetime.date:
+        return datetime.date.fromtimestamp(int(timestamp))
+
+    def __contains__(self, timestamp) -> bool:
+        return timestamp in self._days.get(self._get_day(timestamp), ())
+
+    def __getitem__(self, timestamp):
+        return self._days[self._get_day(timestamp)][timestamp]
+
+    def __setitem__(self, timestamp, value):
+        day = self._get_day(timestamp)
+
+        if day not in self._days:
+            self._days[day] = {}
+            self._evict_oldest(keep=day)
+
+        self._days[day][timestamp] = value
+
+    def __len__(self):
+        return sum(len(x) for x in self._days.values())
+
+    def get(self, timestamp, default=None):
+        try:
+            return self[timestamp]
+        except KeyError:
+            return default
+
+    def items(self):
+        for day in sorted(self._days):
+            yield from self._days[day].items()
+
+    def get_day(self, day: datetime.date) -> Dict[int, Any]:
+        """
+        :return: copy of items of *day*.
+        """
+        return dict(self._days.get(day, {}))
+
+    def evict_before(self, day: datetime.date) -> int:
+        """
+        :return: number of evicted items.
+        """
+        evicted = 0
+
+        for old_day in [x for x in self._days if x < day]:
+            evicted += len(self._days.pop(old_day))
+
+        return evicted
+
+    def _evict_oldest(self, *, keep: datetime.date):
+        for day in sorted(self._days):
+            if len(self._days) <= self.max_days:
+                break
+
+            if day != keep:
+                del self._days[day]
+
+    def get_metrics(self) -> dict:
+        return {
+            'days': len(self._days),
+            'items': len(self),
+        }
@@ -0,0 +1,44 @@
+"""
+Delta frames for the websocket prediction stream.
+"""
+from typing import Optional
+
+
+def get_delta(old: Optional[dict], new: dict) -> dict:
+    """
+    :return: nested dict of *new* items which differ from *old* ones. Removed keys are set to None.
+    """
+    if old is None:
+        return new
+
+    delta = {}
+
+    for key, value in new.items():
+        old_value = old.get(key)
+
+        if isinstance(value, dict) and isinstance(old_value, dict):
+            nested_delta = get_delta(old_value, value)
+            if nested_delta:
+                delta[key] = nested_delta
+
+        elif key not in old or value != old_value:
+            delta[key] = value
+
+    for key in old.keys() - new.keys():
+        delta[key] = None
+
+    return delta
+
+
+def apply_delta(old: dict, delta: dict) -> dict:
+    new = dict(old)
+
+    for key, value in delta.items():
+        if isinstance(value, dict) and isinstance(new.get(key), dict):
+            new[key] = apply_delta(new[key], value)
+        elif value is None:
+            new.pop(key, None)
+        else:
+            new[key] = value
+
+    return new
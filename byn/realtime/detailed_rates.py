@@ -1,27 +1,31 @@
 from typing import Iterable
 
 import numpy as np
-from scipy.interpolate import interp1d
 
 from byn.datatypes import LocalRates
 
 
+# Column order of arrays returned by RatesDetailedExtractor.get_array_by_timestamps
+CURRENCIES = 'EUR', 'RUB', 'UAH', 'DXY'
+
+
 class OneRateDetailedExtractor:
-    def __init__(self, pairs: np.ndarray):
-        self._timestamps = pairs[:, 0]
-        self._rates = pairs[:,1]
+    """
+    Linear interpolation of a rate. Timestamps out of the known range get the closest known rate.
+    """
 
-        if len(pairs) > 1:
-            self.model = interp1d(self._timestamps, self._rates)
+    def __init__(self, pairs: np.ndarray):
+        self._timestamps = np.asarray(pairs[:, 0], dtype='float64')
+        self._rates = np.asarray(pairs[:, 1], dtype='float64')
 
     def get_by_timestamp(self, timestamp) -> float:
-        if timestamp > self._timestamps[-1]:
-            return float(self._rates[-1])
+        return float(np.interp(timestamp, self._timestamps, self._rates))
 
-        return self.model(timestamp).item()
+    def get_array_by_timestamps(self, timestamps: np.ndarray) -> np.ndarray:
+        return np.interp(timestamps, self._timestamps, self._rates)
 
     def get_by_timestamps(self, timestamps: Iterable[int]) -> Iterable[float]:
-        return [self.get_by_timestamp(x) for x in timestamps]
+        return self.get_array_by_timestamps(np.asarray(timestamps, dtype='float64')).tolist()
 
 
 class RatesDetailedExtractor:
@@ -39,13 +43,20 @@ class RatesDetailedExtractor:
             dxy=self.extractors['DXY'].get_by_timestamp(timestamp),
         )
 
-    def get_by_timestamps(self, timestamps: Iterable[int]) -> Iterable[LocalRates]:
-        eur = self.extractors['EUR'].get_by_timestamps(timestamps)
-        rub = self.extractors['RUB'].get_by_timestamps(timestamps)
-        uah = self.extractors['UAH'].get_by_timestamps(timestamps)
-        dxy = self.extractors['DXY'].get_by_timestamps(timestamps)
+    def get_array_by_timestamps(self, timestamps: Iterable[int]) -> np.ndarray:
+        """
+        :return: (len(timestamps), 4) float64 array. Columns are ordered as CURRENCIES are.
+        """
+        timestamps = np.asarray(timestamps, dtype='float64')
+        rates = np.empty((len(timestamps), len(CURRENCIES)), dtype='float64')
+
+        for i, currency in enumerate(CURRENCIES):
+            rates[:, i] = self.extractors[currency].get_array_by_timestamps(timestamps)
 
-        for eur, rub, uah, dxy in zip(eur, rub, uah, dxy):
+        return rates
+
+    def get_by_timestamps(self, timestamps: Iterable[int]) -> Iterable[LocalRates]:
+        for eur, rub, uah, dxy in self.get_array_by_timestamps(timestamps).tolist():
             yield LocalRates(
                 eur=eur,
                 rub=rub,
@@ -4,22 +4,27 @@ profinance.ru (forexpf) long poll ===> redis cache & db
 import asyncio
 import logging
 import datetime
-from asyncio.queues import Queue
+from functools import partial
+from typing import List
 
-from aiohttp.client import ClientSession, ClientTimeout
+import simplejson
 
 from byn import constants as const
-from byn.postgres_db import insert_external_rate_live
+from byn.postgres_db import insert_external_rates_live
 from byn.datatypes import ExternalRateData
-from byn.forexpf import sse_to_tuple, CURRENCY_CODES
-from byn.utils import always_on_coroutine, create_redis, once_per
+from byn.trading_calendar import forexpf_calendar
+from byn.utils import always_on_coroutine, create_redis, once_per, EnumAwareEncoder
 from byn.tasks.external_rates import build_task_update_all_currencies
 from byn.tasks.launch import app
 from byn.realtime.synchronization import mark_as_ready, EXTERNAL_LIVE, EXTERNAL_HISTORY
+from byn.realtime.rate_timeline import live_rates
+from byn.realtime import clock
+from byn.realtime.tick_queue import TickQueue
+from byn.realtime.live_rate_store import LiveRateWriter
+from byn.realtime.forexpf_sessions import TickDeduplicator, run_sessions
 
 
 logger = logging.getLogger(__name__)
-forexpf_code_to_currency = {y: x for x, y in CURRENCY_CODES.items()}
 
 
 @app.task(autoretry_for=(Exception, ))
@@ -29,149 +34,121 @@ def mark_load_history_ready():
 
 @always_on_coroutine
 async def listen_forexpf():
-    current_dt = datetime.datetime.now()
+    current_dt = clock.now()
 
     (await build_task_update_all_currencies() | mark_load_history_ready.si())()
 
     if not _forexpf_works(current_dt):
         await mark_as_ready(EXTERNAL_LIVE)
-        wait_for = _get_time_to_monday(current_dt)
+        wait_for = _get_time_to_open(current_dt)
         logger.info('Gonna wait for %s seconds for forexpf to start.', wait_for)
-        await asyncio.sleep(wait_for)
+        await clock.sleep(wait_for)
 
-    queue = Queue()
+    queue = TickQueue()
     for _ in range(const.FOREXPF_WORKERS_COUNT):
-        asyncio.create_task(_worker(queue))
+        asyncio.create_task(_persist_worker(queue))
 
-    await _producer(queue)
+    asyncio.create_task(_cache_worker(queue))
 
+    deduplicator = TickDeduplicator()
 
-@always_on_coroutine
-async def _producer(queue: Queue):
-    async with ClientSession() as long_poll_client:
-        long_poll_response = await long_poll_client.get(
-            const.FOREXPF_LONG_POLL_SSE,
-            timeout=ClientTimeout(connect=20)
-        )
-
-        session_id = None
-
-        async for line in long_poll_response.content:
-            logger.debug('Raw connection data: %s', line)
-            data = sse_to_tuple(line)
-
-            if data is None:
-                continue
-
-            if len(data) == 2:
-                session_id = data[1]
-
-            break
+    def on_ticks(ticks: List[ExternalRateData]):
+        # Feed the in-memory timeline for bcse conversion.
+        for data in ticks:
+            live_rates.append_tick(data.currency, data.timestamp_open, data.timestamp_received, data.close)
 
-        if session_id is None:
-            logger.error('Failed to get session id.')
-            return
+        queue.put(ticks)
+        _inspect_queue(queue, deduplicator)
 
-        logger.debug('sid: %s', session_id)
+    await run_sessions(
+        on_ticks,
+        deduplicator=deduplicator,
+        on_ready=partial(mark_as_ready, EXTERNAL_LIVE),
+    )
 
-        async with ClientSession() as subscribe_client:
-            for currency in const.FOREXPF_CURRENCIES_TO_LISTEN:
-                response = await subscribe_client.get(
-                    'https://charts.profinance.ru/html/tw/subscribe?'
-                    f'sid={session_id}&symbol={CURRENCY_CODES[currency]}&resolution=1&subscribe=true'
-                )
 
-                if response.status == 200:
-                    logger.debug('Subscribed to %s', currency)
-                else:
-                    logger.error("Couldn't subscribe to %s", currency)
-
-        await mark_as_ready(EXTERNAL_LIVE)
-        await _sse_reader(long_poll_response, queue)
-
-
-async def _sse_reader(long_poll_response, queue: Queue):
-    async for line in long_poll_response.content:
-        logger.debug(line)
-
-        data = sse_to_tuple(line)
+@always_on_coroutine
+async def _persist_worker(queue: TickQueue):
+    while True:
+        batch = await queue.get_ticks()
+        logger.debug(batch)
 
-        if data is None:
-            continue
+        start = clock.monotonic()
 
         try:
-            _, product_id, resolution, timestamp_open, rate_open, high, low, close, volume = data
-        except ValueError:
-            logger.exception("Couldn't split an event:\n%s", data)
-            continue
+            await insert_external_rates_live(batch)
+        except asyncio.CancelledError as e:
+            raise e
 
-        try:
-            await queue.put(ExternalRateData(
-                currency=forexpf_code_to_currency[int(product_id)],
-                timestamp_open=int(timestamp_open),
-                rate_open=rate_open,
-                close=close,
-                low=low,
-                high=high,
-                volume=int(volume),
-                timestamp_received=datetime.datetime.now().timestamp(),
-            ))
-        except ValueError:
-            logger.exception("Error while sending external rate data into queue.")
-            continue
-
-        _inspect_queue(queue)
+        except:
+            logger.exception("External rate records weren't saved into db.")
+
+        queue.latency['persist_write'].add(clock.monotonic() - start)
 
 
 @always_on_coroutine
-async def _worker(queue: Queue):
+async def _cache_worker(queue: TickQueue):
+    """
+    Only the latest rate of a currency matters for redis and predictions.
+    """
     redis_client = await create_redis()
+    writer = LiveRateWriter()
+    await writer.start(redis_client)
 
     while True:
-        data = await queue.get()    # type: ExternalRateData
-        logger.debug(data)
+        latest = await queue.get_latest()
+        start = clock.monotonic()
 
-        # Persist.
-        asyncio.create_task(insert_external_rate_live(data))
-        
-        # Save in redis.
+        # Save in redis and notify api subscribers in one round trip.
         try:
-            await redis_client.mset(
-                data.currency, data.close,
-                f'{data.currency}_timestamp', int(data.timestamp_received)
-            )
+            pipeline = redis_client.pipeline()
+            writer.write(pipeline, latest)
+
+            for data in latest:
+                pipeline.publish(const.PUBLISH_EXTERNAL_REDIS_CHANNEL, simplejson.dumps({
+                    'currency': data.currency,
+                    'timestamp_open': data.timestamp_open,
+                    'timestamp_received': data.timestamp_received,
+                    'close': data.close,
+                }, cls=EnumAwareEncoder))
+
+            await pipeline.execute()
         except asyncio.CancelledError as e:
             raise e
 
         except:
             logger.exception("External rate record wasn't saved into redis cache.")
 
+        queue.latency['cache_write'].add(clock.monotonic() - start)
+
 
 def _forexpf_works(current_dt: datetime.datetime) -> bool:
-    return current_dt.isoweekday() not in (6, 7)
+    return forexpf_calendar.is_open(current_dt)
 
 
-def _get_time_to_monday(current_dt: datetime.datetime) -> float:
-    next_monday = current_dt.date() + datetime.timedelta(days=8 - current_dt.isoweekday())
-    return (datetime.datetime.fromordinal(next_monday.toordinal()) - current_dt).total_seconds()
+def _get_time_to_open(current_dt: datetime.datetime) -> float:
+    return (forexpf_calendar.get_next_open(current_dt) - current_dt).total_seconds()
 
 
 @once_per(period=10)
-def _inspect_queue(queue: Queue):
+def _inspect_queue(queue: TickQueue, deduplicator: TickDeduplicator):
     """
-    Log queue size.
+    Log queue metrics.
     """
     queue_size = queue.qsize()
-    if queue_size < 2:
-        return
 
-    if queue_size > 15:
+    if queue_size > const.FOREXPF_MAX_PENDING_TICKS // 2:
         logging_level = logging.ERROR
-    elif queue_size > 10:
+    elif queue_size > 100:
         logging_level = logging.WARNING
-    elif queue_size > 5:
+    elif queue_size > 10:
         logging_level = logging.INFO
     else:
         logging_level = logging.DEBUG
 
-    logger.log(logging_level, 'External rates queue size: %s', queue_size)
+    logger.log(
+        logging_level,
+        'External rates queue: %s, ticks: %s',
+        queue.get_metrics(),
+        deduplicator.get_metrics()
+    )
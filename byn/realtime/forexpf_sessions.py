@@ -0,0 +1,173 @@
+"""
+Several concurrent forexpf long poll sessions feeding one stream of unique ticks.
+
+All sessions are hot: each one is subscribed and read all the time,
+so there is no gap in ticks while a dropped session reconnects.
+"""
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Awaitable, Callable, Iterable, List, Optional
+
+from aiohttp.client import ClientSession, ClientTimeout
+
+import byn.constants as const
+from byn.datatypes import ExternalRateData
+from byn.forexpf import CURRENCY_CODES, SseTickParser, sse_to_tuple
+from byn.realtime import clock
+from byn.realtime.recording import get_recorder, FOREXPF as FOREXPF_RECORDS
+from byn.utils import always_on_coroutine
+
+
+logger = logging.getLogger(__name__)
+
+
+class TickDeduplicator:
+    """
+    Passes a tick only once. (currency, timestamp_open, volume) identifies a tick.
+    """
+
+    def __init__(self, size: int=const.FOREXPF_DEDUP_SIZE):
+        self.size = size
+        self.unique = 0
+        self.duplicates = 0
+        self._seen = OrderedDict()
+
+    def filter(self, ticks: Iterable[ExternalRateData]) -> List[ExternalRateData]:
+        unique_ticks = []
+
+        for tick in ticks:
+            key = tick.currency, tick.timestamp_open, tick.volume
+
+            if key in self._seen:
+                self.duplicates += 1
+                continue
+
+            self._seen[key] = None
+            if len(self._seen) > self.size:
+                self._seen.popitem(last=False)
+
+            unique_ticks.append(tick)
+
+        self.unique += len(unique_ticks)
+        return unique_ticks
+
+    def get_metrics(self) -> dict:
+        return {
+            'unique': self.unique,
+            'duplicates': self.duplicates,
+        }
+
+
+async def run_sessions(
+        on_ticks: Callable[[List[ExternalRateData]], None],
+        *,
+        deduplicator: TickDeduplicator,
+        on_ready: Callable[[], Awaitable]=None,
+        number: int=const.FOREXPF_SESSIONS,
+        sse_url: str=const.FOREXPF_LONG_POLL_SSE,
+        subscribe_url: str=const.FOREXPF_SUBSCRIBE_URL,
+        currencies: Iterable[str]=const.FOREXPF_CURRENCIES_TO_LISTEN,
+        reconnect_delay: float=const.FOREXPF_RECONNECT_DELAY
+):
+    """
+    :param on_ticks: gets unique ticks as soon as any session receives them.
+    :param on_ready: is awaited whenever a session is subscribed.
+    """
+    def on_session_ticks(ticks: List[ExternalRateData]):
+        ticks = deduplicator.filter(ticks)
+        if ticks:
+            on_ticks(ticks)
+
+    await asyncio.gather(*(
+        _keep_session(
+            i,
+            on_session_ticks,
+            on_ready=on_ready,
+            sse_url=sse_url,
+            subscribe_url=subscribe_url,
+            currencies=tuple(currencies),
+            reconnect_delay=reconnect_delay,
+        ) for i in range(number)
+    ))
+
+
+@always_on_coroutine
+async def _keep_session(session_number: int, on_ticks, *, reconnect_delay: float, **kwargs):
+    while True:
+        await _run_session(session_number, on_ticks, **kwargs)
+        logger.info('forexpf session #%s is closed. Reconnecting in %s seconds.', session_number, reconnect_delay)
+        await clock.sleep(reconnect_delay)
+
+
+async def _run_session(
+        session_number: int,
+        on_ticks: Callable[[List[ExternalRateData]], None],
+        *,
+        on_ready: Optional[Callable[[], Awaitable]],
+        sse_url: str,
+        subscribe_url: str,
+        currencies: tuple
+):
+    async with ClientSession() as client:
+        long_poll_response = await client.get(sse_url, timeout=ClientTimeout(connect=20))
+        session_id = await _read_session_id(long_poll_response)
+
+        if session_id is None:
+            logger.error('Failed to get session id.')
+            return
+
+        logger.debug('forexpf session #%s sid: %s', session_number, session_id)
+
+        await asyncio.gather(*(
+            _subscribe(client, subscribe_url, session_id, currency) for currency in currencies
+        ))
+
+        if on_ready is not None:
+            await on_ready()
+
+        parser = SseTickParser()
+        # Sessions get the same ticks, one of them is enough to record.
+        recorder = get_recorder(FOREXPF_RECORDS) if session_number == 0 else None
+
+        try:
+            async for chunk in long_poll_response.content.iter_any():
+                # One timestamp per read.
+                timestamp_received = clock.time()
+                ticks = parser.feed(chunk, timestamp_received)
+
+                if recorder is not None:
+                    recorder.write(chunk, timestamp_received)
+
+                if ticks:
+                    on_ticks(ticks)
+        finally:
+            if recorder is not None:
+                recorder.close()
+
+
+async def _read_session_id(long_poll_response) -> Optional[str]:
+    async for line in long_poll_response.content:
+        logger.debug('Raw connection data: %s', line)
+        data = sse_to_tuple(line)
+
+        if data is None:
+            continue
+
+        if len(data) == 2:
+            return data[1]
+
+        return None
+
+    return None
+
+
+async def _subscribe(client: ClientSession, subscribe_url: str, session_id: str, currency: str):
+    response = await client.get(
+        f'{subscribe_url}?sid={session_id}&symbol={CURRENCY_CODES[currency]}&resolution=1&subscribe=true'
+    )
+
+    if response.status == 200:
+        logger.debug('Subscribed to %s', currency)
+    else:
+        logger.error("Couldn't subscribe to %s", currency)
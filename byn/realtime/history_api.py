@@ -0,0 +1,354 @@
+"""
+Time range queries over stored bcse, prediction, trade_date and nbrb data.
+
+GET /history/<table>?from=YYYY-MM-DD&to=YYYY-MM-DD&format=json|csv
+GET /history/bars?series=bcse_USD|predicted_USD&resolution=<seconds>&from=...
+
+Rows are streamed with chunked encoding, the db is queried page by page.
+Closed (past) periods rarely change (corrections and backfills only), so they are cached
+by nginx for a day and revalidated with an ETag. It's built from the request
+and a version of the period (row count and the latest writing transaction),
+so a not modified response doesn't read the rows.
+The db pool is created on the first request, so the api starts without postgres.
+"""
+import asyncio
+import csv
+import datetime
+import hashlib
+import io
+import logging
+from typing import AsyncIterator, Awaitable, Callable, Optional, Sequence, Tuple
+
+import simplejson
+from aiohttp import web
+
+import byn.constants as const
+from byn.postgres_db import (
+    NbrbKind,
+    init_pool,
+    local_engine,
+    iterate_bars,
+    iterate_bcse,
+    iterate_predictions,
+    iterate_trade_dates,
+    iterate_nbrb,
+    get_bars_version,
+    get_bcse_version,
+    get_predictions_version,
+    get_trade_dates_version,
+    get_nbrb_version,
+)
+from byn.realtime import clock
+from byn.utils import EnumAwareEncoder
+
+
+logger = logging.getLogger(__name__)
+
+MAX_HISTORY_DAYS = 366
+ROWS_PER_CHUNK = 500
+
+# Corrected or backfilled rows of closed periods are served within a day.
+CLOSED_CACHE_CONTROL = 'public, max-age=86400'
+OPEN_CACHE_CONTROL = 'no-cache'
+
+JSON = 'json'
+CSV = 'csv'
+CONTENT_TYPES = {
+    JSON: 'application/json',
+    CSV: 'text/csv',
+}
+
+
+class LazyDbPool:
+    """
+    One connection pool for all history requests. It's created on the first one.
+    """
+
+    def __init__(self):
+        self._engine = None
+        self._lock = asyncio.Lock()
+
+    async def use(self):
+        """
+        Make the pool current for db queries of the request.
+        """
+        async with self._lock:
+            if self._engine is None:
+                self._engine = await init_pool()
+
+        if self._engine is None:
+            raise web.HTTPServiceUnavailable(text='History is not available now.')
+
+        local_engine.set(self._engine)
+
+
+class HistoryQuery:
+    def __init__(self, request: web.Request):
+        try:
+            self.start_date = datetime.date.fromisoformat(request.query['from'])
+            self.end_date = datetime.date.fromisoformat(request.query.get('to', request.query['from']))
+        except (KeyError, ValueError):
+            raise web.HTTPBadRequest(text='"from" and optional "to" dates (YYYY-MM-DD) are expected.')
+
+        if self.end_date < self.start_date:
+            raise web.HTTPBadRequest(text='"to" is before "from".')
+
+        if (self.end_date - self.start_date).days >= MAX_HISTORY_DAYS:
+            raise web.HTTPBadRequest(text=f'Up to {MAX_HISTORY_DAYS} days can be requested at once.')
+
+        self.format = request.query.get('format', JSON)
+        if self.format not in CONTENT_TYPES:
+            raise web.HTTPBadRequest(text=f'Unknown format: {self.format}')
+
+    @property
+    def start_dt(self) -> datetime.datetime:
+        return datetime.datetime.fromordinal(self.start_date.toordinal())
+
+    @property
+    def end_dt(self) -> datetime.datetime:
+        """
+        Exclusive end of the period.
+        """
+        return datetime.datetime.fromordinal(self.end_date.toordinal() + 1)
+
+    def is_closed(self, closed_after_days: int) -> bool:
+        return (clock.today() - self.end_date).days >= closed_after_days
+
+
+async def bcse_handler(request):
+    query = HistoryQuery(request)
+    currency = request.query.get('currency', 'USD')
+
+    return await _respond(
+        request,
+        query,
+        closed_after_days=1,
+        columns=('timestamp', 'timestamp_received', 'rate'),
+        rows=(
+            (x.timestamp, x.timestamp_received, x.rate)
+            async for x in iterate_bcse(currency, query.start_dt, query.end_dt, page_size=ROWS_PER_CHUNK)
+        ),
+        get_version=lambda: get_bcse_version(currency, query.start_dt, query.end_dt),
+    )
+
+
+async def prediction_handler(request):
+    query = HistoryQuery(request)
+
+    return await _respond(
+        request,
+        query,
+        closed_after_days=1,
+        columns=('timestamp', 'external_rates', 'bcse_full', 'bcse_trusted_global', 'prediction'),
+        rows=(
+            (x.timestamp, ) + tuple(
+                _stored_json(x[column])
+                for column in ('external_rates', 'bcse_full', 'bcse_trusted_global', 'prediction')
+            )
+            async for x in iterate_predictions(query.start_dt, query.end_dt, page_size=ROWS_PER_CHUNK)
+        ),
+        get_version=lambda: get_predictions_version(query.start_dt, query.end_dt),
+    )
+
+
+async def trade_date_handler(request):
+    query = HistoryQuery(request)
+
+    return await _respond(
+        request,
+        query,
+        # Predictions for a trade date are calculated once nbrb rates are published.
+        closed_after_days=7,
+        columns=('date', 'predicted', 'prediction_error', 'accumulated_error'),
+        rows=(
+            (x.date, x.predicted, x.prediction_error, x.accumulated_error)
+            async for x in iterate_trade_dates(query.start_date, query.end_date, page_size=ROWS_PER_CHUNK)
+        ),
+        get_version=lambda: get_trade_dates_version(query.start_date, query.end_date),
+    )
+
+
+async def nbrb_handler(request):
+    query = HistoryQuery(request)
+
+    try:
+        kind = NbrbKind(request.query.get('kind', NbrbKind.GLOBAL.value))
+    except ValueError:
+        raise web.HTTPBadRequest(text=f'Unknown nbrb kind: {request.query["kind"]}')
+
+    return await _respond(
+        request,
+        query,
+        closed_after_days=7,
+        columns=('date', 'usd', 'eur', 'rub', 'uah', 'byn', 'dxy'),
+        rows=(
+            (x.date, x.usd, x.eur, x.rub, x.uah, x.byn, x.dxy)
+            async for x in iterate_nbrb(kind, query.start_date, query.end_date, page_size=ROWS_PER_CHUNK)
+        ),
+        get_version=lambda: get_nbrb_version(kind, query.start_date, query.end_date),
+    )
+
+
+async def bars_handler(request):
+    query = HistoryQuery(request)
+    series = request.query.get('series', 'predicted_USD')
+
+    try:
+        resolution = int(request.query.get('resolution', const.BAR_RESOLUTIONS[0]))
+    except ValueError:
+        resolution = None
+
+    if resolution not in const.BAR_RESOLUTIONS:
+        raise web.HTTPBadRequest(text=f'Resolution (seconds) is one of {const.BAR_RESOLUTIONS}.')
+
+    return await _respond(
+        request,
+        query,
+        closed_after_days=1,
+        columns=('timestamp', 'open', 'high', 'low', 'close'),
+        rows=(
+            (x.timestamp, x.open, x.high, x.low, x.close)
+            async for x in iterate_bars(
+                series, resolution, query.start_dt, query.end_dt, page_size=ROWS_PER_CHUNK
+            )
+        ),
+        get_version=lambda: get_bars_version(series, resolution, query.start_dt, query.end_dt),
+    )
+
+
+def _stored_json(value):
+    """
+    Prediction columns keep json documents as strings, embed them without parsing.
+    """
+    if isinstance(value, str):
+        return simplejson.RawJSON(value)
+
+    return value
+
+
+def _build_etag(request: web.Request, version: Tuple[int, int]) -> str:
+    digest = hashlib.sha1(request.path_qs.encode())
+    digest.update(repr(version).encode())
+
+    return '"%s"' % digest.hexdigest()
+
+
+def _parse_entity_tags(header: Optional[str]) -> Sequence[str]:
+    """
+    Parse If-None-Match. Its comparison is weak, so W/ prefixes are dropped.
+    """
+    if not header:
+        return ()
+
+    tags = (x.strip() for x in header.split(','))
+    return [x[2:] if x.startswith('W/') else x for x in tags if x]
+
+
+def _is_not_modified(request: web.Request, etag: str) -> bool:
+    tags = _parse_entity_tags(request.headers.get('If-None-Match'))
+    return '*' in tags or etag in tags
+
+
+async def _respond(
+        request: web.Request,
+        query: HistoryQuery,
+        *,
+        closed_after_days: int,
+        columns: Sequence[str],
+        rows: AsyncIterator[tuple],
+        get_version: Callable[[], Awaitable[Tuple[int, int]]]
+) -> web.StreamResponse:
+    await request.app['history_db'].use()
+
+    render = _render_csv if query.format == CSV else _render_json
+    chunks = render(columns, rows)
+    headers = {}
+
+    if query.is_closed(closed_after_days):
+        etag = _build_etag(request, await get_version())
+        headers['ETag'] = etag
+        headers['Cache-Control'] = CLOSED_CACHE_CONTROL
+
+        if _is_not_modified(request, etag):
+            raise web.HTTPNotModified(headers=headers)
+    else:
+        headers['Cache-Control'] = OPEN_CACHE_CONTROL
+
+    response = web.StreamResponse(headers=headers)
+    response.content_type = CONTENT_TYPES[query.format]
+    response.enable_chunked_encoding()
+    await response.prepare(request)
+
+    async for chunk in chunks:
+        await response.write(chunk)
+
+    await response.write_eof()
+    return response
+
+
+async def _render_json(columns: Sequence[str], rows: AsyncIterator[tuple]) -> AsyncIterator[bytes]:
+    chunk = ['[']
+    separator = ''
+
+    async for row in rows:
+        chunk.append(separator)
+        chunk.append(simplejson.dumps(
+            {column: _to_json_value(value) for column, value in zip(columns, row)},
+            cls=EnumAwareEncoder
+        ))
+        separator = ','
+
+        if len(chunk) >= 2 * ROWS_PER_CHUNK:
+            yield ''.join(chunk).encode()
+            chunk = []
+
+    chunk.append(']')
+    yield ''.join(chunk).encode()
+
+
+async def _render_csv(columns: Sequence[str], rows: AsyncIterator[tuple]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=';')
+    writer.writerow(columns)
+    rows_in_buffer = 0
+
+    async for row in rows:
+        writer.writerow([_to_csv_value(x) for x in row])
+        rows_in_buffer += 1
+
+        if rows_in_buffer >= ROWS_PER_CHUNK:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+            rows_in_buffer = 0
+
+    yield buffer.getvalue().encode()
+
+
+def _to_json_value(value):
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+
+    return value
+
+
+def _to_csv_value(value):
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+
+    if isinstance(value, simplejson.RawJSON):
+        return value.encoded_json
+
+    if isinstance(value, (dict, list)):
+        return simplejson.dumps(value, cls=EnumAwareEncoder)
+
+    return value
+
+
+routes = [
+    web.get('/history/bcse', bcse_handler),
+    web.get('/history/prediction', prediction_handler),
+    web.get('/history/trade_date', trade_date_handler),
+    web.get('/history/nbrb', nbrb_handler),
+    web.get('/history/bars', bars_handler),
+]
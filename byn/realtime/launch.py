@@ -1,31 +1,107 @@
-
+import argparse
 import asyncio
+import datetime
+import signal
+import sys
 
 from byn.realtime.external_rates import listen_forexpf
 from byn.realtime.bcse import listen_bcse
 from byn.realtime.synchronization import start as start_synchronization
-from byn.realtime.api import listen_api
+from byn.realtime.api import (
+    listen_api,
+    start_api_workers,
+    stop_api_workers,
+    supervise_api_workers,
+    watch_api_workers,
+)
+from byn.realtime.bars import persist_bars
 from byn.realtime.predict_server import run as run_predict_server
 from byn.realtime.predict_scheduler import predict_scheduler
+from byn.realtime import clock
+from byn.realtime.clock import AcceleratedClock
 from byn.tasks.nbrb import update_nbrb_rates_async, NotifyAction
 
 # Initialize logging configuration.
 import byn.logging
 
 
-async def main():
+ROLE_ALL = 'all'
+ROLE_PIPELINE = 'pipeline'
+ROLE_API = 'api'
+
+
+async def main(*, with_api: bool=True, api_workers=()):
     await start_synchronization()
 
     update_nbrb_rates_async(need_last_date=False, notify_action=NotifyAction.MARK_DONE)
 
-    await asyncio.gather(
+    coroutines = [
         listen_forexpf(),
         listen_bcse(),
-        listen_api(),
         run_predict_server(),
         predict_scheduler(),
+        persist_bars(),
+    ]
+
+    if with_api:
+        coroutines.append(listen_api())
+
+    if api_workers:
+        coroutines.append(watch_api_workers(api_workers))
+
+    await asyncio.gather(*coroutines)
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--role',
+        choices=(ROLE_ALL, ROLE_PIPELINE, ROLE_API),
+        default=ROLE_ALL,
+        help='Run the data & prediction pipeline, the websocket api or both.'
     )
+    parser.add_argument(
+        '--api-workers',
+        type=int,
+        default=0,
+        help='Run the api as N separate processes sharing the port. '
+             '0 means the api runs in the pipeline event loop.'
+    )
+    parser.add_argument(
+        '--clock-start',
+        type=datetime.datetime.fromisoformat,
+        help='Run the pipeline on a virtual clock starting at this (local) datetime. '
+             'Use it with byn.commands.replay_server for simulations.'
+    )
+    parser.add_argument(
+        '--clock-speed',
+        type=float,
+        default=1,
+        help='How much faster than the real one the virtual clock goes.'
+    )
+    return parser.parse_args()
 
 
 if __name__ == '__main__':
-    asyncio.run(main())
+    args = _parse_args()
+
+    if args.clock_start is not None:
+        clock.use(AcceleratedClock(start=args.clock_start, speed=args.clock_speed))
+
+    if args.role == ROLE_API:
+        api_workers = start_api_workers(max(args.api_workers, 1))
+    else:
+        # Workers are forked before any event loop is created.
+        api_workers = start_api_workers(args.api_workers) if args.role == ROLE_ALL else []
+
+    # Let workers be stopped on SIGTERM as well.
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    if args.role == ROLE_API:
+        supervise_api_workers(api_workers)
+
+    else:
+        try:
+            asyncio.run(main(with_api=args.role == ROLE_ALL and not api_workers, api_workers=api_workers))
+        finally:
+            stop_api_workers(api_workers)
@@ -0,0 +1,96 @@
+"""
+Live external rates in one redis hash:
+    version                 increased by every write
+    <currency>              the latest close rate
+    <currency>_timestamp    when it was received
+    <currency>_version      version of the write which changed it
+
+Readers keep the version they've seen and get only currencies changed since then.
+"""
+from typing import Dict, Iterable, Tuple
+
+from aioredis import Redis
+
+import byn.constants as const
+from byn.datatypes import ExternalRateData
+
+
+VERSION_FIELD = 'version'
+
+
+class LiveRateWriter:
+    """
+    There is a single writer (forexpf cache worker), so it increments the version itself
+    and every batch is one HMSET: readers never see a half-written batch.
+    """
+
+    def __init__(self, key: str=const.LIVE_RATES_REDIS_KEY):
+        self.key = key
+        self.version = None
+
+    async def start(self, redis: Redis):
+        self.version = int(await redis.hget(self.key, VERSION_FIELD) or 0)
+
+    def write(self, redis: Redis, ticks: Iterable[ExternalRateData]):
+        """
+        :param redis: redis client or pipeline.
+        :return: awaitable result of the write.
+        """
+        self.version += 1
+        fields = {VERSION_FIELD: self.version}
+
+        for x in ticks:
+            fields[x.currency] = x.close
+            fields[f'{x.currency}_timestamp'] = int(x.timestamp_received)
+            fields[f'{x.currency}_version'] = self.version
+
+        return redis.hmset_dict(self.key, fields)
+
+
+async def get_live_rates_since(
+        redis: Redis,
+        version: int=0,
+        *,
+        key: str=const.LIVE_RATES_REDIS_KEY
+) -> Tuple[int, Dict[str, str]]:
+    """
+    The whole hash is read only if the version has changed.
+
+    :return: current version and {currency: rate} changed after *version*.
+    """
+    current_version = await get_live_rates_version(redis, key=key)
+    if current_version <= version:
+        return current_version, {}
+
+    return parse_live_rates(await redis.hgetall(key), version)
+
+
+async def get_live_rates_version(redis: Redis, *, key: str=const.LIVE_RATES_REDIS_KEY) -> int:
+    return int(await redis.hget(key, VERSION_FIELD) or 0)
+
+
+async def delete_live_rates(redis: Redis, *, key: str=const.LIVE_RATES_REDIS_KEY):
+    """
+    Drop rates, but keep the version to stay monotonic for readers.
+    """
+    fields = [x for x in await redis.hkeys(key) if x != VERSION_FIELD.encode()]
+    if fields:
+        await redis.hdel(key, *fields)
+
+
+def parse_live_rates(raw: Dict[bytes, bytes], version: int) -> Tuple[int, Dict[str, str]]:
+    current_version = int(raw.get(VERSION_FIELD.encode(), 0))
+    if current_version <= version:
+        return current_version, {}
+
+    changes = {}
+
+    for field, value in raw.items():
+        if not field.endswith(b'_version') or int(value) <= version:
+            continue
+
+        currency = field[:-len(b'_version')]
+        if currency in raw:
+            changes[currency.decode()] = raw[currency].decode()
+
+    return current_version, changes
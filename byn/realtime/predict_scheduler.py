@@ -1,11 +1,10 @@
 """
 
 """
-import asyncio
 import dataclasses
-import datetime
 import simplejson
 import logging
+from itertools import count
 
 from byn import constants as const
 from byn.postgres_db import (
@@ -13,6 +12,9 @@ from byn.postgres_db import (
 )
 from byn.datatypes import LocalRates
 from byn.utils import create_redis, always_on_coroutine, EnumAwareEncoder
+from byn.realtime import clock
+from byn.realtime.bars import bars, PREDICTED_USD_SERIES
+from byn.realtime.live_rate_store import get_live_rates_since
 from byn.realtime.synchronization import (
     predict_with_timeout,
     wait_for_any_data_thread,
@@ -29,7 +31,7 @@ async def predict_scheduler():
 
     raw_input_data = await get_the_last_external_rates(
         const.FOREXPF_CURRENCIES_TO_LISTEN,
-        datetime.datetime.now()
+        clock.now()
     )
     raw_input_data = {
         k.lower(): str(v['rate_close'])
@@ -37,30 +39,35 @@ async def predict_scheduler():
     }
 
     redis = await create_redis()
+    # Published messages are numbered here, so every api worker exposes the same sequence.
+    # It starts from the current time to keep growing after a restart: sse event ids are based on it.
+    sequence = count(int(clock.time() * 1000))
+    live_rates_version = 0
     logger.debug('Prediction scheduler has started.')
 
     while True:
-        external_rates = (
-            x.decode() if x is not None else None
-            for x in await redis.mget(*const.FOREXPF_CURRENCIES_TO_LISTEN)
-        )
+        live_rates_version, external_rates = await get_live_rates_since(redis, live_rates_version)
 
         raw_input_data.update(_build_predict_input_data(
             names=const.FOREXPF_CURRENCIES_TO_LISTEN,
-            values=external_rates,
+            values=(external_rates.get(x) for x in const.FOREXPF_CURRENCIES_TO_LISTEN),
         ))
 
         input_data = LocalRates(**raw_input_data)
 
         output_data = await predict_with_timeout(redis, input_data, timeout=0.5)
         if output_data is not None:
-            
+            predicted = dataclasses.asdict(output_data.to_local())
+
             await redis.publish(const.PUBLISH_PREDICT_REDIS_CHANNEL, simplejson.dumps({
+                'seq': next(sequence),
                 'external': dataclasses.asdict(input_data),
-                'predicted': dataclasses.asdict(output_data.to_local()),
+                'predicted': predicted,
             }, cls=EnumAwareEncoder))
 
-        await asyncio.sleep(const.PREDICT_UPDATE_INTERVAL)
+            bars.add(PREDICTED_USD_SERIES, int(clock.time()), float(predicted['predicted']))
+
+        await clock.sleep(const.PREDICT_UPDATE_INTERVAL)
 
 
 def _build_predict_input_data(*, names, values) -> dict:
@@ -5,10 +5,12 @@ Coroutine which listens for a command redis queue
 import asyncio
 import datetime
 import logging
-from decimal import Decimal
+from typing import List, Tuple
 
 import numpy as np
+import simplejson
 
+import byn.constants as const
 from byn.utils import always_on_coroutine, create_redis, atuple
 from byn.predict_utils import build_predictor, get_magic_rolling_average_as_array
 from byn.predict.predictor import Predictor
@@ -20,7 +22,10 @@ from byn.realtime.synchronization import (
     receive_predictor_command,
     send_prediction,
 )
+from byn.realtime import clock
 from byn.realtime.bcse_converter import BcseConverter
+from byn.realtime.bcse_delta import BcseDeltaReceiver, RowBuffer, DELTA, FULL
+from byn.realtime.predict_snapshot import dump_snapshot, save_snapshot, load_snapshot
 
 
 logger = logging.getLogger(__name__)
@@ -34,26 +39,35 @@ async def run():
     await wait_for_data_threads()
 
     while True:
-        today = datetime.date.today()
+        today = clock.today()
+        bcse_converter.start_day(today)
 
         logger.debug('Creating predictor...')
 
         predictor = await build_predictor(today, use_rolling=True)
         rolling_average = await get_magic_rolling_average_as_array(predictor.pre_processor)
-        todays_bcse_config = TodaysRatesConfigurer(predictor=predictor, bcse_converter=bcse_converter)
+        todays_bcse_config = TodaysRatesConfigurer(
+            predictor=predictor,
+            bcse_converter=bcse_converter,
+            today=today
+        )
 
         logger.debug('Predictor is created.')
 
         if predictor.meta.last_date < today:
-            start_dt = datetime.datetime.fromordinal(today.toordinal())
-            bcse_data = np.array(
-                await get_bcse_in('USD', start_dt=start_dt),
-                dtype=np.dtype(object)
-            )
+            snapshot = await load_snapshot(redis, today)
+
+            if snapshot is not None:
+                await todays_bcse_config.restore(snapshot, rolling_average=rolling_average)
+                logger.info('Predictor is restored from snapshot revision %s.', snapshot['revision'])
 
-            await todays_bcse_config.configure(bcse_pairs=bcse_data, rolling_average=rolling_average)
+            else:
+                bcse_data = await _load_todays_bcse(today)
+                await todays_bcse_config.configure(bcse_pairs=bcse_data, rolling_average=rolling_average)
+                asyncio.create_task(_save_snapshot(redis, todays_bcse_config.dump_snapshot()))
 
         logger.debug('Predictor is configured.')
+        asyncio.create_task(_publish_model_event(redis, 'rebuilt', predictor, todays_bcse_config))
 
         while True:
             message = await receive_predictor_command(redis)
@@ -63,22 +77,26 @@ async def run():
                 break
 
             elif command == PredictCommand.NEW_BCSE:
-                bcse_data = np.array([
-                    (ts, rate) for ts, rate in message['data']['rates']
-                ], dtype=np.dtype(object))
+                currency = message['data'].get('currency', const.BCSE_PREDICTOR_CURRENCY)
+                if currency != const.BCSE_PREDICTOR_CURRENCY:
+                    logger.debug('Ignore %s bcse rates.', currency)
+                    continue
 
-                await todays_bcse_config.configure(bcse_pairs=bcse_data, rolling_average=rolling_average)
+                await todays_bcse_config.configure_command(message['data'], rolling_average=rolling_average)
+                asyncio.create_task(_save_snapshot(redis, todays_bcse_config.dump_snapshot()))
+                asyncio.create_task(_publish_model_event(redis, 'bcse_configured', predictor, todays_bcse_config))
 
             elif command == PredictCommand.PREDICT:
                 message_guid = message['data'].pop('message_guid')
-                data = {x: Decimal(message['data'][x]) for x in message['data']}
+                # Json commands have Decimals, binary ones have floats.
+                data = {x: float(message['data'][x]) for x in message['data']}
 
                 local_rates = LocalRates(**data)
                 prediction = predictor.predict_current_by_local_for_record(
                     local_rates,
                     rolling_average=rolling_average
                 )
-                prediction.timestamp = int(datetime.datetime.now().timestamp())
+                prediction.timestamp = int(clock.time())
 
                 await send_prediction(redis, prediction, message_guid=message_guid)
 
@@ -91,10 +109,52 @@ async def run():
                 ))
 
 
+async def _load_todays_bcse(today: datetime.date, extra_pairs=()) -> np.ndarray:
+    """
+    :param extra_pairs: (timestamp, rate) pairs which may be not in the db yet.
+    :return: today's (timestamp, rate) pairs ordered by timestamp.
+    """
+    start_dt = datetime.datetime.fromordinal(today.toordinal())
+    pairs = dict(await get_bcse_in(const.BCSE_PREDICTOR_CURRENCY, start_dt=start_dt))
+    pairs.update((ts, rate) for ts, rate in extra_pairs)
+
+    return np.array(sorted(pairs.items()), dtype=np.dtype(object))
+
+
+async def _save_snapshot(redis, raw: str):
+    try:
+        await save_snapshot(redis, raw)
+    except asyncio.CancelledError as e:
+        raise e
+    except:
+        logger.exception("Predictor snapshot wasn't saved.")
+
+
+async def _publish_model_event(redis, event: str, predictor: Predictor, config: 'TodaysRatesConfigurer'):
+    """
+    Notify api subscribers about the model state.
+    """
+    try:
+        await redis.publish(const.PUBLISH_MODEL_REDIS_CHANNEL, simplejson.dumps({
+            'event': event,
+            'timestamp': int(clock.time()),
+            'last_date': predictor.meta.last_date.isoformat(),
+            'bcse_full': len(config.bcse_full) if config.bcse_full is not None else 0,
+            'bcse_trusted': len(config.bcse_trusted) if config.bcse_trusted is not None else 0,
+        }))
+    except asyncio.CancelledError as e:
+        raise e
+    except:
+        logger.exception("Model event wasn't published.")
+
 
 class TodaysRatesConfigurer:
     """
     Object to keep track of what was configured as todays active rates in the predictor.
+
+    Trades which follow the configured ones are added incrementally:
+    only new trades are resolved into local rates and appended to today's rates.
+    Everything is configured from scratch if trust of configured trades changes.
     """
 
     bcse_trusted_global = None  # type: np.ndarray
@@ -107,17 +167,89 @@ class TodaysRatesConfigurer:
         *,
         predictor: Predictor,
         bcse_converter: BcseConverter,
-
+        today: datetime.date,
     ):
         self.predictor = predictor
         self.bcse_converter = bcse_converter
+        self.today = today
+        self.delta_receiver = BcseDeltaReceiver()
+        self.fake_rate = None
+        self.revision = 0
+        self._reset()
 
-
-    async def configure(self, *, bcse_pairs: np.ndarray, rolling_average: np.ndarray):
+    def _reset(self):
         self.bcse_full = np.array([])
         self.bcse_trusted = np.array([])
         self.bcse_trusted_global = np.array([])
 
+        # Views of these buffers are exposed as bcse_* attributes, so they are replaced, never cleared.
+        self._full = RowBuffer(2, dtype=object)
+        self._trusted = RowBuffer(2, dtype=object)
+        self._y = RowBuffer(1, dtype='float64')
+        self._x = []
+        self._trust = np.array([], dtype=bool)
+
+    def dump_snapshot(self) -> str:
+        """
+        :return: serialized intraday state. See byn.realtime.predict_snapshot.
+        """
+        self.revision += 1
+
+        return dump_snapshot(
+            date=self.today,
+            revision=self.revision,
+            bcse_pairs=self._full.view(),
+            fake_rates=self.bcse_converter.fake_rates.get_day(self.today),
+            resolved=self.bcse_converter.resolved_bcse_rates.get_day(self.today),
+            epoch=self.delta_receiver.epoch,
+            sequence=self.delta_receiver.sequence,
+        )
+
+    async def restore(self, snapshot: dict, *, rolling_average: np.ndarray):
+        """
+        Configure the state of *dump_snapshot* without resolving trades and predicting the fake rate again.
+        """
+        self._reset()
+        self.revision = snapshot['revision']
+        self.bcse_converter.restore(resolved=snapshot['resolved'], fake_rates=snapshot['fake_rates'])
+        self.delta_receiver.epoch = snapshot['epoch']
+        self.delta_receiver.sequence = snapshot['sequence']
+
+        bcse_pairs = snapshot['bcse']
+        if len(bcse_pairs) == 0:
+            return
+
+        self.fake_rate = self.bcse_converter.get_fake_rate(bcse_pairs[0][0])
+        if self.fake_rate is None or any(x[0] not in self.bcse_converter.resolved_bcse_rates for x in bcse_pairs):
+            logger.warning('Predictor snapshot is incomplete. Configuring everything.')
+            await self.configure(bcse_pairs=np.array(bcse_pairs, dtype=np.dtype(object)), rolling_average=rolling_average)
+            return
+
+        self._full.extend(bcse_pairs)
+        self._apply_trust(rolling_average)
+
+    async def configure_command(self, data: dict, *, rolling_average: np.ndarray):
+        """
+        Configure trades of a NEW_BCSE command.
+        """
+        pairs = [(ts, rate) for ts, rate in data['rates']]
+        kind = self.delta_receiver.receive(data)
+
+        if kind == DELTA:
+            await self.add_bcse(new_pairs=pairs, rolling_average=rolling_average)
+
+        elif kind == FULL:
+            await self.configure(bcse_pairs=np.array(pairs, dtype=np.dtype(object)), rolling_average=rolling_average)
+
+        else:
+            await self.configure(
+                bcse_pairs=await _load_todays_bcse(self.today, self._full.view().tolist() + pairs),
+                rolling_average=rolling_average
+            )
+
+    async def configure(self, *, bcse_pairs: np.ndarray, rolling_average: np.ndarray):
+        self._reset()
+
         if len(bcse_pairs) == 0:
             logger.debug('Empty bcse data. Skipping.')
             return
@@ -140,21 +272,77 @@ class TodaysRatesConfigurer:
 
         logger.debug("Fake rate is %s (real rate is %s)", fake_rate, bcse_pairs[0][1])
 
+        self.fake_rate = fake_rate
+        self._full.extend(bcse_pairs)
+        self._apply_trust(rolling_average)
+
+    async def add_bcse(self, *, new_pairs: List[Tuple[int, object]], rolling_average: np.ndarray):
+        """
+        Configure trades which follow the configured ones.
+        Cost doesn't depend on the number of configured trades
+        unless trust of them changes.
+        """
+        full = self._full.view()
+
+        if len(new_pairs) == 0:
+            logger.debug('Empty bcse delta. Skipping.')
+            return
+
+        if self.fake_rate is None or len(full) == 0:
+            await self.configure(bcse_pairs=np.array(new_pairs, dtype=np.dtype(object)), rolling_average=rolling_average)
+            return
+
+        timestamps = [x[0] for x in new_pairs]
+        if timestamps[0] <= full[-1][0] or timestamps != sorted(timestamps):
+            logger.info('Bcse delta rewrites configured trades. Configuring everything.')
+            pairs = dict(full.tolist())
+            pairs.update(new_pairs)
+            await self.configure(
+                bcse_pairs=np.array(sorted(pairs.items()), dtype=np.dtype(object)),
+                rolling_average=rolling_average
+            )
+            return
+
+        logger.debug('Bcse data to add: %s', new_pairs)
+        await self.bcse_converter.update(new_pairs)
+        self._full.extend(new_pairs)
+        self._apply_trust(rolling_average)
 
-        trust = build_trust_array(fake_rate, bcse_pairs[:, 0], bcse_pairs[:, 1])
+    def _apply_trust(self, rolling_average: np.ndarray):
+        full = self._full.view()
+        configured = len(self._trust)
+
+        trust = build_trust_array(self.fake_rate, full[:, 0], full[:, 1])
+
+        if not np.array_equal(trust[:configured], self._trust):
+            logger.info('Trust of configured bcse rates has changed. Configuring everything.')
+            self._reset()
+            self._full.extend(full)
+            configured = 0
+
+        self._trust = trust
 
         if not trust.any():
             logger.debug("There is no bcse rates to trust. Skipping.")
             self.predictor.turn_off_todays_rates()
             return
 
-        self.bcse_full = bcse_pairs
-        self.bcse_trusted = bcse_pairs[trust]
+        self.bcse_full = full
+        new_trusted = full[configured:][trust[configured:]]
+
+        if len(new_trusted) == 0:
+            logger.debug("There is no new bcse rates to trust.")
+            return
+
+        self._trusted.extend(new_trusted)
+        self._y.extend((x[1], ) for x in new_trusted)
+        self._x.extend(self.bcse_converter.get_by_timestamp(x[0]) for x in new_trusted)
 
-        X = [self.bcse_converter.get_by_timestamp(x[0]) for x in self.bcse_trusted]
-        Y = np.array(self.bcse_trusted[:, 1], dtype='float64')
-        self.predictor.turn_on_todays_local_rates(X, Y, rolling_average)
+        self.bcse_trusted = self._trusted.view()
+        self.predictor.turn_on_todays_local_rates(list(self._x), self._y.view()[:, 0], rolling_average)
 
-        self.bcse_trusted_global = self.bcse_trusted.copy()
-        self.bcse_trusted_global[:,1] = self.predictor.neighbor_y
+        # Previous arrays may be still referenced by pending insert_prediction tasks.
+        bcse_trusted_global = self.bcse_trusted.copy()
+        bcse_trusted_global[:, 1] = self.predictor.neighbor_y
+        self.bcse_trusted_global = bcse_trusted_global
         logger.debug("Active bcse rates are set.")
@@ -0,0 +1,90 @@
+"""
+Intraday predict_server state which survives its restarts.
+
+The snapshot is rewritten after every bcse (re)configuration and is read on start,
+so a restart doesn't query the db, rebuild rate extractors or predict the open fake rate again:
+    version         format version, snapshots of another format are ignored
+    revision        increased by every write of the day
+    date            snapshots of another day are ignored
+    bcse            today's (timestamp, rate) pairs
+    fake_rates      (timestamp, fake rate) pairs of today's opens
+    resolved        (timestamp, (eur, rub, uah, dxy)) local rates of today's trades
+    epoch/sequence  the latest NEW_BCSE command
+
+It is written with one SET, so a crash never leaves a half-written snapshot.
+A snapshot which misses the latest commands is fine: the next NEW_BCSE command doesn't follow it
+and today's trades are reloaded from the db then.
+"""
+import datetime
+import logging
+from dataclasses import astuple
+from typing import Dict, Optional, Sequence
+
+import simplejson
+from aioredis import Redis
+
+import byn.constants as const
+from byn.datatypes import LocalRates
+
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+
+def dump_snapshot(
+        *,
+        date: datetime.date,
+        revision: int,
+        bcse_pairs: Sequence[Sequence],
+        fake_rates: Dict[int, float],
+        resolved: Dict[int, LocalRates],
+        epoch: Optional[str],
+        sequence: Optional[int]
+) -> str:
+    return simplejson.dumps({
+        'version': SNAPSHOT_VERSION,
+        'revision': revision,
+        'date': date.isoformat(),
+        # Rates are kept as strings exactly as NEW_BCSE commands have them.
+        'bcse': [(int(ts), str(rate)) for ts, rate in bcse_pairs],
+        'fake_rates': [(ts, float(rate)) for ts, rate in fake_rates.items()],
+        'resolved': [(ts, astuple(rates)) for ts, rates in resolved.items()],
+        'epoch': epoch,
+        'sequence': sequence,
+    })
+
+
+def parse_snapshot(raw: Optional[bytes], date: datetime.date) -> Optional[dict]:
+    """
+    :return: None if there is no usable snapshot for *date*.
+    """
+    if raw is None:
+        return None
+
+    snapshot = simplejson.loads(raw)
+
+    if snapshot.get('version') != SNAPSHOT_VERSION:
+        logger.info('Ignore predictor snapshot of version %s.', snapshot.get('version'))
+        return None
+
+    if snapshot['date'] != date.isoformat():
+        logger.debug('Ignore predictor snapshot of %s.', snapshot['date'])
+        return None
+
+    snapshot['fake_rates'] = dict(snapshot['fake_rates'])
+    snapshot['resolved'] = {ts: LocalRates(*rates) for ts, rates in snapshot['resolved']}
+    return snapshot
+
+
+async def save_snapshot(redis: Redis, raw: str, *, key: str=const.PREDICT_SNAPSHOT_REDIS_KEY):
+    await redis.set(key, raw)
+
+
+async def load_snapshot(
+        redis: Redis,
+        date: datetime.date,
+        *,
+        key: str=const.PREDICT_SNAPSHOT_REDIS_KEY
+) -> Optional[dict]:
+    return parse_snapshot(await redis.get(key), date)
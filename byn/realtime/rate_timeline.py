@@ -0,0 +1,168 @@
+"""
+In-memory append-only timeline of external rates.
+
+Forexpf workers append live ticks, rates extractors are built from it without db access.
+Postgres is used only to seed a timeline which doesn't cover a requested period (cold start).
+"""
+import logging
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_tick_timestamp(timestamp_open: float, timestamp_received: float, next_timestamp_open: float=None) -> float:
+    """
+    A tick is accounted from the moment it was received, but not later than the next tick opens.
+    Both the in-memory timeline and the db cold start account ticks this way.
+    """
+    timestamp = max(timestamp_open, timestamp_received)
+
+    if next_timestamp_open is not None:
+        timestamp = min(timestamp, next_timestamp_open - 1)
+
+    return timestamp
+
+
+class CurrencyTimeline:
+    """
+    (timestamp, rate) float64 pairs of one currency ordered by timestamp.
+
+    Rows which were returned by *get_pairs_since* are never overwritten:
+    the buffer is reallocated when it grows, is trimmed or such a row is clamped,
+    so returned arrays stay valid.
+    """
+
+    def __init__(self, capacity: int=1024):
+        self._data = np.empty((capacity, 2), dtype='float64')
+        self._size = 0
+        # Rows before this one may be referenced by returned arrays.
+        self._shared_size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def first_timestamp(self) -> Optional[float]:
+        return self._data[0, 0] if self._size else None
+
+    @property
+    def last_timestamp(self) -> Optional[float]:
+        return self._data[self._size - 1, 0] if self._size else None
+
+    def append(self, timestamp: float, rate: float):
+        if self._size and timestamp < self._data[self._size - 1, 0]:
+            # Keep the timeline monotonic: a late tick is accounted as the latest one.
+            timestamp = self._data[self._size - 1, 0]
+
+        if self._size == len(self._data):
+            self._reallocate(self._data[:self._size], capacity=2 * len(self._data))
+
+        self._data[self._size] = timestamp, rate
+        self._size += 1
+
+    def append_tick(self, timestamp_open: float, timestamp_received: float, rate: float):
+        """
+        Append a live tick and clamp the previous pair to the tick open (see *get_tick_timestamp*).
+        """
+        if self._size:
+            last = self._size - 1
+            clamped = min(self._data[last, 0], timestamp_open - 1)
+
+            if last > 0:
+                clamped = max(clamped, self._data[last - 1, 0])
+
+            if clamped != self._data[last, 0]:
+                if last < self._shared_size:
+                    self._reallocate(self._data[:self._size], capacity=len(self._data))
+                self._data[last, 0] = clamped
+
+        self.append(get_tick_timestamp(timestamp_open, timestamp_received), rate)
+
+    def seed(self, pairs: np.ndarray):
+        """
+        Put older (db) data before the in-memory one.
+        Seeded pairs which overlap the in-memory period are dropped.
+        """
+        pairs = np.asarray(pairs, dtype='float64').reshape(-1, 2)
+
+        if self._size:
+            pairs = pairs[pairs[:, 0] < self._data[0, 0]]
+
+        self._reallocate(np.concatenate((pairs, self._data[:self._size])))
+
+    def get_pairs_since(self, timestamp: float) -> np.ndarray:
+        """
+        :return: pairs since *timestamp* including the last pair before it.
+        """
+        start = max(np.searchsorted(self._data[:self._size, 0], timestamp, side='right') - 1, 0)
+        self._shared_size = self._size
+        return self._data[start:self._size]
+
+    def drop_before(self, timestamp: float):
+        """
+        Forget pairs before *timestamp* except the last one of them.
+        """
+        start = max(np.searchsorted(self._data[:self._size, 0], timestamp, side='right') - 1, 0)
+        if start > 0:
+            self._reallocate(self._data[start:self._size])
+
+    def _reallocate(self, data: np.ndarray, capacity: int=None):
+        capacity = max(capacity or 0, len(data), 16)
+        self._data = np.empty((capacity, 2), dtype='float64')
+        self._data[:len(data)] = data
+        self._size = len(data)
+        self._shared_size = 0
+
+
+class RateTimeline:
+    def __init__(self):
+        self.currencies = {}    # type: Dict[str, CurrencyTimeline]
+
+    def append(self, currency: str, timestamp: float, rate: float):
+        if currency not in self.currencies:
+            self.currencies[currency] = CurrencyTimeline()
+
+        self.currencies[currency].append(timestamp, rate)
+
+    def append_tick(self, currency: str, timestamp_open: float, timestamp_received: float, rate: float):
+        if currency not in self.currencies:
+            self.currencies[currency] = CurrencyTimeline()
+
+        self.currencies[currency].append_tick(timestamp_open, timestamp_received, rate)
+
+    def covers(self, currencies: Iterable[str], timestamp: float) -> bool:
+        for currency in currencies:
+            timeline = self.currencies.get(currency)
+            if timeline is None or not len(timeline) or timeline.first_timestamp > timestamp:
+                return False
+
+        return True
+
+    def seed(self, currency_to_pairs: Dict[str, np.ndarray]):
+        for currency, pairs in currency_to_pairs.items():
+            if currency not in self.currencies:
+                self.currencies[currency] = CurrencyTimeline()
+
+            self.currencies[currency].seed(pairs)
+
+        logger.debug('Rate timeline is seeded: %s', {x: len(y) for x, y in self.currencies.items()})
+
+    def get_pairs_since(self, timestamp: float) -> Dict[str, np.ndarray]:
+        return {
+            currency: timeline.get_pairs_since(timestamp)
+            for currency, timeline in self.currencies.items()
+        }
+
+    def drop_before(self, timestamp: float):
+        for timeline in self.currencies.values():
+            timeline.drop_before(timestamp)
+
+    def get_metrics(self) -> Dict[str, int]:
+        return {currency: len(timeline) for currency, timeline in self.currencies.items()}
+
+
+# Shared by forexpf workers and the predict server which run in one event loop.
+live_rates = RateTimeline()
@@ -0,0 +1,88 @@
+"""
+Raw forexpf stream reads and bcse responses with their arrival times.
+
+A record file is a sequence of frames: <float64 arrival timestamp><uint32 length><payload>.
+Recording is on when BYN_RECORD_DIR is set. Files are per source (bcse ones are per currency) and day:
+    <BYN_RECORD_DIR>/<source>-<YYYY-MM-DD>.rec
+A long running recorder switches to the next file at (clock) midnight.
+"""
+import datetime
+import logging
+import os
+import struct
+from typing import Iterator, Optional, Tuple
+
+import byn.constants as const
+from byn.realtime import clock
+
+
+logger = logging.getLogger(__name__)
+
+FOREXPF = 'forexpf'
+BCSE = 'bcse'
+
+_FRAME_HEADER = struct.Struct('<dI')
+
+
+class Recorder:
+    """
+    Appends frames to the file of the current day and starts a new one when the clock date changes.
+    A recorder for a fixed *date* never switches.
+    """
+
+    def __init__(self, source: str, date: datetime.date=None):
+        self.source = source
+        self._fixed_date = date
+        self._file = None
+        self._open(date or clock.today())
+
+    def _open(self, date: datetime.date):
+        if self._file is not None:
+            self._file.close()
+
+        self.date = date
+        self.path = os.path.join(const.RECORD_DIR, f'{self.source}-{date.isoformat()}.rec')
+        logger.info('Recording %s into %s', self.source, self.path)
+        self._file = open(self.path, 'ab')
+
+    def write(self, payload: bytes, timestamp: float=None):
+        if timestamp is None:
+            timestamp = clock.time()
+
+        if self._fixed_date is None:
+            today = clock.today()
+            if today != self.date:
+                self._open(today)
+
+        self._file.write(_FRAME_HEADER.pack(timestamp, len(payload)))
+        self._file.write(payload)
+
+    def close(self):
+        self._file.close()
+
+
+def get_recorder(source: str, date: datetime.date=None) -> Optional[Recorder]:
+    """
+    :param date: of a fixed file, the current one otherwise.
+    :return: None if recording is off.
+    """
+    if not const.RECORD_DIR:
+        return None
+
+    return Recorder(source, date)
+
+
+def read_records(path: str) -> Iterator[Tuple[float, bytes]]:
+    with open(path, 'rb') as f:
+        while True:
+            header = f.read(_FRAME_HEADER.size)
+            if len(header) < _FRAME_HEADER.size:
+                return
+
+            timestamp, length = _FRAME_HEADER.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length:
+                logger.warning('%s ends with a truncated frame.', path)
+                return
+
+            yield timestamp, payload
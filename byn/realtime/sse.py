@@ -0,0 +1,128 @@
+"""
+Server-sent events transport for the same messages /predict.ws clients get.
+
+Every message gets an event id "<seq>-<number>": seq of the latest prediction
+(predict_scheduler numbers them) and the number of messages received after it.
+Api workers receive the same messages in the same order, so ids are the same in all of them.
+A client which reconnects (to any worker) with a known Last-Event-ID gets missed events
+from a replay ring, otherwise (unknown or too old id) it gets the latest snapshots as a new client.
+"""
+import asyncio
+import logging
+from collections import deque
+from typing import Iterable, List, Optional, Tuple
+
+import byn.constants as const
+
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_TOPIC = 'heartbeat'
+HEARTBEAT_FRAME = b': heartbeat\n\n'
+
+EventId = Tuple[int, int]
+
+
+def format_event(event_id: Optional[str], topic: str, payload: str) -> bytes:
+    """
+    Events without an id keep the previous Last-Event-ID of a client.
+    """
+    data = payload.replace('\n', '\ndata: ')
+    id_line = '' if event_id is None else f'id: {event_id}\n'
+    return f'{id_line}event: {topic}\ndata: {data}\n\n'.encode()
+
+
+class ReplayRing:
+    """
+    Last *size* events as ready to send frames.
+    Messages which are not sent to anybody take their ids as well, but have no frames.
+    """
+
+    def __init__(self, size: int=const.SSE_REPLAY_SIZE):
+        self._events = deque(maxlen=size)   # type: Deque[Tuple[EventId, str, Optional[bytes]]]
+        self._seq = None
+        self._number = 0
+
+    def _next_id(self, seq: Optional[int]) -> Optional[EventId]:
+        """
+        :return: None until the first prediction is received.
+        """
+        if seq is None:
+            self._number += 1
+        else:
+            self._seq, self._number = seq, 0
+
+        return None if self._seq is None else (self._seq, self._number)
+
+    def append(self, topic: str, payload: str, *, seq: Optional[int]=None) -> bytes:
+        """
+        :param seq: of a prediction message.
+        :return: event frame.
+        """
+        event_id = self._next_id(seq)
+        if event_id is None:
+            return format_event(None, topic, payload)
+
+        frame = format_event('%s-%s' % event_id, topic, payload)
+        self._events.append((event_id, topic, frame))
+        return frame
+
+    def skip(self, topic: str):
+        """
+        Count a message which is not sent to anybody.
+        """
+        event_id = self._next_id(None)
+        if event_id is not None:
+            self._events.append((event_id, topic, None))
+
+    @staticmethod
+    def parse_event_id(event_id: Optional[str]) -> Optional[EventId]:
+        if not event_id:
+            return None
+
+        seq, _, number = event_id.partition('-')
+        if not seq.isdigit() or not number.isdigit():
+            return None
+
+        return int(seq), int(number)
+
+    def get_since(self, event_id: EventId, topics: Iterable[str]) -> Optional[List[Tuple[EventId, bytes]]]:
+        """
+        :return: (event id, frame) of events after *event_id*
+            or None if it's unknown or some of the events are not kept.
+        """
+        topics = set(topics)
+        missed = None
+
+        for x_id, topic, frame in self._events:
+            if missed is None:
+                if x_id == event_id:
+                    missed = []
+
+            elif topic in topics:
+                if frame is None:
+                    return None
+
+                missed.append((x_id, frame))
+
+        return missed
+
+
+class EventStream:
+    """
+    Adapter of an event-stream response to the websocket interface used by broadcast.Subscriber.
+    """
+
+    def __init__(self, response):
+        self.response = response
+        self.closed = asyncio.Event()
+
+    async def send_str(self, frame: bytes):
+        try:
+            await self.response.write(frame)
+        except Exception as e:
+            self.closed.set()
+            raise e
+
+    async def close(self, code=None):
+        self.closed.set()
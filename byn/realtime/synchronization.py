@@ -1,4 +1,3 @@
-import asyncio
 import simplejson
 import logging
 import math
@@ -11,7 +10,14 @@ from aioredis import Redis
 from byn.predict.predictor import PredictionRecord, RidgePredictionRecord
 from byn.utils import create_redis, EnumAwareEncoder
 from byn.datatypes import PredictCommand, LocalRates
-from byn import constants
+from byn.realtime import clock
+from byn.realtime.live_rate_store import delete_live_rates
+from byn.realtime.wire import (
+    WireFormat,
+    is_binary,
+    encode_predict_command,
+    decode_predict_command,
+)
 
 
 logger = logging.getLogger(__name__)
@@ -25,6 +31,12 @@ NBRB = 'NBRB'
 PREDICTOR_COMMAND_QUEUE = 'PREDICTOR_COMMAND'
 PREDICTION_READY_QUEUE = 'PREDICTION_READY'
 
+# Commands which are not listed here are sent as json.
+# Prediction replies are always json.
+WIRE_FORMATS = {
+    PredictCommand.PREDICT: WireFormat.BINARY,
+}
+
 
 async def start():
     redis = await create_redis()
@@ -36,7 +48,7 @@ async def start():
         NBRB: 0,
     })
 
-    await redis.delete(*constants.FOREXPF_CURRENCIES_TO_LISTEN)
+    await delete_live_rates(redis)
 
 
 async def wait_for_data_threads():
@@ -46,7 +58,7 @@ async def wait_for_data_threads():
         data = await redis.hgetall(WAIT_KEY)
         if not all(x == b'1' for x in data.values()):
             logger.info('Data threads status: %s', data)
-            await asyncio.sleep(1)
+            await clock.sleep(1)
         else:
             break
 
@@ -58,7 +70,7 @@ async def wait_for_any_data_thread(data_thread_keys):
         if any(x == b'1' for x in (await redis.hmget(WAIT_KEY, *data_thread_keys))):
             return
         logger.debug('Waiting for any of %s to proceed.', data_thread_keys)
-        await asyncio.sleep(1)
+        await clock.sleep(1)
 
 
 async def mark_as_ready(thread_name: str):
@@ -72,17 +84,29 @@ async def send_predictor_command(
         command: PredictCommand,
         data: Optional[dict]=None
 ):
-    await redis.rpush(PREDICTOR_COMMAND_QUEUE, simplejson.dumps({
-        'command': command.value,
-        'data': data,
-    }, cls=EnumAwareEncoder))
+    if WIRE_FORMATS.get(command) == WireFormat.BINARY:
+        raw_message = encode_predict_command(data)
+    else:
+        raw_message = simplejson.dumps({
+            'command': command.value,
+            'data': data,
+        }, cls=EnumAwareEncoder)
+
+    await redis.rpush(PREDICTOR_COMMAND_QUEUE, raw_message)
 
 
 async def receive_predictor_command(redis: Redis) -> dict:
     message = None
 
     while message is None:
-        message = simplejson.loads((await redis.blpop(PREDICTOR_COMMAND_QUEUE))[1], use_decimal=True)
+        raw_message = (await redis.blpop(PREDICTOR_COMMAND_QUEUE))[1]
+
+        if is_binary(raw_message):
+            message = decode_predict_command(raw_message)
+        else:
+            message = simplejson.loads(raw_message, use_decimal=True)
+
+        # Expiration is in real time: predictions take as long with an accelerated clock.
         expires = message.get('data') and message['data'].pop('expires', None)
         if (
             expires is not None and
@@ -115,16 +139,20 @@ async def receive_next_prediction(redis: Redis, *, timeout: int) -> Optional[dic
 
 
 async def predict_with_timeout(redis: Redis, external_rates: LocalRates, *, timeout: float=0.5) -> Optional[PredictionRecord]:
-    start_time = time.time()
-    finish_time = start_time + timeout
+    """
+    :param timeout: real seconds. The predictor takes as long with an accelerated clock.
+    """
+    finish_time = time.monotonic() + timeout
 
     input_data = asdict(external_rates)
-    input_data['message_guid'] = int(start_time * 1000)
-    input_data['expires'] = int(finish_time * 1000)
+    # Prediction timestamp.
+    input_data['message_guid'] = int(clock.time() * 1000)
+    # Checked by another process.
+    input_data['expires'] = int((time.time() + timeout) * 1000)
     await send_predictor_command(redis, PredictCommand.PREDICT, input_data)
 
     while True:
-        remaining_seconds = finish_time - time.time()
+        remaining_seconds = finish_time - time.monotonic()
 
         if remaining_seconds < 0.001:
             logger.info('Got no prediction for %s.', input_data['message_guid'])
@@ -132,6 +160,7 @@ async def predict_with_timeout(redis: Redis, external_rates: LocalRates, *, time
 
         prediction_data = await receive_next_prediction(
             redis,
+            # blpop waits for whole seconds, so a lost prediction may take up to a second.
             timeout=int(math.ceil(remaining_seconds))
         )
 
@@ -0,0 +1,116 @@
+import asyncio
+from collections import deque
+from typing import Iterable, List
+
+import byn.constants as const
+from byn.datatypes import ExternalRateData
+from byn.realtime import clock
+
+
+class LatencyStats:
+    """
+    Latencies (seconds) of the latest *size* events.
+    """
+
+    def __init__(self, size: int=1024):
+        self._samples = deque(maxlen=size)
+        self.count = 0
+
+    def add(self, seconds: float):
+        self._samples.append(seconds)
+        self.count += 1
+
+    def get_metrics(self) -> dict:
+        if not self._samples:
+            return {'count': self.count}
+
+        samples = sorted(self._samples)
+        return {
+            'count': self.count,
+            'p50': samples[len(samples) // 2],
+            'p99': samples[min(len(samples) - 1, len(samples) * 99 // 100)],
+            'max': samples[-1],
+        }
+
+
+class TickQueue:
+    """
+    Ticks between the forexpf reader and workers.
+
+    Every tick is kept for persistence, but not more than *max_ticks*: the oldest ones are dropped
+    (and counted) when workers fall behind. Cache consumers get only the latest tick of every currency,
+    so they never process stale values.
+    """
+
+    def __init__(self, max_ticks: int=const.FOREXPF_MAX_PENDING_TICKS):
+        self._ticks = deque(maxlen=max_ticks)
+        self._latest = {}   # type: Dict[str, ExternalRateData]
+        self._has_ticks = asyncio.Event()
+        self._has_latest = asyncio.Event()
+
+        self.received = 0
+        self.overflow = 0
+        self.coalesced = 0
+        self.latency = {
+            stage: LatencyStats()
+            for stage in ('persist_queue', 'persist_write', 'cache_queue', 'cache_write')
+        }
+
+    def qsize(self) -> int:
+        return len(self._ticks)
+
+    def put(self, ticks: Iterable[ExternalRateData]):
+        for tick in ticks:
+            if len(self._ticks) == self._ticks.maxlen:
+                self.overflow += 1
+
+            self._ticks.append(tick)
+
+            if tick.currency in self._latest:
+                self.coalesced += 1
+
+            self._latest[tick.currency] = tick
+            self.received += 1
+
+        self._has_ticks.set()
+        self._has_latest.set()
+
+    async def get_ticks(self, limit: int=const.FOREXPF_PERSIST_BATCH_SIZE) -> List[ExternalRateData]:
+        """
+        :return: up to *limit* oldest ticks.
+        """
+        await self._has_ticks.wait()
+
+        ticks = [self._ticks.popleft() for _ in range(min(limit, len(self._ticks)))]
+        if not self._ticks:
+            self._has_ticks.clear()
+
+        self._add_latency('persist_queue', ticks)
+        return ticks
+
+    async def get_latest(self) -> List[ExternalRateData]:
+        """
+        :return: the latest tick of every currency which changed since the previous call.
+        """
+        await self._has_latest.wait()
+
+        latest = list(self._latest.values())
+        self._latest = {}
+        self._has_latest.clear()
+
+        self._add_latency('cache_queue', latest)
+        return latest
+
+    def _add_latency(self, stage: str, ticks: List[ExternalRateData]):
+        current_time = clock.time()
+        for tick in ticks:
+            self.latency[stage].add(current_time - tick.timestamp_received)
+
+    def get_metrics(self) -> dict:
+        return {
+            'pending': len(self._ticks),
+            'received': self.received,
+            'overflow': self.overflow,
+            'coalesced': self.coalesced,
+            'latency': {stage: x.get_metrics() for stage, x in self.latency.items()},
+        }
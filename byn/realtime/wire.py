@@ -0,0 +1,72 @@
+"""
+Compact binary encoding of PREDICT commands.
+
+Binary messages start with a zero byte which is never the first byte of a json document,
+so receivers accept both formats and json stays usable for debugging.
+Prediction replies stay json: their body is a nested record, and a json body behind
+a binary header benchmarked slower than plain json.
+"""
+import struct
+from enum import Enum
+
+
+WIRE_VERSION = 1
+MAGIC = b'\x00'
+
+KIND_PREDICT_COMMAND = 1
+
+# magic, version, kind
+_HEADER = struct.Struct('<cBB')
+# message_guid, expires, eur, rub, uah, dxy
+_PREDICT_COMMAND = struct.Struct('<qqdddd')
+
+RATE_NAMES = 'eur', 'rub', 'uah', 'dxy'
+
+
+class WireFormat(Enum):
+    JSON = 'json'
+    BINARY = 'binary'
+
+
+class WireFormatError(ValueError):
+    pass
+
+
+def is_binary(raw: bytes) -> bool:
+    return raw[:1] == MAGIC
+
+
+def _read_header(raw: bytes, expected_kind: int):
+    _, version, kind = _HEADER.unpack_from(raw)
+
+    if version != WIRE_VERSION:
+        raise WireFormatError(f'Unsupported wire version: {version}')
+
+    if kind != expected_kind:
+        raise WireFormatError(f'Unexpected message kind: {kind}')
+
+
+def encode_predict_command(data: dict) -> bytes:
+    return _HEADER.pack(MAGIC, WIRE_VERSION, KIND_PREDICT_COMMAND) + _PREDICT_COMMAND.pack(
+        data['message_guid'],
+        data['expires'],
+        *(float(data[x]) for x in RATE_NAMES)
+    )
+
+
+def decode_predict_command(raw: bytes) -> dict:
+    """
+    :return: the same structure as a json-encoded PREDICT command has, but rates are floats.
+        No Decimals are created on the hot path: the predictor works with floats anyway.
+    """
+    _read_header(raw, KIND_PREDICT_COMMAND)
+    message_guid, expires, *rates = _PREDICT_COMMAND.unpack_from(raw, _HEADER.size)
+
+    data = dict(zip(RATE_NAMES, rates))
+    data['message_guid'] = message_guid
+    data['expires'] = expires
+
+    return {
+        'command': 'PREDICT',
+        'data': data,
+    }
@@ -0,0 +1,51 @@
+"""
+Rolling averages of daily rates for all durations at once.
+
+Averages are differences of prefix sums divided by durations, so the cost doesn't depend on durations.
+Decimal prefix sums are computed with PREFIX_SUM_PRECISION digits, which is enough to keep them exact
+for DECIMAL(31, 26) rates, so only the final division is rounded (by the current decimal context)
+as np.mean of a window of Decimals is.
+"""
+import decimal
+from typing import Dict, Iterable, Tuple
+
+import numpy as np
+
+
+PREFIX_SUM_PRECISION = 60
+
+
+def compute_rolling_averages(
+        rates: np.ndarray,
+        durations: Iterable[int],
+        *,
+        start_index: int=0
+) -> Dict[int, Tuple[int, np.ndarray]]:
+    """
+    An average for day i is the mean of *duration* days before it (i - duration ... i - 1).
+    Day len(rates) is the day after the last one.
+
+    :param rates: (days, columns) array ordered by date. Object arrays of Decimals are averaged exactly.
+    :param start_index: the first day to compute averages for.
+    :return: duration -> (index of the first day which has enough days before it,
+        (days, columns) averages of that day and all the following ones).
+    """
+    days = len(rates)
+
+    with decimal.localcontext() as context:
+        context.prec = PREFIX_SUM_PRECISION
+
+        prefix_sums = np.zeros((days + 1, rates.shape[1]), dtype=rates.dtype)
+        np.cumsum(rates, axis=0, out=prefix_sums[1:])
+
+        window_sums = {}
+        for duration in durations:
+            first_index = min(max(start_index, duration), days + 1)
+            window_sums[duration] = first_index, (
+                prefix_sums[first_index:] - prefix_sums[first_index - duration:max(days + 1 - duration, 0)]
+            )
+
+    return {
+        duration: (first_index, sums / duration)
+        for duration, (first_index, sums) in window_sums.items()
+    }
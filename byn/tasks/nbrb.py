@@ -33,6 +33,7 @@ from byn.postgres_db import (
     NbrbKind,
 )
 from byn.utils import create_redis
+from byn.rolling_average import compute_rolling_averages
 from byn.realtime.synchronization import (
     NBRB,
     mark_as_ready,
@@ -262,37 +263,24 @@ def load_rolling_average():
         x.rub,
         x.uah,
         x.dxy,
-    ) for x in nbrb_rows])
+    ) for x in nbrb_rows]).reshape(-1, 4)
 
     if last_rolling_average_date is None:
         start_index = 0
     else:
         start_index = dates.index(last_rolling_average_date) + 1
 
-    rolling_averages = {}
-
-    for i in range(start_index, len(rates) + 1):
-        per_duration = {x: [] for x in const.ROLLING_AVERAGE_DURATIONS}
-        rolling_averages[dates[i]] = per_duration
-        for duration in const.ROLLING_AVERAGE_DURATIONS:
-            if i < duration:
-                continue
-
-            for data_column in range(4):
-                per_duration[duration].append(
-                    Decimal(np.mean(rates[i - duration:i, data_column]))
-                )
+    rolling_averages = compute_rolling_averages(
+        rates,
+        const.ROLLING_AVERAGE_DURATIONS,
+        start_index=start_index
+    )
 
     mass_insert = []
 
-    for date in rolling_averages:
-        for duration in const.ROLLING_AVERAGE_DURATIONS:
-            if rolling_averages[date][duration]:
-                mass_insert.append(
-                    insert_rolling_average(
-                        date, duration, rolling_averages[date][duration]
-                    )
-                )
+    for duration, (first_index, averages) in rolling_averages.items():
+        for date, data in zip(dates[first_index:], averages.tolist()):
+            mass_insert.append(insert_rolling_average(date, duration, data))
 
     async def _run_mass_insert(chunk: List[Coroutine]):
         await asyncio.gather(*chunk)
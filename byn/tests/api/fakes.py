@@ -0,0 +1,83 @@
+"""
+Stand-ins shared by realtime tests.
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Optional
+
+import simplejson
+
+from byn.datatypes import ExternalRateData
+from byn.realtime import clock
+
+
+class FakeRedis:
+    """
+    In-memory subset of the aioredis interface used by realtime code.
+    """
+
+    def __init__(self):
+        self.values = {}
+        self.hashes = {}
+        self.lists = {}
+        self.published = []
+        self.hgetall_calls = 0
+
+    async def set(self, key, value):
+        self.values[key] = value.encode()
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def hget(self, key, field):
+        return self.hashes.get(key, {}).get(field.encode())
+
+    async def hmset_dict(self, key, fields):
+        self.hashes.setdefault(key, {}).update({k.encode(): str(v).encode() for k, v in fields.items()})
+
+    async def hgetall(self, key):
+        self.hgetall_calls += 1
+        return dict(self.hashes.get(key, {}))
+
+    async def rpush(self, key, value):
+        self.lists.setdefault(key, deque()).append(value.encode() if isinstance(value, str) else value)
+
+    async def blpop(self, key, timeout=0):
+        """
+        :param timeout: real seconds, 0 is forever.
+        """
+        deadline = time.monotonic() + timeout
+
+        while not self.lists.get(key):
+            if timeout and time.monotonic() >= deadline:
+                return None
+
+            await asyncio.sleep(0.001)
+
+        return key.encode(), self.lists[key].popleft()
+
+    async def publish(self, channel, message):
+        self.published.append(simplejson.loads(message))
+
+
+def make_tick(
+        currency: str='EUR',
+        close: float=1.12,
+        *,
+        volume: int=1,
+        timestamp_received: Optional[float]=None
+) -> ExternalRateData:
+    """
+    :param timestamp_received: current clock time by default.
+    """
+    return ExternalRateData(
+        currency=currency,
+        timestamp_open=1557000000,
+        rate_open=close,
+        close=close,
+        low=close,
+        high=close,
+        volume=volume,
+        timestamp_received=clock.time() if timestamp_received is None else timestamp_received,
+    )
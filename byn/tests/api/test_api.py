@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+from aiohttp.test_utils import TestClient, TestServer
+
+import byn.constants as const
+from byn.realtime import api
+from byn.realtime.api import create_app
+
+
+@pytest_asyncio.fixture
+async def client():
+    client = TestClient(TestServer(create_app()))
+    await client.start_server()
+    yield client
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_websocket__permessage_deflate(client):
+    ws = await client.ws_connect('/predict.ws', compress=15, protocols=(const.WS_DELTA_PROTOCOL, ))
+
+    assert ws.compress == 15
+    assert ws.protocol == const.WS_DELTA_PROTOCOL
+    await ws.close()
+
+
+@pytest.mark.asyncio
+async def test_websocket__no_compression_offered(client):
+    ws = await client.ws_connect('/predict.ws', compress=0)
+
+    assert not ws.compress
+    assert ws.protocol is None
+    await ws.close()
+
+
+class FakeProcess:
+    def __init__(self, name, exitcode=None):
+        self.name = name
+        self.exitcode = exitcode
+
+
+def test_restart_exited_api_workers(monkeypatch):
+    monkeypatch.setattr(api, 'start_api_worker', lambda number: FakeProcess(f'restarted-{number}'))
+    processes = [FakeProcess('api-worker-0'), FakeProcess('api-worker-1', exitcode=1)]
+
+    assert api.restart_exited_api_workers(processes) == 1
+    assert [x.name for x in processes] == ['api-worker-0', 'restarted-1']
+    assert api.restart_exited_api_workers(processes) == 0
+
+
+@pytest.mark.asyncio
+async def test_watch_api_workers(monkeypatch):
+    monkeypatch.setattr(const, 'API_WORKER_CHECK_INTERVAL', 0)
+    processes = [FakeProcess('api-worker-0')]
+
+    async def kill_worker():
+        await asyncio.sleep(0.01)
+        processes[0].exitcode = -9
+
+    asyncio.ensure_future(kill_worker())
+
+    with pytest.raises(api.ApiWorkerError):
+        await asyncio.wait_for(api.watch_api_workers(processes), 1)
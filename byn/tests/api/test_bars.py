@@ -0,0 +1,91 @@
+import pytest
+
+import byn.constants as const
+from byn.datatypes import Bar
+from byn.realtime import bars
+from byn.realtime.bars import BarStore
+
+
+def test_bar_store():
+    store = BarStore(resolutions=(60, 300))
+
+    for timestamp, value in ((1000, 2.), (1010, 2.5), (1019, 1.5), (1020, 1.7)):
+        store.add('bcse_USD', timestamp, value)
+
+    assert store.get_current('bcse_USD', 60) == Bar(timestamp=1020, open=1.7, high=1.7, low=1.7, close=1.7)
+    assert store.get_current('bcse_USD', 300) == Bar(timestamp=900, open=2., high=2.5, low=1.5, close=1.7)
+    assert store.pop_dirty() == [
+        ('bcse_USD', 60, Bar(timestamp=960, open=2., high=2.5, low=1.5, close=1.5)),
+        ('bcse_USD', 300, Bar(timestamp=900, open=2., high=2.5, low=1.5, close=1.7)),
+        ('bcse_USD', 60, Bar(timestamp=1020, open=1.7, high=1.7, low=1.7, close=1.7)),
+    ]
+    assert store.pop_dirty() == []
+
+
+def test_bar_store__late_point():
+    store = BarStore(resolutions=(60, ))
+    store.add('bcse_USD', 1020, 2.)
+    store.add('bcse_USD', 1000, 3.)
+
+    assert store.get_current('bcse_USD', 60) == Bar(timestamp=1020, open=2., high=2., low=2., close=2.)
+
+
+def test_bar_store__late_point_in_coarser_bar():
+    store = BarStore(resolutions=(60, 300))
+    store.add('bcse_USD', 1020, 2.)
+    store.pop_dirty()
+    # In the previous 60s bar, but in the current 300s one.
+    store.add('bcse_USD', 1000, 3.)
+    # In the current bars of both resolutions, but before the latest point.
+    store.add('bcse_USD', 1010, 3.)
+
+    assert store.get_current('bcse_USD', 60) == Bar(timestamp=1020, open=2., high=2., low=2., close=2.)
+    assert store.get_current('bcse_USD', 300) == Bar(timestamp=900, open=2., high=2., low=2., close=2.)
+    assert store.pop_dirty() == []
+
+
+def test_bar_store__restore_dirty():
+    store = BarStore(resolutions=(60, ))
+    store.add('bcse_USD', 1000, 2.)
+    store.add('bcse_USD', 1020, 2.)
+    dirty = store.pop_dirty()
+    # Updated after it's popped.
+    store.add('bcse_USD', 1030, 3.)
+
+    store.restore_dirty(dirty)
+
+    assert store.pop_dirty() == [
+        ('bcse_USD', 60, Bar(timestamp=1020, open=2., high=3., low=2., close=3.)),
+        ('bcse_USD', 60, Bar(timestamp=960, open=2., high=2., low=2., close=2.)),
+    ]
+
+
+class Stop(Exception):
+    pass
+
+
+@pytest.mark.asyncio
+async def test_persist_bars__insert_fails(monkeypatch):
+    store = BarStore(resolutions=(60, ))
+    store.add('bcse_USD', 1000, 2.)
+    calls = []
+
+    async def insert_bars(data):
+        calls.append(data)
+
+        if len(calls) == 1:
+            raise ConnectionError()
+
+        raise Stop()
+
+    monkeypatch.setattr(const, 'BAR_FLUSH_INTERVAL', 0)
+    monkeypatch.setattr(bars, 'bars', store)
+    monkeypatch.setattr(bars, 'insert_bars', insert_bars)
+
+    with pytest.raises(ConnectionError):
+        await bars.persist_bars.__wrapped__()
+
+    with pytest.raises(Stop):
+        await bars.persist_bars.__wrapped__()
+
+    assert calls[1] == [('bcse_USD', 60, Bar(timestamp=960, open=2., high=2., low=2., close=2.))]
@@ -1,8 +1,17 @@
+import asyncio
 import datetime
+from collections import OrderedDict
 
 import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
 
-from byn.realtime import bcse
+import byn.constants as const
+from byn.datatypes import PredictCommand
+from byn.realtime import bcse, clock
+from byn.realtime.bars import BarStore
+from byn.realtime.clock import AcceleratedClock
+from byn.tests.api.fakes import FakeRedis
 
 
 @pytest.mark.parametrize('date,expected', [
@@ -51,3 +60,105 @@ def test_is_holiday__november_2019(date, expected):
 ])
 def test_is_holiday__annual_holidays(date):
     assert bcse.is_holiday(date)
+
+
+@pytest.fixture
+def trading_clock():
+    previous = clock.use(AcceleratedClock(start=datetime.datetime(2019, 5, 6, 11, 0, 1), speed=20))
+    yield
+    clock.use(previous)
+
+
+def test_align_poll_time(trading_clock):
+    now = clock.time()
+    step = const.BCSE_MIN_UPDATE_INTERVAL
+
+    assert bcse._align_poll_time(now + 7) % step == 0
+    assert abs(bcse._align_poll_time(now + 7) - (now + 7)) <= step / 2
+    # A poll is never due right away.
+    assert now < bcse._align_poll_time(now) <= now + step
+
+
+class StandInBcse:
+    """
+    Returns one trade per currency. Requests wait for each other to check they are concurrent.
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.all_in_flight = asyncio.Event()
+
+        self.app = web.Application()
+        self.app.add_routes([web.get('/exchange/last/{currency}/{date}', self.handler)])
+
+    async def handler(self, request):
+        currency = request.match_info['currency']
+        self.requests.append(currency)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        if self.in_flight == len(const.BCSE_CURRENCIES):
+            self.all_in_flight.set()
+
+        try:
+            await asyncio.wait_for(self.all_in_flight.wait(), timeout=0.5)
+        except asyncio.TimeoutError:
+            pass
+
+        self.in_flight -= 1
+        self.all_in_flight.clear()
+        timestamp = int(datetime.datetime(2019, 5, 6, 14).timestamp()) * 1000
+
+        return web.json_response([{
+            'color': const.BCSE_LAST_OPERATION_COLOR,
+            'data': [[timestamp + const.BCSE_CURRENCIES.index(currency) * 1000, '2.05']],
+        }])
+
+
+@pytest.mark.asyncio
+async def test_listen_to_bcse_till__all_currencies(trading_clock, monkeypatch):
+    stand_in = StandInBcse()
+    server = TestServer(stand_in.app)
+    await server.start_server()
+    redis = FakeRedis()
+    inserts = []
+    commands = []
+
+    async def build_initial_current_records(today, currency):
+        return OrderedDict()
+
+    async def create_redis():
+        return redis
+
+    async def mark_as_ready(thread_name):
+        pass
+
+    async def insert_bcse(data):
+        inserts.append(sorted(x.currency for x in data))
+
+    async def send_predictor_command(redis, command, data):
+        commands.append((command, data['currency']))
+
+    monkeypatch.setattr(const, 'BCSE_BASE_URL', str(server.make_url('')))
+    monkeypatch.setattr(bcse, '_build_initial_current_records', build_initial_current_records)
+    monkeypatch.setattr(bcse, 'create_redis', create_redis)
+    monkeypatch.setattr(bcse, 'mark_as_ready', mark_as_ready)
+    monkeypatch.setattr(bcse, 'insert_bcse', insert_bcse)
+    monkeypatch.setattr(bcse, 'send_predictor_command', send_predictor_command)
+    monkeypatch.setattr(bcse, 'bars', BarStore())
+
+    try:
+        # Two rounds: the first one and one on the 5 seconds grid.
+        await bcse._listen_to_bcse_till.__wrapped__(clock.now() + datetime.timedelta(seconds=6))
+        await asyncio.sleep(0.01)
+    finally:
+        await server.close()
+
+    assert sorted(stand_in.requests) == sorted(2 * const.BCSE_CURRENCIES)
+    assert stand_in.max_in_flight == len(const.BCSE_CURRENCIES)
+    # Trades of all currencies are inserted at once.
+    assert inserts == [sorted(const.BCSE_CURRENCIES)]
+    assert commands == [(PredictCommand.NEW_BCSE, 'USD')]
+    assert sorted(x['currency'] for x in redis.published) == sorted(const.BCSE_CURRENCIES)
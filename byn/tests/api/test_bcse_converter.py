@@ -0,0 +1,28 @@
+from decimal import Decimal
+
+import numpy as np
+
+from byn.realtime.bcse_converter import _join_external_rates
+
+
+def test_join_external_rates():
+    live = {
+        'EUR': ((100, Decimal('1.12')), (130, Decimal('1.13')), (170, Decimal('1.14'))),
+    }
+    historical = {
+        'EUR': [(60, Decimal('1.10')), (119, Decimal('1.11')), (120, Decimal('1.115')), (170, Decimal('1.2'))],
+        'RUB': [(60, Decimal('64.1')), (119, Decimal('64.2'))],
+    }
+
+    joined = _join_external_rates(live, historical)
+
+    assert set(joined) == {'EUR', 'RUB'}
+    np.testing.assert_array_equal(joined['EUR'], [
+        [60, 1.10],
+        [100, 1.12],
+        [119, 1.11],
+        [120, 1.115],
+        [130, 1.13],
+        [170, 1.14],
+    ])
+    np.testing.assert_array_equal(joined['RUB'], [[60, 64.1], [119, 64.2]])
@@ -0,0 +1,75 @@
+import numpy as np
+
+from byn.realtime.bcse_delta import (
+    BcseDeltaSender,
+    BcseDeltaReceiver,
+    RowBuffer,
+    DELTA,
+    FULL,
+    RESYNC,
+)
+
+
+def test_sender():
+    sender = BcseDeltaSender('USD')
+
+    first = sender.build(all_rates=[(1, '2.1')], new_rates=[(1, '2.1')])
+    second = sender.build(all_rates=[(1, '2.1'), (2, '2.2')], new_rates=[(2, '2.2')])
+
+    assert first == {'currency': 'USD', 'epoch': sender.epoch, 'sequence': 0, 'full': True, 'rates': [(1, '2.1')]}
+    assert second == {'currency': 'USD', 'epoch': sender.epoch, 'sequence': 1, 'full': False, 'rates': [(2, '2.2')]}
+
+
+def test_receiver():
+    sender = BcseDeltaSender('USD')
+    receiver = BcseDeltaReceiver()
+    commands = [sender.build(all_rates=[], new_rates=[]) for _ in range(4)]
+
+    assert receiver.receive(commands[0]) == FULL
+    assert receiver.receive(commands[1]) == DELTA
+    # commands[2] is lost.
+    assert receiver.receive(commands[3]) == RESYNC
+    assert receiver.resyncs == 1
+
+
+def test_receiver__new_epoch():
+    receiver = BcseDeltaReceiver()
+    old_sender = BcseDeltaSender('USD')
+    receiver.receive(old_sender.build(all_rates=[], new_rates=[]))
+    receiver.receive(old_sender.build(all_rates=[], new_rates=[]))
+
+    new_sender = BcseDeltaSender('USD')
+    assert receiver.receive(new_sender.build(all_rates=[], new_rates=[])) == FULL
+    assert receiver.receive(new_sender.build(all_rates=[], new_rates=[])) == DELTA
+
+
+def test_receiver__joins_in_the_middle():
+    sender = BcseDeltaSender('USD')
+    sender.build(all_rates=[], new_rates=[])
+
+    receiver = BcseDeltaReceiver()
+    assert receiver.receive(sender.build(all_rates=[], new_rates=[])) == RESYNC
+    assert receiver.receive(sender.build(all_rates=[], new_rates=[])) == DELTA
+
+
+def test_receiver__legacy_command():
+    assert BcseDeltaReceiver().receive({'rates': [(1, '2.1')]}) == FULL
+
+
+def test_row_buffer():
+    buffer = RowBuffer(2, dtype=object, capacity=2)
+    buffer.extend([(1, '2.1')])
+    before_growth = buffer.view()
+
+    buffer.extend([(2, '2.2'), (3, '2.3')])
+
+    assert len(buffer) == 3
+    assert buffer.view().tolist() == [[1, '2.1'], [2, '2.2'], [3, '2.3']]
+    assert before_growth.tolist() == [[1, '2.1']]
+
+
+def test_row_buffer__float():
+    buffer = RowBuffer(1, dtype='float64')
+    buffer.extend([('2.1', ), ('2.2', )])
+
+    np.testing.assert_array_equal(buffer.view()[:, 0], [2.1, 2.2])
@@ -0,0 +1,88 @@
+import datetime
+
+import pytest
+
+from byn.realtime.bcse_polling import BcsePoller
+
+
+OPEN_DT = datetime.datetime(2019, 5, 6, 9, 55)
+
+
+def _poller() -> BcsePoller:
+    return BcsePoller(
+        open_datetime=OPEN_DT,
+        start_timestamp=OPEN_DT.timestamp(),
+        min_interval=5,
+        max_interval=30,
+        backoff=2,
+        open_period=datetime.timedelta(minutes=20),
+    )
+
+
+def test_conditional_headers():
+    poller = _poller()
+    assert poller.get_request_headers() == {}
+
+    assert poller.is_changed(200, {'ETag': '"1"', 'Last-Modified': 'Mon, 06 May 2019 07:00:00 GMT'}, b'[]')
+    assert poller.get_request_headers() == {
+        'If-None-Match': '"1"',
+        'If-Modified-Since': 'Mon, 06 May 2019 07:00:00 GMT',
+    }
+
+
+def test_not_modified():
+    poller = _poller()
+    assert poller.is_changed(200, {'ETag': '"1"'}, b'[1]')
+
+    assert not poller.is_changed(304, {}, b'')
+    assert poller.get_request_headers() == {'If-None-Match': '"1"'}
+    assert poller.not_modified == 1
+    assert poller.downloaded_bytes == 3
+
+
+def test_same_body():
+    poller = _poller()
+    assert poller.is_changed(200, {}, b'[1]')
+    assert not poller.is_changed(200, {}, b'[1]')
+    assert poller.is_changed(200, {}, b'[1, 2]')
+
+    assert poller.unchanged == 1
+    assert poller.downloaded_bytes == 12
+    assert poller.parsed_bytes == 9
+
+
+@pytest.mark.parametrize('minutes,has_new_trades,expected', (
+    (0, False, [5, 5, 5]),
+    (30, False, [10, 20, 30, 30]),
+    (30, True, [5, 5]),
+))
+def test_get_next_interval(minutes, has_new_trades, expected):
+    poller = _poller()
+    current_dt = OPEN_DT + datetime.timedelta(minutes=minutes)
+
+    assert [
+        poller.get_next_interval(current_dt, has_new_trades=has_new_trades) for _ in expected
+    ] == expected
+
+
+def test_trade_resets_interval():
+    poller = _poller()
+    current_dt = OPEN_DT + datetime.timedelta(hours=1)
+
+    for _ in range(5):
+        poller.get_next_interval(current_dt, has_new_trades=False)
+
+    assert poller.get_next_interval(current_dt, has_new_trades=True) == 5
+    assert poller.get_next_interval(current_dt, has_new_trades=False) == 10
+
+
+def test_detection_latency():
+    poller = _poller()
+    start = OPEN_DT.timestamp()
+
+    # The first trade was made before the reader started.
+    poller.add_new_trades([start - 100, start + 10, start + 20], start + 25)
+
+    metrics = poller.get_metrics(start + 3600)
+    assert metrics['detection_latency']['count'] == 2
+    assert metrics['detection_latency']['max'] == 15
@@ -0,0 +1,162 @@
+import asyncio
+
+import pytest
+
+from byn.realtime.broadcast import Broadcaster
+
+
+class FakeWebSocket:
+    def __init__(self, send_delay: float=0):
+        self.send_delay = send_delay
+        self.received = []
+        self.closed = False
+
+    async def send_str(self, payload):
+        await asyncio.sleep(self.send_delay)
+        self.received.append(payload)
+
+    async def close(self, code=None):
+        self.closed = True
+
+
+@pytest.mark.asyncio
+async def test_broadcaster__fan_out():
+    broadcaster = Broadcaster()
+    clients = [FakeWebSocket() for _ in range(3)]
+    for ws in clients:
+        broadcaster.add(ws)
+
+    broadcaster.publish('{"a": 1}')
+    await asyncio.sleep(0.01)
+
+    assert [x.received for x in clients] == [['{"a": 1}']] * 3
+
+    broadcaster.remove(clients[0])
+    broadcaster.publish('{"a": 2}')
+    await asyncio.sleep(0.01)
+
+    assert len(broadcaster) == 2
+    assert clients[0].received == ['{"a": 1}']
+    assert clients[1].received == ['{"a": 1}', '{"a": 2}']
+
+
+@pytest.mark.asyncio
+async def test_broadcaster__slow_client_gets_the_latest():
+    broadcaster = Broadcaster(max_pending=1, send_timeout=1)
+    ws = FakeWebSocket(send_delay=0.05)
+    subscriber = broadcaster.add(ws)
+
+    for i in range(5):
+        broadcaster.publish(str(i))
+        await asyncio.sleep(0)
+
+    await asyncio.sleep(0.2)
+
+    assert ws.received == ['0', '4']
+    assert subscriber.dropped == 3
+
+
+@pytest.mark.asyncio
+async def test_broadcaster__stuck_client_is_disconnected():
+    broadcaster = Broadcaster(send_timeout=0.05)
+    ws = FakeWebSocket(send_delay=10)
+    broadcaster.add(ws)
+
+    broadcaster.publish('1')
+    await asyncio.sleep(0.1)
+
+    assert ws.closed
+    assert broadcaster.get_metrics()['stuck'] == 1
+
+
+@pytest.mark.asyncio
+async def test_broadcaster__snapshot_on_connect():
+    broadcaster = Broadcaster()
+    broadcaster.publish('1')
+    broadcaster.publish('2')
+
+    ws = FakeWebSocket()
+    broadcaster.add(ws)
+    await asyncio.sleep(0.01)
+
+    assert ws.received == ['2']
+
+
+@pytest.mark.asyncio
+async def test_broadcaster__delta_mode():
+    broadcaster = Broadcaster()
+    full_ws = FakeWebSocket()
+    delta_ws = FakeWebSocket()
+    broadcaster.add(full_ws)
+    broadcaster.add(delta_ws, delta=True)
+
+    for payload, delta_payload in (('full-1', None), ('full-2', 'delta-2'), ('full-3', None), ('full-4', 'delta-4')):
+        broadcaster.publish(payload, delta_payload)
+        await asyncio.sleep(0.01)
+
+    assert full_ws.received == ['full-1', 'full-2', 'full-3', 'full-4']
+    assert delta_ws.received == ['full-1', 'delta-2', 'full-3', 'delta-4']
+
+
+@pytest.mark.asyncio
+async def test_broadcaster__delta_mode__keyframe_after_drop():
+    broadcaster = Broadcaster(max_pending=1)
+    ws = FakeWebSocket(send_delay=0.05)
+    broadcaster.add(ws, delta=True)
+
+    for i in range(1, 5):
+        broadcaster.publish(f'full-{i}', f'delta-{i}')
+        await asyncio.sleep(0)
+
+    await asyncio.sleep(0.2)
+    broadcaster.publish('full-5', 'delta-5')
+    await asyncio.sleep(0.1)
+
+    assert ws.received == ['full-1', 'full-4', 'delta-5']
+
+
+@pytest.mark.asyncio
+async def test_broadcaster__topics():
+    broadcaster = Broadcaster()
+    default_ws = FakeWebSocket()
+    bcse_ws = FakeWebSocket()
+    broadcaster.add(default_ws)
+    broadcaster.add(bcse_ws, topics=('bcse', ))
+
+    assert not broadcaster.has_subscribers('external')
+    assert broadcaster.has_subscribers('bcse')
+
+    broadcaster.publish('prediction-1')
+    broadcaster.publish('bcse-1', topic='bcse')
+    await asyncio.sleep(0.01)
+
+    assert default_ws.received == ['prediction-1']
+    assert bcse_ws.received == ['bcse-1']
+
+    broadcaster.subscribe(default_ws, ('bcse', 'unknown'))
+    broadcaster.unsubscribe(bcse_ws, ('bcse', ))
+    await asyncio.sleep(0.01)
+    broadcaster.publish('bcse-2', topic='bcse')
+    await asyncio.sleep(0.01)
+
+    # The snapshot is sent on subscription.
+    assert default_ws.received == ['prediction-1', 'bcse-1', 'bcse-2']
+    assert bcse_ws.received == ['bcse-1']
+    assert broadcaster.get_metrics()['topics'] == {'prediction': 1, 'external': 0, 'bcse': 1, 'model': 0}
+
+
+@pytest.mark.asyncio
+async def test_broadcaster__topics_are_queued_separately():
+    broadcaster = Broadcaster(max_pending=1)
+    ws = FakeWebSocket(send_delay=0.05)
+    subscriber = broadcaster.add(ws, topics=('prediction', 'external'))
+
+    broadcaster.publish('prediction-1')
+    await asyncio.sleep(0)
+    broadcaster.publish('prediction-2')
+    broadcaster.publish('external-1', topic='external')
+    await asyncio.sleep(0.2)
+
+    # A frequent topic doesn't push out a pending message of another one.
+    assert sorted(ws.received) == ['external-1', 'prediction-1', 'prediction-2']
+    assert subscriber.dropped == 0
@@ -0,0 +1,60 @@
+import datetime
+import time
+
+import pytest
+
+from byn.realtime import clock
+from byn.realtime.clock import AcceleratedClock, SystemClock
+
+
+@pytest.fixture
+def accelerated_clock():
+    # A trading day takes less than a second.
+    previous = clock.use(AcceleratedClock(start=datetime.datetime(2019, 5, 6, 9), speed=100000))
+    yield
+    clock.use(previous)
+
+
+def test_system_clock():
+    assert abs(SystemClock().time() - time.time()) < 0.1
+    assert abs(SystemClock().monotonic() - time.monotonic()) < 0.1
+    assert clock.speed() == 1
+
+
+def test_system_clock__follows_wall_clock(monkeypatch):
+    system_clock = SystemClock()
+    # NTP step.
+    monkeypatch.setattr(time, 'time', lambda: 1557129600.)
+
+    assert system_clock.time() == 1557129600.
+
+
+@pytest.mark.asyncio
+async def test_accelerated_clock(accelerated_clock):
+    assert clock.today() == datetime.date(2019, 5, 6)
+    assert clock.now() - datetime.datetime(2019, 5, 6, 9) < datetime.timedelta(minutes=10)
+
+    start = time.monotonic()
+    # A bcse session.
+    await clock.sleep(4 * 60 * 60 + 15 * 60)
+
+    assert time.monotonic() - start < 1
+    assert clock.now() >= datetime.datetime(2019, 5, 6, 13, 15)
+
+
+@pytest.mark.asyncio
+async def test_accelerated_clock__polling_loop(accelerated_clock):
+    finish = clock.now() + datetime.timedelta(hours=1)
+    polls = 0
+
+    while clock.now() < finish:
+        polls += 1
+        await clock.sleep(15)
+
+    # An hour of 15 seconds polling. A poll may be late, but not early.
+    assert 1 < polls <= 240
+
+
+def test_accelerated_clock__speed():
+    with pytest.raises(ValueError):
+        AcceleratedClock(start=0, speed=0)
@@ -0,0 +1,57 @@
+import datetime
+
+import pytest
+
+from byn.realtime.day_store import DayScopedStore
+
+
+def _ts(day, hour=10):
+    return int(datetime.datetime(2019, 5, day, hour).timestamp())
+
+
+def test_day_scoped_store__get_set():
+    store = DayScopedStore()
+    store[_ts(13)] = 1.5
+
+    assert _ts(13) in store
+    assert _ts(14) not in store
+    assert store[_ts(13)] == 1.5
+    assert store.get(_ts(14)) is None
+
+    with pytest.raises(KeyError):
+        store[_ts(14)]
+
+
+def test_day_scoped_store__max_days():
+    store = DayScopedStore(max_days=2)
+
+    for day in (13, 14, 15):
+        store[_ts(day)] = day
+        store[_ts(day, hour=11)] = day
+
+    assert store.get_metrics() == {'days': 2, 'items': 4}
+    assert _ts(13) not in store
+    assert list(store.items()) == [(_ts(14), 14), (_ts(14, 11), 14), (_ts(15), 15), (_ts(15, 11), 15)]
+
+
+def test_day_scoped_store__evict_before():
+    store = DayScopedStore(max_days=5)
+
+    for day in (13, 14, 15):
+        store[_ts(day)] = day
+
+    assert store.evict_before(datetime.date(2019, 5, 15)) == 2
+    assert store.get_metrics() == {'days': 1, 'items': 1}
+
+
+def test_day_scoped_store__get_day():
+    store = DayScopedStore()
+    store[_ts(13)] = 13
+    store[_ts(14)] = 14
+
+    day = store.get_day(datetime.date(2019, 5, 14))
+    day[_ts(14, 11)] = 14
+
+    assert day == {_ts(14): 14, _ts(14, 11): 14}
+    assert store.get_day(datetime.date(2019, 5, 14)) == {_ts(14): 14}
+    assert store.get_day(datetime.date(2019, 5, 15)) == {}
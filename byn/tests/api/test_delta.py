@@ -0,0 +1,28 @@
+from byn.realtime.delta import get_delta, apply_delta
+
+
+OLD = {
+    'external': {'eur': '1.12', 'rub': '64.5', 'uah': '26.4', 'dxy': '97.1'},
+    'predicted': {'predicted': 2.05, 'ridge_info': {'std': 0.01, 'predicted': 2.05}},
+    'extra': 1,
+}
+NEW = {
+    'external': {'eur': '1.12', 'rub': '64.6', 'uah': '26.4', 'dxy': '97.1'},
+    'predicted': {'predicted': 2.06, 'ridge_info': {'std': 0.01, 'predicted': 2.06}},
+}
+
+
+def test_get_delta():
+    assert get_delta(OLD, NEW) == {
+        'external': {'rub': '64.6'},
+        'predicted': {'predicted': 2.06, 'ridge_info': {'predicted': 2.06}},
+        'extra': None,
+    }
+
+
+def test_get_delta__no_changes():
+    assert get_delta(NEW, NEW) == {}
+
+
+def test_apply_delta():
+    assert apply_delta(OLD, get_delta(OLD, NEW)) == NEW
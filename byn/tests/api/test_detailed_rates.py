@@ -0,0 +1,29 @@
+import numpy as np
+
+from byn.datatypes import LocalRates
+from byn.realtime.detailed_rates import RatesDetailedExtractor
+
+
+def _build_extractor():
+    return RatesDetailedExtractor({
+        'EUR': np.array([[10, 1.], [20, 2.]]),
+        'RUB': np.array([[10, 60.], [30, 62.]]),
+        'UAH': np.array([[15, 25.]]),
+        'DXY': np.array([[10, 96.], [20, 98.]], dtype=object),
+    })
+
+
+def test_get_array_by_timestamps():
+    np.testing.assert_array_equal(_build_extractor().get_array_by_timestamps([15, 20, 25]), [
+        [1.5, 60.5, 25., 97.],
+        [2., 61., 25., 98.],
+        [2., 61.5, 25., 98.],
+    ])
+
+
+def test_get_by_timestamps__same_as_one_by_one():
+    extractor = _build_extractor()
+    timestamps = [10, 12, 19, 30, 100]
+
+    assert list(extractor.get_by_timestamps(timestamps)) == [extractor.get_by_timestamp(x) for x in timestamps]
+    assert extractor.get_by_timestamp(100) == LocalRates(eur=2., rub=62., uah=25., dxy=98.)
@@ -0,0 +1,22 @@
+import datetime
+
+import pytest
+
+from byn.realtime import external_rates
+
+
+@pytest.mark.parametrize('current_dt,works,time_to_open', [
+    # Open.
+    (datetime.datetime(2019, 5, 6, 10), True, 0),
+    (datetime.datetime(2019, 5, 10, 23, 59), True, 0),
+    # Closed: the weekend has just started.
+    (datetime.datetime(2019, 5, 11, 0, 0), False, 2 * 24 * 60 * 60),
+    # Weekend.
+    (datetime.datetime(2019, 5, 11, 12), False, 36 * 60 * 60),
+    (datetime.datetime(2019, 5, 12, 23), False, 60 * 60),
+])
+def test_forexpf_schedule(current_dt, works, time_to_open):
+    assert external_rates._forexpf_works(current_dt) is works
+
+    if not works:
+        assert external_rates._get_time_to_open(current_dt) == time_to_open
@@ -0,0 +1,150 @@
+import asyncio
+import itertools
+import time
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from byn.forexpf import CURRENCY_CODES
+from byn.realtime.forexpf_sessions import TickDeduplicator, run_sessions
+from byn.tests.api.fakes import make_tick
+
+
+class StandInForexpf:
+    """
+    Sends the same EUR tick to every subscribed session once per *tick_interval*.
+    Tick volumes are their numbers.
+    """
+
+    def __init__(self, tick_interval: float=0.005):
+        self.tick_interval = tick_interval
+        self.volume = 0
+        self.streams = {}
+        self.subscribed = set()
+        self._session_ids = itertools.count(1)
+
+        self.app = web.Application()
+        self.app.add_routes([
+            web.get('/sse', self.sse_handler),
+            web.get('/subscribe', self.subscribe_handler),
+        ])
+
+    async def sse_handler(self, request):
+        session_id = f'sid{next(self._session_ids)}'
+        response = web.StreamResponse()
+        await response.prepare(request)
+        await response.write(f'data: 1;{session_id}\n\n'.encode())
+
+        frames = self.streams[session_id] = asyncio.Queue()
+        try:
+            while True:
+                frame = await frames.get()
+                if frame is None:
+                    break
+
+                await response.write(frame)
+        finally:
+            del self.streams[session_id]
+            self.subscribed.discard(session_id)
+
+        return response
+
+    async def subscribe_handler(self, request):
+        assert request.query['symbol'] == str(CURRENCY_CODES['EUR'])
+        self.subscribed.add(request.query['sid'])
+        return web.Response()
+
+    async def generate(self):
+        while True:
+            self.volume += 1
+            frame = f'data: 1;{CURRENCY_CODES["EUR"]};1;1557000000;1.12;1.12;1.12;1.12;{self.volume}\n\n'.encode()
+
+            for session_id, frames in self.streams.items():
+                if session_id in self.subscribed:
+                    frames.put_nowait(frame)
+
+            await asyncio.sleep(self.tick_interval)
+
+    def kill_oldest_session(self):
+        self.streams[min(self.streams)].put_nowait(None)
+
+
+async def _wait_for(condition, *, timeout: float=10):
+    """
+    Generous timeout: it's reached only if the condition never comes true.
+    """
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        await asyncio.sleep(0.001)
+
+
+async def _measure_failover(number_of_sessions: int) -> tuple:
+    """
+    Gaps are measured in ticks, so they don't depend on how fast the machine is.
+
+    :return: the number of the first tick received after a session was killed less the number of the last tick
+        generated before that, and the number of missed ticks.
+    """
+    stand_in = StandInForexpf()
+    server = TestServer(stand_in.app)
+    await server.start_server()
+    volumes = []
+
+    def on_ticks(ticks):
+        volumes.extend(x.volume for x in ticks)
+
+    generator = asyncio.create_task(stand_in.generate())
+    sessions = asyncio.create_task(run_sessions(
+        on_ticks,
+        deduplicator=TickDeduplicator(),
+        number=number_of_sessions,
+        sse_url=str(server.make_url('/sse')),
+        subscribe_url=str(server.make_url('/subscribe')),
+        currencies=('EUR', ),
+        # A single session misses tens of ticks while it reconnects.
+        reconnect_delay=50 * stand_in.tick_interval,
+    ))
+
+    try:
+        await _wait_for(lambda: len(stand_in.subscribed) == number_of_sessions and volumes)
+
+        stand_in.kill_oldest_session()
+        killed_at = stand_in.volume
+        await _wait_for(lambda: volumes[-1] > killed_at + 10)
+    finally:
+        sessions.cancel()
+        generator.cancel()
+        await asyncio.gather(sessions, generator, return_exceptions=True)
+        await server.close()
+
+    assert volumes == sorted(set(volumes))
+    gap = min(x for x in volumes if x > killed_at) - killed_at
+    missed = volumes[-1] - volumes[0] + 1 - len(volumes)
+
+    return gap, missed
+
+
+@pytest.mark.asyncio
+async def test_run_sessions__failover_without_gap():
+    gap, missed = await _measure_failover(number_of_sessions=2)
+
+    assert (gap, missed) == (1, 0), f'{gap} ticks gap during failover, {missed} missed ticks'
+
+
+@pytest.mark.asyncio
+async def test_run_sessions__single_session_has_gap():
+    gap, missed = await _measure_failover(number_of_sessions=1)
+
+    assert gap > 1 and missed > 0, f'{gap} ticks gap during failover, {missed} missed ticks'
+
+
+def test_tick_deduplicator():
+    deduplicator = TickDeduplicator(size=2)
+
+    assert [x.volume for x in deduplicator.filter([make_tick(volume=1), make_tick(volume=2), make_tick(volume=1)])] == [1, 2]
+    assert [x.volume for x in deduplicator.filter([make_tick(volume=2), make_tick(volume=3)])] == [3]
+    # The oldest key is forgotten.
+    assert [x.volume for x in deduplicator.filter([make_tick(volume=1)])] == [1]
+    assert deduplicator.get_metrics() == {'unique': 4, 'duplicates': 2}
@@ -0,0 +1,259 @@
+import datetime
+from decimal import Decimal
+
+import pytest
+import pytest_asyncio
+import simplejson
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from byn.postgres_db import NbrbKind
+from byn.realtime import clock, history_api
+from byn.realtime.clock import AcceleratedClock
+
+
+class Row(dict):
+    """
+    Rows of db queries have both item and attribute access.
+    """
+
+    def __getattr__(self, item):
+        return self[item]
+
+
+def _fake_iterate(rows):
+    calls = []
+
+    async def iterate(*args, page_size):
+        calls.append(args)
+        for row in rows:
+            yield Row(row)
+
+    iterate.calls = calls
+    return iterate
+
+
+def _fake_get_version(rows):
+    calls = []
+
+    async def get_version(*args):
+        calls.append(args)
+        return len(rows), 100 + len(rows)
+
+    get_version.calls = calls
+    return get_version
+
+
+BCSE_ROWS = [
+    {'timestamp': 1557129660 + i, 'timestamp_received': 1557129661 + i, 'rate': Decimal('2.0512')}
+    for i in range(3)
+]
+
+NBRB_ROWS = [{
+    'date': datetime.date(2019, 5, 6),
+    'usd': Decimal('2.0542'),
+    'eur': Decimal('2.3001'),
+    'rub': Decimal('0.0315'),
+    'uah': Decimal('0.0778'),
+    'byn': 1,
+    'dxy': Decimal('97.55'),
+}]
+
+
+@pytest.fixture
+def today():
+    previous = clock.use(AcceleratedClock(start=datetime.datetime(2019, 5, 20, 12), speed=1))
+    yield datetime.date(2019, 5, 20)
+    clock.use(previous)
+
+
+@pytest.fixture
+def db(monkeypatch):
+    async def init_pool():
+        return object()
+
+    fakes = {
+        'iterate_bcse': _fake_iterate(BCSE_ROWS),
+        'iterate_predictions': _fake_iterate([{
+            'timestamp': 1557129660123,
+            'external_rates': '{"eur": 1.12}',
+            'bcse_full': '[[1557129660, 2.05]]',
+            'bcse_trusted_global': '[]',
+            'prediction': '{"predicted": 2.05}',
+        }]),
+        'iterate_trade_dates': _fake_iterate([]),
+        'iterate_nbrb': _fake_iterate(NBRB_ROWS),
+        'iterate_bars': _fake_iterate([]),
+        'get_bcse_version': _fake_get_version(BCSE_ROWS),
+        'get_predictions_version': _fake_get_version([]),
+        'get_trade_dates_version': _fake_get_version([]),
+        'get_nbrb_version': _fake_get_version(NBRB_ROWS),
+        'get_bars_version': _fake_get_version([]),
+    }
+
+    monkeypatch.setattr(history_api, 'init_pool', init_pool)
+    for name, fake in fakes.items():
+        monkeypatch.setattr(history_api, name, fake)
+
+    return fakes
+
+
+@pytest_asyncio.fixture
+async def client(db, today):
+    app = web.Application()
+    app['history_db'] = history_api.LazyDbPool()
+    app.add_routes(history_api.routes)
+
+    client = TestClient(TestServer(app))
+    await client.start_server()
+    yield client
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_bcse__json(client, db):
+    response = await client.get('/history/bcse', params={'from': '2019-05-06', 'currency': 'EUR'})
+
+    assert response.status == 200
+    assert response.content_type == 'application/json'
+    assert simplejson.loads(await response.text()) == [
+        {'timestamp': 1557129660, 'timestamp_received': 1557129661, 'rate': 2.0512},
+        {'timestamp': 1557129661, 'timestamp_received': 1557129662, 'rate': 2.0512},
+        {'timestamp': 1557129662, 'timestamp_received': 1557129663, 'rate': 2.0512},
+    ]
+    assert db['iterate_bcse'].calls == [
+        ('EUR', datetime.datetime(2019, 5, 6), datetime.datetime(2019, 5, 7)),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_bcse__csv_in_chunks(client, monkeypatch):
+    monkeypatch.setattr(history_api, 'ROWS_PER_CHUNK', 2)
+
+    response = await client.get('/history/bcse', params={'from': '2019-05-06', 'format': 'csv'})
+
+    assert response.status == 200
+    assert response.content_type == 'text/csv'
+    assert (await response.text()).splitlines() == [
+        'timestamp;timestamp_received;rate',
+        '1557129660;1557129661;2.0512',
+        '1557129661;1557129662;2.0512',
+        '1557129662;1557129663;2.0512',
+    ]
+
+
+@pytest.mark.asyncio
+async def test_prediction__stored_json_is_embedded(client):
+    response = await client.get('/history/prediction', params={'from': '2019-05-06'})
+
+    assert simplejson.loads(await response.text()) == [{
+        'timestamp': 1557129660123,
+        'external_rates': {'eur': 1.12},
+        'bcse_full': [[1557129660, 2.05]],
+        'bcse_trusted_global': [],
+        'prediction': {'predicted': 2.05},
+    }]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('path, closed_date, open_date', (
+    ('/history/bcse', '2019-05-19', '2019-05-20'),
+    ('/history/prediction', '2019-05-19', '2019-05-20'),
+    ('/history/bars', '2019-05-19', '2019-05-20'),
+    ('/history/trade_date', '2019-05-13', '2019-05-14'),
+    ('/history/nbrb', '2019-05-13', '2019-05-14'),
+))
+async def test_is_closed(client, path, closed_date, open_date):
+    closed = await client.get(path, params={'from': '2019-05-01', 'to': closed_date})
+    open_ = await client.get(path, params={'from': '2019-05-01', 'to': open_date})
+
+    assert closed.status == open_.status == 200
+    assert closed.headers['Cache-Control'] == history_api.CLOSED_CACHE_CONTROL
+    assert 'ETag' in closed.headers
+    assert open_.headers['Cache-Control'] == history_api.OPEN_CACHE_CONTROL
+    assert 'ETag' not in open_.headers
+
+
+@pytest.mark.asyncio
+async def test_etag__not_modified(client, db):
+    params = {'from': '2019-05-06', 'kind': 'official'}
+    response = await client.get('/history/nbrb', params=params)
+    etag = response.headers['ETag']
+
+    response = await client.get('/history/nbrb', params=params, headers={'If-None-Match': etag})
+
+    assert response.status == 304
+    assert response.headers['ETag'] == etag
+    # Rows are read once: for the first response only.
+    assert len(db['iterate_nbrb'].calls) == 1
+    assert db['get_nbrb_version'].calls == [
+        (NbrbKind.OFFICIAL, datetime.date(2019, 5, 6), datetime.date(2019, 5, 6)),
+    ] * 2
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('if_none_match, status', (
+    ('{etag}', 304),
+    ('W/{etag}', 304),
+    ('"other", {etag}', 304),
+    ('"other",{etag} , "another"', 304),
+    ('*', 304),
+    ('"other"', 200),
+    # Not a substring match.
+    ('"x{bare}x"', 200),
+    ('{bare}', 200),
+))
+async def test_etag__if_none_match_list(client, if_none_match, status):
+    params = {'from': '2019-05-06'}
+    etag = (await client.get('/history/nbrb', params=params)).headers['ETag']
+    header = if_none_match.format(etag=etag, bare=etag.strip('"'))
+
+    response = await client.get('/history/nbrb', params=params, headers={'If-None-Match': header})
+
+    assert response.status == status
+
+
+@pytest.mark.asyncio
+async def test_etag__changes_with_version(client, db):
+    params = {'from': '2019-05-06'}
+    etag = (await client.get('/history/nbrb', params=params)).headers['ETag']
+
+    # A backfilled row.
+    NBRB_ROWS.append(dict(NBRB_ROWS[0], date=datetime.date(2019, 5, 7)))
+    try:
+        response = await client.get('/history/nbrb', params=params, headers={'If-None-Match': etag})
+    finally:
+        NBRB_ROWS.pop()
+
+    assert response.status == 200
+    assert response.headers['ETag'] != etag
+    assert len(simplejson.loads(await response.text())) == 2
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('path, params', (
+    ('/history/bcse', {}),
+    ('/history/bcse', {'from': '2019-5-6'}),
+    ('/history/bcse', {'from': '2019-05-06', 'to': '2019-05-05'}),
+    ('/history/bcse', {'from': '2018-01-01', 'to': '2019-05-06'}),
+    ('/history/bcse', {'from': '2019-05-06', 'format': 'xml'}),
+    ('/history/nbrb', {'from': '2019-05-06', 'kind': 'unknown'}),
+    ('/history/bars', {'from': '2019-05-06', 'resolution': '7'}),
+    ('/history/bars', {'from': '2019-05-06', 'resolution': 'minute'}),
+))
+async def test_bad_request(client, path, params):
+    response = await client.get(path, params=params)
+
+    assert response.status == 400
+
+
+@pytest.mark.asyncio
+async def test_db_is_not_available(client, monkeypatch):
+    async def init_pool():
+        return None
+
+    monkeypatch.setattr(history_api, 'init_pool', init_pool)
+
+    response = await client.get('/history/bcse', params={'from': '2019-05-06'})
+
+    assert response.status == 503
@@ -0,0 +1,53 @@
+import pytest
+
+from byn.realtime.live_rate_store import LiveRateWriter, get_live_rates_since, parse_live_rates
+from byn.tests.api.fakes import FakeRedis, make_tick
+
+
+@pytest.mark.asyncio
+async def test_live_rate_store():
+    redis = FakeRedis()
+    writer = LiveRateWriter(key='test')
+    await writer.start(redis)
+
+    await writer.write(redis, [make_tick('EUR', 1.12), make_tick('RUB', 64.5)])
+    await writer.write(redis, [make_tick('EUR', 1.13, timestamp_received=1557000001.5)])
+    raw = await redis.hgetall('test')
+
+    assert raw[b'EUR_timestamp'] == b'1557000001'
+    assert parse_live_rates(raw, 0) == (2, {'EUR': '1.13', 'RUB': '64.5'})
+    assert parse_live_rates(raw, 1) == (2, {'EUR': '1.13'})
+    assert parse_live_rates(raw, 2) == (2, {})
+
+
+@pytest.mark.asyncio
+async def test_live_rate_store__version_survives_restart():
+    redis = FakeRedis()
+    writer = LiveRateWriter(key='test')
+    await writer.start(redis)
+    await writer.write(redis, [make_tick('EUR', 1.12)])
+
+    writer = LiveRateWriter(key='test')
+    await writer.start(redis)
+    await writer.write(redis, [make_tick('DXY', 97.1)])
+
+    assert parse_live_rates(await redis.hgetall('test'), 1) == (2, {'DXY': '97.1'})
+
+
+@pytest.mark.asyncio
+async def test_get_live_rates_since__reads_hash_on_change_only():
+    redis = FakeRedis()
+    writer = LiveRateWriter(key='test')
+    await writer.start(redis)
+
+    assert await get_live_rates_since(redis, 0, key='test') == (0, {})
+    await writer.write(redis, [make_tick('EUR', 1.12)])
+    assert await get_live_rates_since(redis, 0, key='test') == (1, {'EUR': '1.12'})
+    assert await get_live_rates_since(redis, 1, key='test') == (1, {})
+    assert await get_live_rates_since(redis, 1, key='test') == (1, {})
+
+    assert redis.hgetall_calls == 1
+
+
+def test_parse_live_rates__empty():
+    assert parse_live_rates({}, 0) == (0, {})
@@ -0,0 +1,82 @@
+from contextlib import asynccontextmanager
+
+import pytest
+
+from byn import postgres_db
+
+
+class Condition:
+    def __init__(self, *parts):
+        self.parts = parts
+
+    def __and__(self, other):
+        return Condition(*self.parts, *other.parts)
+
+
+class Key:
+    name = 'timestamp'
+
+    def __gt__(self, value):
+        return Condition(('timestamp >', value))
+
+
+class Table:
+    """
+    Builds a query description instead of sql.
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def select(self, condition):
+        return Query(self.rows, condition)
+
+
+class Query:
+    def __init__(self, rows, condition):
+        self.rows = rows
+        self.condition = condition
+
+    def order_by(self, key):
+        return self
+
+    def limit(self, limit):
+        self.size = limit
+        return self
+
+    def execute(self):
+        start = dict(self.condition.parts).get('timestamp >', -1)
+        return [x for x in self.rows if x['timestamp'] > start][:self.size]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('rows_count, page_size, queries_count', (
+    (5, 2, 3),
+    (4, 2, 3),
+    (1, 2, 1),
+    (0, 2, 1),
+))
+async def test_iterate_pages(monkeypatch, rows_count, page_size, queries_count):
+    rows = [{'timestamp': x} for x in range(rows_count)]
+    queries = []
+
+    class Cursor:
+        async def execute(self, query):
+            queries.append(query.condition.parts)
+            for row in query.execute():
+                yield row
+
+    @asynccontextmanager
+    async def connection():
+        yield Cursor()
+
+    monkeypatch.setattr(postgres_db, 'connection', connection)
+
+    result = [x async for x in postgres_db._iterate_pages(
+        Table(rows), Condition(('currency', 'USD')), Key(), page_size
+    )]
+
+    assert result == rows
+    assert len(queries) == queries_count
+    assert queries[0] == (('currency', 'USD'), )
+    assert all(x[0] == ('currency', 'USD') for x in queries)
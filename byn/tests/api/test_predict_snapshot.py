@@ -0,0 +1,60 @@
+import datetime
+from decimal import Decimal
+
+import pytest
+import simplejson
+
+from byn.datatypes import LocalRates
+from byn.realtime.predict_snapshot import dump_snapshot, parse_snapshot, save_snapshot, load_snapshot
+from byn.tests.api.fakes import FakeRedis
+
+
+TODAY = datetime.date(2019, 5, 6)
+
+
+def _dump(date=TODAY) -> str:
+    return dump_snapshot(
+        date=date,
+        revision=3,
+        bcse_pairs=[(1557125700, '2.0950'), (1557125760, Decimal('2.0955'))],
+        fake_rates={1557125700: 2.0951},
+        resolved={
+            1557125700: LocalRates(eur=1.12, rub=64.5, uah=26.4, dxy=97.1),
+            1557125760: LocalRates(eur=1.13, rub=64.6, uah=26.5, dxy=None),
+        },
+        epoch='abc',
+        sequence=7,
+    )
+
+
+def test_snapshot():
+    snapshot = parse_snapshot(_dump().encode(), TODAY)
+
+    assert snapshot['revision'] == 3
+    assert snapshot['bcse'] == [[1557125700, '2.0950'], [1557125760, '2.0955']]
+    assert snapshot['fake_rates'] == {1557125700: 2.0951}
+    assert snapshot['resolved'] == {
+        1557125700: LocalRates(eur=1.12, rub=64.5, uah=26.4, dxy=97.1),
+        1557125760: LocalRates(eur=1.13, rub=64.6, uah=26.5, dxy=None),
+    }
+    assert (snapshot['epoch'], snapshot['sequence']) == ('abc', 7)
+
+
+def test_snapshot__another_day():
+    assert parse_snapshot(_dump(TODAY - datetime.timedelta(days=1)).encode(), TODAY) is None
+
+
+def test_snapshot__another_version():
+    raw = simplejson.loads(_dump())
+    raw['version'] = 0
+
+    assert parse_snapshot(simplejson.dumps(raw).encode(), TODAY) is None
+
+
+@pytest.mark.asyncio
+async def test_save_and_load():
+    redis = FakeRedis()
+    assert await load_snapshot(redis, TODAY, key='test') is None
+
+    await save_snapshot(redis, _dump(), key='test')
+    assert (await load_snapshot(redis, TODAY, key='test'))['revision'] == 3
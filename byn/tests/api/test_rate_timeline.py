@@ -0,0 +1,77 @@
+import numpy as np
+
+from byn.realtime.detailed_rates import OneRateDetailedExtractor
+from byn.realtime.rate_timeline import CurrencyTimeline, RateTimeline, get_tick_timestamp
+
+
+def test_currency_timeline__grows():
+    timeline = CurrencyTimeline(capacity=2)
+
+    for i in range(100):
+        timeline.append(i, i / 10)
+
+    assert len(timeline) == 100
+    np.testing.assert_array_equal(timeline.get_pairs_since(97.5), [[97, 9.7], [98, 9.8], [99, 9.9]])
+
+
+def test_currency_timeline__late_tick():
+    timeline = CurrencyTimeline()
+    timeline.append(10, 1.)
+    timeline.append(9, 2.)
+
+    np.testing.assert_array_equal(timeline.get_pairs_since(0), [[10, 1.], [10, 2.]])
+
+
+def test_currency_timeline__seed_before_live():
+    timeline = CurrencyTimeline()
+    timeline.append(100, 3.)
+
+    timeline.seed(np.array([[50, 1.], [90, 2.], [100, 2.5], [110, 2.6]], dtype=object))
+
+    np.testing.assert_array_equal(timeline.get_pairs_since(0), [[50, 1.], [90, 2.], [100, 3.]])
+
+
+def test_currency_timeline__drop_before():
+    timeline = CurrencyTimeline()
+    for i in range(10):
+        timeline.append(i * 10, i)
+
+    pairs = timeline.get_pairs_since(0)
+    timeline.drop_before(55)
+
+    np.testing.assert_array_equal(timeline.get_pairs_since(0), [[50, 5], [60, 6], [70, 7], [80, 8], [90, 9]])
+    assert len(pairs) == 10
+
+
+def test_rate_timeline__covers():
+    timeline = RateTimeline()
+    timeline.append('EUR', 100, 1.1)
+
+    assert timeline.covers(['EUR'], 100)
+    assert not timeline.covers(['EUR'], 99)
+    assert not timeline.covers(['EUR', 'RUB'], 100)
+
+
+def test_currency_timeline__ticks_as_db_cold_start():
+    # (timestamp_open, timestamp_received, rate) ordered by timestamp_open.
+    ticks = [(100, 100, 1.), (105, 112, 2.), (110, 111, 3.), (120, 119, 4.), (121, 130, 5.)]
+    timeline = CurrencyTimeline()
+    shared = []
+
+    for timestamp_open, timestamp_received, rate in ticks:
+        timeline.append_tick(timestamp_open, timestamp_received, rate)
+        shared.append(timeline.get_pairs_since(0))
+
+    # The same as postgres_db.get_external_rate_live does.
+    from_db = [
+        (get_tick_timestamp(ts_open, ts_received, next_tick[0] if next_tick else None), rate)
+        for (ts_open, ts_received, rate), next_tick in zip(ticks, ticks[1:] + [None])
+    ]
+
+    np.testing.assert_array_equal(timeline.get_pairs_since(0), from_db)
+    np.testing.assert_array_equal(
+        OneRateDetailedExtractor(timeline.get_pairs_since(0)).get_by_timestamps(range(100, 135)),
+        OneRateDetailedExtractor(np.array(from_db)).get_by_timestamps(range(100, 135)),
+    )
+    # Rows returned before are not clamped in place.
+    np.testing.assert_array_equal(shared[1], [[100, 1.], [112, 2.]])
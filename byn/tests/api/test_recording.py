@@ -0,0 +1,111 @@
+import asyncio
+import datetime
+import os
+import time
+
+import pytest
+from aiohttp import ClientSession
+from aiohttp.test_utils import TestServer
+
+import byn.constants as const
+from byn.commands.replay_server import Replay, create_app
+from byn.realtime import clock
+from byn.realtime.clock import AcceleratedClock
+from byn.realtime.recording import get_recorder, read_records, FOREXPF
+
+
+def test_recorder(tmp_path, monkeypatch):
+    monkeypatch.setattr(const, 'RECORD_DIR', str(tmp_path))
+
+    recorder = get_recorder(FOREXPF)
+    recorder.write(b'data: 1;42;1\n\n', 1557000000.5)
+    recorder.write(b'', 1557000001)
+    recorder.close()
+
+    # Appended on restart.
+    recorder = get_recorder(FOREXPF)
+    recorder.write(b'x' * 100000, 1557000002)
+    recorder.close()
+
+    assert list(read_records(recorder.path)) == [
+        (1557000000.5, b'data: 1;42;1\n\n'),
+        (1557000001, b''),
+        (1557000002, b'x' * 100000),
+    ]
+
+
+def test_recorder__midnight(tmp_path, monkeypatch):
+    monkeypatch.setattr(const, 'RECORD_DIR', str(tmp_path))
+    # A virtual minute is 0.1 real second.
+    previous = clock.use(AcceleratedClock(start=datetime.datetime(2019, 5, 6, 23, 59, 30), speed=600))
+
+    try:
+        recorder = get_recorder(FOREXPF)
+        recorder.write(b'before')
+        time.sleep(0.1)
+        recorder.write(b'after')
+        recorder.close()
+    finally:
+        clock.use(previous)
+
+    assert [payload for _, payload in read_records(os.path.join(tmp_path, 'forexpf-2019-05-06.rec'))] == [b'before']
+    assert [payload for _, payload in read_records(os.path.join(tmp_path, 'forexpf-2019-05-07.rec'))] == [b'after']
+
+
+def test_recorder__fixed_date(tmp_path, monkeypatch):
+    monkeypatch.setattr(const, 'RECORD_DIR', str(tmp_path))
+
+    recorder = get_recorder(FOREXPF, datetime.date(2019, 5, 6))
+    recorder.write(b'x')
+    recorder.close()
+
+    assert recorder.path == os.path.join(tmp_path, 'forexpf-2019-05-06.rec')
+    assert [payload for _, payload in read_records(recorder.path)] == [b'x']
+
+
+def test_recorder__off(monkeypatch):
+    monkeypatch.setattr(const, 'RECORD_DIR', None)
+
+    assert get_recorder(FOREXPF) is None
+
+
+def test_replay__speed():
+    with pytest.raises(ValueError):
+        Replay([(1, b'')], {}, speed=1001)
+
+
+@pytest.mark.asyncio
+async def test_replay_server():
+    forexpf = [(1557000002 + i, f'data: {i}\n\n'.encode()) for i in range(10)]
+    bcse = {'USD': [(1557000000, b'[1]'), (1557000005, b'[2]')], 'EUR': [(1557000001, b'[3]')]}
+
+    # 12 recorded seconds take 0.6 seconds.
+    server = TestServer(create_app(Replay(forexpf, bcse, speed=20)))
+    await server.start_server()
+
+    try:
+        async with ClientSession() as client:
+            bcse_response = await client.get(server.make_url('/exchange/last/USD/2019-05-04'))
+            assert await bcse_response.read() == b'[1]'
+
+            bcse_response = await client.get(server.make_url('/exchange/last/EUR/2019-05-04'))
+            assert await bcse_response.read() == b'[3]'
+
+            bcse_response = await client.get(server.make_url('/exchange/last/RUB/2019-05-04'))
+            assert bcse_response.status == 404
+
+            sse_response = await client.get(server.make_url('/html/tw/sse'))
+            start = time.monotonic()
+            received = b''
+
+            while received.count(b'\n\n') < 11:
+                received += await asyncio.wait_for(sse_response.content.readany(), 1)
+
+            assert received == b'data: 1;replay\n\n' + b''.join(x[1] for x in forexpf)
+            assert 0.3 < time.monotonic() - start < 1
+
+            bcse_response = await client.get(server.make_url('/exchange/last/USD/2019-05-04'))
+            assert await bcse_response.read() == b'[2]'
+            sse_response.close()
+    finally:
+        await server.close()
@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+from byn.realtime.broadcast import Broadcaster
+from byn.realtime.sse import EventStream, ReplayRing, format_event
+
+
+class FakeResponse:
+    def __init__(self):
+        self.written = []
+
+    async def write(self, data: bytes):
+        self.written.append(data)
+
+
+def test_format_event():
+    assert format_event('1-1', 'prediction', '{"a": 1}') == b'id: 1-1\nevent: prediction\ndata: {"a": 1}\n\n'
+    assert format_event('1-2', 'model', '1\n2') == b'id: 1-2\nevent: model\ndata: 1\ndata: 2\n\n'
+    assert format_event(None, 'bcse', '1') == b'event: bcse\ndata: 1\n\n'
+
+
+def test_replay_ring__get_since():
+    ring = ReplayRing(size=4)
+    frames = [
+        ring.append('prediction', '0', seq=7),
+        ring.append('bcse', '1'),
+        ring.append('prediction', '2', seq=8),
+        ring.append('prediction', '3', seq=9),
+        ring.append('bcse', '4'),
+    ]
+
+    assert ring.get_since((8, 0), ('prediction', )) == [((9, 0), frames[3])]
+    assert ring.get_since((7, 1), ('prediction', 'bcse')) == [
+        ((8, 0), frames[2]), ((9, 0), frames[3]), ((9, 1), frames[4]),
+    ]
+    assert ring.get_since((9, 1), ('prediction', )) == []
+
+    # The event is already dropped.
+    assert ring.get_since((7, 0), ('prediction', )) is None
+    # Unknown id.
+    assert ring.get_since((9, 2), ('prediction', )) is None
+
+
+def test_replay_ring__no_ids_before_prediction():
+    ring = ReplayRing()
+
+    assert ring.append('bcse', '1') == format_event(None, 'bcse', '1')
+    ring.skip('external')
+    assert ring.append('prediction', '2', seq=5) == format_event('5-0', 'prediction', '2')
+
+
+def test_replay_ring__same_ids_in_workers():
+    """
+    Workers which send different topics to their clients number messages in the same way,
+    so a client resumes from another worker.
+    """
+    first = ReplayRing()
+    second = ReplayRing()
+    second.append('bcse', '0')
+
+    for ring in first, second:
+        ring.append('prediction', '1', seq=5)
+
+    first.append('bcse', '2')
+    second.skip('bcse')
+    last_frame = first.append('external', '3')
+    second.append('external', '3')
+    second.append('prediction', '4', seq=6)
+
+    assert last_frame == format_event('5-2', 'external', '3')
+    assert second.get_since(first.parse_event_id('5-2'), ('prediction', 'external')) == [
+        ((6, 0), format_event('6-0', 'prediction', '4')),
+    ]
+    # A missed bcse event is not kept in the second worker.
+    assert second.get_since((5, 0), ('prediction', 'bcse')) is None
+
+
+def test_replay_ring__parse_event_id():
+    assert ReplayRing.parse_event_id(None) is None
+    assert ReplayRing.parse_event_id('') is None
+    assert ReplayRing.parse_event_id('abc-1') is None
+    assert ReplayRing.parse_event_id('1-x') is None
+    assert ReplayRing.parse_event_id('12-0') == (12, 0)
+
+
+@pytest.mark.asyncio
+async def test_event_stream__fan_out():
+    broadcaster = Broadcaster()
+    ring = ReplayRing()
+    response = FakeResponse()
+    stream = EventStream(response)
+    broadcaster.add(stream, topics=('prediction', 'bcse'))
+
+    broadcaster.publish(ring.append('prediction', '1', seq=3), topic='prediction')
+    broadcaster.publish(ring.append('external', '2'), topic='external')
+    await asyncio.sleep(0.01)
+
+    assert response.written == [format_event('3-0', 'prediction', '1')]
+
+    await stream.close()
+    assert stream.closed.is_set()
@@ -0,0 +1,84 @@
+import asyncio
+import datetime
+import time
+
+import pytest
+import simplejson
+
+from byn.datatypes import LocalRates, PredictCommand
+from byn.realtime import clock, synchronization
+from byn.realtime.clock import AcceleratedClock
+from byn.realtime.synchronization import (
+    PREDICTION_READY_QUEUE,
+    predict_with_timeout,
+    receive_predictor_command,
+    send_predictor_command,
+)
+from byn.tests.api.fakes import FakeRedis
+
+
+@pytest.fixture
+def fast_clock():
+    previous = clock.use(AcceleratedClock(start=datetime.datetime(2019, 5, 6, 12), speed=1000))
+    yield
+    clock.use(previous)
+
+
+async def _predictor(redis, delay: float):
+    """
+    Takes one command in *delay* real seconds and replies to it.
+    """
+    await asyncio.sleep(delay)
+    message = await receive_predictor_command(redis)
+    await redis.rpush(PREDICTION_READY_QUEUE, simplejson.dumps({
+        'message_guid': message['data']['message_guid'],
+        'ridge_info': {},
+    }))
+    return message
+
+
+@pytest.mark.asyncio
+async def test_predict_with_timeout__accelerated_clock(fast_clock, monkeypatch):
+    """
+    The budget is in real seconds: 50 virtual seconds pass till the predictor takes the command.
+    """
+    monkeypatch.setattr(synchronization, 'PredictionRecord', lambda **kwargs: kwargs)
+    monkeypatch.setattr(synchronization, 'RidgePredictionRecord', lambda **kwargs: kwargs)
+    redis = FakeRedis()
+    predictor = asyncio.ensure_future(_predictor(redis, delay=0.05))
+
+    prediction = await predict_with_timeout(redis, LocalRates(eur=1.12, rub=64.5, uah=26.4, dxy=97.1), timeout=0.5)
+    message = await asyncio.wait_for(predictor, 1)
+
+    assert prediction == {'ridge_info': {}}
+    assert message['data']['message_guid'] == pytest.approx(
+        datetime.datetime(2019, 5, 6, 12).timestamp() * 1000, abs=100000
+    )
+
+
+@pytest.mark.asyncio
+async def test_predict_with_timeout__no_prediction(fast_clock):
+    redis = FakeRedis()
+
+    start = time.monotonic()
+    assert await predict_with_timeout(redis, LocalRates(eur=1.12, rub=64.5, uah=26.4, dxy=97.1), timeout=0.1) is None
+    assert time.monotonic() - start >= 0.1
+
+
+@pytest.mark.asyncio
+async def test_receive_predictor_command__expired(fast_clock):
+    redis = FakeRedis()
+    await send_predictor_command(redis, PredictCommand.PREDICT, {
+        'message_guid': 1,
+        'expires': int((time.time() - 1) * 1000),
+        'eur': 1.12, 'rub': 64.5, 'uah': 26.4, 'dxy': 97.1,
+    })
+    await send_predictor_command(redis, PredictCommand.PREDICT, {
+        'message_guid': 2,
+        'expires': int((time.time() + 1) * 1000),
+        'eur': 1.12, 'rub': 64.5, 'uah': 26.4, 'dxy': 97.1,
+    })
+
+    message = await receive_predictor_command(redis)
+
+    assert message['data']['message_guid'] == 2
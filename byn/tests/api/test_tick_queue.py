@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+from byn.realtime.tick_queue import TickQueue
+from byn.tests.api.fakes import make_tick
+
+
+@pytest.mark.asyncio
+async def test_tick_queue__coalesces_latest():
+    queue = TickQueue()
+    queue.put([make_tick('EUR', 1.1), make_tick('RUB', 64.5), make_tick('EUR', 1.2)])
+    queue.put([make_tick('EUR', 1.3)])
+
+    assert [(x.currency, x.close) for x in await queue.get_latest()] == [('EUR', 1.3), ('RUB', 64.5)]
+    assert queue.coalesced == 2
+
+    # Every tick is still there for persistence.
+    assert [x.close for x in await queue.get_ticks()] == [1.1, 64.5, 1.2, 1.3]
+    assert queue.get_metrics()['latency']['cache_queue']['count'] == 2
+    assert queue.get_metrics()['latency']['persist_queue']['count'] == 4
+
+
+@pytest.mark.asyncio
+async def test_tick_queue__overflow():
+    queue = TickQueue(max_ticks=3)
+    queue.put([make_tick('EUR', float(x), volume=x) for x in range(5)])
+
+    assert queue.overflow == 2
+    assert [x.volume for x in await queue.get_ticks(limit=2)] == [2, 3]
+    assert [x.volume for x in await queue.get_ticks(limit=2)] == [4]
+    assert queue.get_metrics()['pending'] == 0
+
+
+@pytest.mark.asyncio
+async def test_tick_queue__waits_for_ticks():
+    queue = TickQueue()
+    getter = asyncio.create_task(queue.get_latest())
+    await asyncio.sleep(0.01)
+    assert not getter.done()
+
+    queue.put([make_tick('DXY', 97.1)])
+    assert [x.close for x in await asyncio.wait_for(getter, 1)] == [97.1]
+
+    getter = asyncio.create_task(queue.get_latest())
+    await asyncio.sleep(0.01)
+    assert not getter.done()
+    getter.cancel()
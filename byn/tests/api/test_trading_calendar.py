@@ -0,0 +1,67 @@
+import datetime
+
+import pytest
+
+from byn.trading_calendar import TradingCalendar, bcse_calendar, forexpf_calendar
+
+
+@pytest.mark.parametrize('date,expected', [
+    (datetime.date(2019, 5, 3), True),
+    (datetime.date(2019, 5, 4), True),
+    (datetime.date(2019, 5, 5), False),
+    (datetime.date(2019, 5, 6), False),
+    (datetime.date(2019, 5, 9), False),
+    (datetime.date(2019, 5, 10), True),
+    (datetime.date(2019, 5, 11), True),
+    (datetime.date(2019, 11, 8), False),
+    (datetime.date(2019, 11, 16), True),
+    (datetime.date(2021, 1, 7), False),
+    (datetime.date(2021, 1, 8), True),
+])
+def test_bcse_trading_day(date, expected):
+    assert bcse_calendar.is_trading_day(date) is expected
+
+
+@pytest.mark.parametrize('current_dt,expected', [
+    (datetime.datetime(2019, 5, 3, 9, 54), False),
+    (datetime.datetime(2019, 5, 3, 9, 55), True),
+    (datetime.datetime(2019, 5, 3, 13, 14), True),
+    (datetime.datetime(2019, 5, 3, 13, 15), False),
+    (datetime.datetime(2019, 5, 6, 10), False),
+])
+def test_bcse_is_open(current_dt, expected):
+    assert bcse_calendar.is_open(current_dt) is expected
+
+
+@pytest.mark.parametrize('current_dt,expected', [
+    (datetime.datetime(2019, 5, 3, 8), datetime.datetime(2019, 5, 3, 9, 55)),
+    (datetime.datetime(2019, 5, 3, 10), datetime.datetime(2019, 5, 4, 9, 55)),
+    (datetime.datetime(2019, 5, 4, 14), datetime.datetime(2019, 5, 10, 9, 55)),
+    (datetime.datetime(2019, 12, 31, 14), datetime.datetime(2020, 1, 2, 9, 55)),
+])
+def test_bcse_next_open(current_dt, expected):
+    assert bcse_calendar.get_next_open(current_dt) == expected
+
+
+@pytest.mark.parametrize('date,number,expected', [
+    (datetime.date(2019, 5, 13), 1, datetime.date(2019, 5, 11)),
+    (datetime.date(2019, 5, 13), 3, datetime.date(2019, 5, 4)),
+    (datetime.date(2019, 1, 2), 1, datetime.date(2018, 12, 31)),
+])
+def test_bcse_trading_days_back(date, number, expected):
+    assert bcse_calendar.get_trading_days_back(date, number) == expected
+
+
+def test_forexpf():
+    assert forexpf_calendar.is_open(datetime.datetime(2019, 5, 6, 23, 59))
+    assert not forexpf_calendar.is_open(datetime.datetime(2019, 5, 4, 12))
+    assert forexpf_calendar.get_next_open(datetime.datetime(2019, 5, 4, 12)) == datetime.datetime(2019, 5, 6)
+
+
+def test_years_are_computed_on_demand():
+    calendar = TradingCalendar(open_time='10:00', close_time='15:00', holidays=['2031-01-01'])
+
+    assert calendar.is_trading_day(datetime.date(2030, 12, 31))
+    assert calendar.get_next_trading_day(datetime.date(2030, 12, 31)) == datetime.date(2031, 1, 2)
+    assert calendar.get_trading_days_back(datetime.date(2031, 1, 2), 261) == datetime.date(2030, 1, 1)
+    assert calendar.get_trading_days_back(datetime.date(2031, 1, 2), 262) == datetime.date(2029, 12, 31)
@@ -0,0 +1,49 @@
+import pytest
+import simplejson
+
+from byn.realtime import wire
+from byn.utils import EnumAwareEncoder
+
+
+COMMAND = {
+    'eur': 1.1234,
+    'rub': 64.5,
+    'uah': 25.1,
+    'dxy': 97.05,
+    'message_guid': 1557000000123,
+    'expires': 1557000000623,
+}
+
+
+def test_predict_command__round_trip():
+    raw = wire.encode_predict_command(dict(COMMAND, eur='1.1234', dxy='97.05'))
+
+    assert wire.is_binary(raw)
+    assert wire.decode_predict_command(raw) == {
+        'command': 'PREDICT',
+        'data': COMMAND,
+    }
+
+
+def test_predict_command__same_as_json():
+    from_json = simplejson.loads(
+        simplejson.dumps({'command': 'PREDICT', 'data': COMMAND}, cls=EnumAwareEncoder),
+        use_decimal=True
+    )
+    from_binary = wire.decode_predict_command(wire.encode_predict_command(COMMAND))
+
+    # The predict server converts rates to floats: both formats give the same local rates.
+    assert {x: float(y) for x, y in from_json['data'].items()} == from_binary['data']
+    assert all(type(from_binary['data'][x]) is float for x in wire.RATE_NAMES)
+
+
+def test_is_binary__json():
+    assert not wire.is_binary(b'{"command": "REBUILD", "data": null}')
+
+
+def test_decode__wrong_version():
+    raw = bytearray(wire.encode_predict_command(COMMAND))
+    raw[1] = wire.WIRE_VERSION + 1
+
+    with pytest.raises(wire.WireFormatError):
+        wire.decode_predict_command(bytes(raw))
@@ -0,0 +1,65 @@
+from byn.datatypes import ExternalRateData
+from byn.forexpf import SseTickParser, sse_to_tuple
+
+
+STREAM = (
+    b'data: 0\n\n'
+    b'data: 1;42;1;1557000000;1.1201;1.1203;1.1199;1.1202;7\n\n'
+    b'data: 1;29;1;1557000000;64.51;64.53;64.5;64.52;3\r\n\r\n'
+    b'data: 1;11;1;1557000060;97.1;97.1;97.1;97.1;1\n\n'
+)
+
+
+def _parse_with_sse_to_tuple(stream: bytes):
+    for line in stream.splitlines(keepends=True):
+        data = sse_to_tuple(line)
+        if data is not None:
+            yield data
+
+
+def test_sse_tick_parser():
+    ticks = SseTickParser().feed(STREAM, 1557000001.5)
+
+    assert ticks[0] == ExternalRateData(
+        currency='EUR',
+        timestamp_open=1557000000,
+        rate_open=1.1201,
+        high=1.1203,
+        low=1.1199,
+        close=1.1202,
+        volume=7,
+        timestamp_received=1557000001.5,
+    )
+    assert [(x.currency, x.close) for x in ticks] == [('EUR', 1.1202), ('RUB', 64.52), ('DXY', 97.1)]
+
+
+def test_sse_tick_parser__split_chunks():
+    expected = SseTickParser().feed(STREAM, 0)
+
+    for chunk_size in (1, 2, 7, 50):
+        parser = SseTickParser()
+        ticks = []
+
+        for i in range(0, len(STREAM), chunk_size):
+            ticks.extend(parser.feed(memoryview(STREAM)[i:i + chunk_size], 0))
+
+        assert ticks == expected
+
+
+def test_sse_tick_parser__same_as_sse_to_tuple():
+    ticks = SseTickParser().feed(STREAM, 0)
+    tuples = list(_parse_with_sse_to_tuple(STREAM))
+
+    assert [
+        (x.timestamp_open, x.rate_open, x.high, x.low, x.close, x.volume) for x in ticks
+    ] == [
+        (int(x[3]), float(x[4]), float(x[5]), float(x[6]), float(x[7]), int(x[8])) for x in tuples
+    ]
+
+
+def test_sse_tick_parser__skips_broken_lines():
+    parser = SseTickParser()
+
+    assert parser.feed(b'data: 1;999;1;1557000000;1;1;1;1;1\nevent: x\ndata: 1;42;1;x;1;1;1;1;1\n', 0) == []
+    assert len(parser.feed(b'data: 1;42;1;1557000000;1;1;1;1;1', 0)) == 0
+    assert len(parser.feed(b'\n', 0)) == 1
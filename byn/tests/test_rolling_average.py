@@ -0,0 +1,97 @@
+import random
+from decimal import Decimal
+from fractions import Fraction
+
+import numpy as np
+import pytest
+
+import byn.constants as const
+from byn.rolling_average import compute_rolling_averages
+
+
+def _build_rates(days: int) -> np.ndarray:
+    """
+    Rates as nbrb GLOBAL ones are: DECIMAL(31, 26).
+    """
+    random.seed(days)
+    return np.array([
+        [Decimal(random.uniform(0.5, 40)).quantize(Decimal('1e-26')) for _ in range(4)]
+        for _ in range(days)
+    ])
+
+
+def _np_mean_rolling_averages(rates: np.ndarray, durations, start_index: int=0) -> dict:
+    """
+    load_rolling_average before it was vectorized.
+    """
+    rolling_averages = {}
+
+    for i in range(start_index, len(rates) + 1):
+        per_duration = {x: [] for x in durations}
+        rolling_averages[i] = per_duration
+        for duration in durations:
+            if i < duration:
+                continue
+
+            for data_column in range(4):
+                per_duration[duration].append(
+                    Decimal(np.mean(rates[i - duration:i, data_column]))
+                )
+
+    return rolling_averages
+
+
+def _to_per_day(rolling_averages: dict, days: int, start_index: int=0) -> dict:
+    per_day = {i: {duration: [] for duration in rolling_averages} for i in range(start_index, days + 1)}
+
+    for duration, (first_index, averages) in rolling_averages.items():
+        for i, data in enumerate(averages.tolist(), start=first_index):
+            per_day[i][duration] = data
+
+    return per_day
+
+
+@pytest.mark.parametrize('days,start_index', (
+    (0, 0),
+    (3, 0),
+    (300, 0),
+    (300, 250),
+    (300, 301),
+))
+def test_same_as_np_mean(days, start_index):
+    rates = _build_rates(days).reshape(-1, 4)
+
+    expected = _np_mean_rolling_averages(rates, const.ROLLING_AVERAGE_DURATIONS, start_index)
+    actual = _to_per_day(
+        compute_rolling_averages(rates, const.ROLLING_AVERAGE_DURATIONS, start_index=start_index),
+        days,
+        start_index
+    )
+
+    assert actual.keys() == expected.keys()
+
+    for i in expected:
+        for duration in const.ROLLING_AVERAGE_DURATIONS:
+            assert len(actual[i][duration]) == len(expected[i][duration])
+
+            for x, y in zip(actual[i][duration], expected[i][duration]):
+                # np.mean rounds every partial sum, so they may differ beyond DECIMAL(31, 26) precision.
+                assert abs(x - y) < Decimal('1e-25')
+
+
+def test_exact():
+    rates = _build_rates(300)
+    first_index, averages = compute_rolling_averages(rates, (240, ))[240]
+
+    for i, data in enumerate(averages.tolist(), start=first_index):
+        for column, value in enumerate(data):
+            exact = sum(Fraction(x) for x in rates[i - 240:i, column]) / 240
+            assert value == Decimal(exact.numerator) / Decimal(exact.denominator)
+
+
+def test_float():
+    rates = np.random.RandomState(0).uniform(0.5, 40, (100, 4))
+    first_index, averages = compute_rolling_averages(rates, (10, ))[10]
+
+    assert first_index == 10
+    np.testing.assert_allclose(averages, [rates[i - 10:i].mean(axis=0) for i in range(10, 101)])
@@ -0,0 +1,177 @@
+"""
+Trading days and sessions of bcse and forexpf.
+
+Holidays and moved workdays are in byn/data/trading-calendar.json.
+Every year is precomputed once it's needed: a trading day bitmap
+and ranks of days among trading days, so lookups don't walk day by day.
+Datetimes are naive local ones, as everywhere in byn.realtime.
+"""
+import datetime
+import json
+from array import array
+from typing import Iterable, Tuple
+
+import byn.constants as const
+
+
+class TradingCalendar:
+    def __init__(
+            self,
+            *,
+            open_time: str,
+            close_time: str,
+            weekend: Iterable[int]=(6, 7),
+            annual_holidays: Iterable[str]=(),
+            holidays: Iterable[str]=(),
+            workdays: Iterable[str]=(),
+    ):
+        """
+        :param open_time: HH:MM.
+        :param close_time: HH:MM, 24:00 is the end of the day.
+        :param weekend: isoweekdays without trading.
+        :param annual_holidays: MM-DD of every year.
+        :param holidays: YYYY-MM-DD.
+        :param workdays: YYYY-MM-DD of trading weekends and annual holidays.
+        """
+        self.open_offset = _parse_offset(open_time)
+        self.close_offset = _parse_offset(close_time)
+        self.weekend = frozenset(weekend)
+        self.annual_holidays = frozenset(tuple(int(x) for x in day.split('-')) for day in annual_holidays)
+        self.holidays = frozenset(datetime.date.fromisoformat(x) for x in holidays)
+        self.workdays = frozenset(datetime.date.fromisoformat(x) for x in workdays)
+
+        self._first_year = None
+        self._last_year = None
+        # Indexed by ordinal - self._first_ordinal.
+        self._first_ordinal = None
+        self._bitmap = bytearray()
+        # Number of trading days before the day.
+        self._ranks = array('l')
+        # Ordinals of trading days.
+        self._trading_ordinals = array('l')
+
+    def _compute_is_trading_day(self, date: datetime.date) -> bool:
+        if date in self.workdays:
+            return True
+
+        if date in self.holidays:
+            return False
+
+        if (date.month, date.day) in self.annual_holidays:
+            return False
+
+        return date.isoweekday() not in self.weekend
+
+    def _ensure_years(self, first_year: int, last_year: int):
+        if self._first_year is not None:
+            if self._first_year <= first_year and last_year <= self._last_year:
+                return
+
+            first_year = min(first_year, self._first_year)
+            last_year = max(last_year, self._last_year)
+
+        first_ordinal = datetime.date(first_year, 1, 1).toordinal()
+        last_ordinal = datetime.date(last_year, 12, 31).toordinal()
+
+        bitmap = bytearray(last_ordinal - first_ordinal + 1)
+        ranks = array('l', [0]) * len(bitmap)
+        trading_ordinals = array('l')
+
+        for i, ordinal in enumerate(range(first_ordinal, last_ordinal + 1)):
+            ranks[i] = len(trading_ordinals)
+
+            if self._compute_is_trading_day(datetime.date.fromordinal(ordinal)):
+                bitmap[i] = 1
+                trading_ordinals.append(ordinal)
+
+        self._first_year, self._last_year = first_year, last_year
+        self._first_ordinal = first_ordinal
+        self._bitmap, self._ranks, self._trading_ordinals = bitmap, ranks, trading_ordinals
+
+    def _get_index(self, date: datetime.date) -> int:
+        self._ensure_years(date.year, date.year)
+        return date.toordinal() - self._first_ordinal
+
+    def is_trading_day(self, date: datetime.date) -> bool:
+        index = self._get_index(date)
+        return self._bitmap[index] == 1
+
+    def get_open(self, date: datetime.date) -> datetime.datetime:
+        """
+        :return: session open of *date* (even if it's not a trading day).
+        """
+        return datetime.datetime.fromordinal(date.toordinal()) + self.open_offset
+
+    def get_close(self, date: datetime.date) -> datetime.datetime:
+        return datetime.datetime.fromordinal(date.toordinal()) + self.close_offset
+
+    def is_open(self, current_dt: datetime.datetime) -> bool:
+        date = current_dt.date()
+        return self.is_trading_day(date) and self.get_open(date) <= current_dt < self.get_close(date)
+
+    def get_next_trading_day(self, date: datetime.date) -> datetime.date:
+        """
+        :return: the first trading day after *date*.
+        """
+        index = self._get_index(date)
+        rank = self._ranks[index] + self._bitmap[index]
+
+        # Trading days of the next year may be not computed yet.
+        while rank >= len(self._trading_ordinals):
+            self._ensure_years(self._first_year, self._last_year + 1)
+
+        return datetime.date.fromordinal(self._trading_ordinals[rank])
+
+    def get_next_open(self, current_dt: datetime.datetime) -> datetime.datetime:
+        """
+        :return: the closest session open after *current_dt*.
+        """
+        date = current_dt.date()
+
+        if self.is_trading_day(date) and current_dt < self.get_open(date):
+            return self.get_open(date)
+
+        return self.get_open(self.get_next_trading_day(date))
+
+    def get_trading_days_back(self, date: datetime.date, number: int) -> datetime.date:
+        """
+        :param number: 1 means the last trading day before *date*.
+        :return: trading day which is *number* trading days before *date*.
+        """
+        index = self._get_index(date)
+        rank = self._ranks[index] - number
+
+        while rank < 0:
+            self._ensure_years(self._first_year - 1, self._last_year)
+            index = self._get_index(date)
+            rank = self._ranks[index] - number
+
+        return datetime.date.fromordinal(self._trading_ordinals[rank])
+
+
+def _parse_offset(value: str) -> datetime.timedelta:
+    hours, minutes = value.split(':')
+    return datetime.timedelta(hours=int(hours), minutes=int(minutes))
+
+
+def load_calendars(path: str=const.TRADING_CALENDAR_DATA) -> Tuple[TradingCalendar, TradingCalendar]:
+    """
+    :return: bcse and forexpf calendars.
+    """
+    with open(path) as f:
+        data = json.load(f)
+
+    return tuple(
+        TradingCalendar(
+            open_time=data[name]['open'],
+            close_time=data[name]['close'],
+            weekend=data[name]['weekend'],
+            annual_holidays=data[name]['annual_holidays'],
+            holidays=data[name]['holidays'],
+            workdays=data[name]['workdays'],
+        )
+        for name in ('bcse', 'forexpf')
+    )
+
+
+bcse_calendar, forexpf_calendar = load_calendars()
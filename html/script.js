@@ -7,6 +7,9 @@ var model_predicted_eur = document.getElementsByClassName("js-index-predict--usd
 var model_predicted_rub = document.getElementsByClassName("js-index-predict--usd-rub")[0];
 var model_last_update = document.getElementsByClassName("js-index-updated--ago")[0];
 var model_last_update_time = undefined;
+var last_seq = undefined;
+var last_prediction = undefined;
+const DELTA_PROTOCOL = "byn.delta.v1";
 
 
 function index(){
@@ -21,7 +24,8 @@ function index(){
 
 
 function _runWebsocket({url}){
-    const socket = new WebSocket(url);
+    const socket = new WebSocket(url, [DELTA_PROTOCOL]);
+    last_prediction = undefined;
 
     socket.addEventListener('open', function (event) {
         console.log("Connected to ws.");
@@ -36,6 +40,18 @@ function _runWebsocket({url}){
         let data = JSON.parse(event.data);
 
         if (data["type"] == "prediction"){
+            if (data["delta"] !== undefined){
+                if (last_prediction === undefined || data["base"] !== last_seq){
+                    console.log("Unexpected delta frame. Waiting for a keyframe.");
+                    return;
+                }
+                data = Object.assign(_applyDelta(last_prediction, data["delta"]), {seq: data["seq"]});
+            }
+            if (last_seq !== undefined && data["seq"] > last_seq + 1){
+                console.log("Skipped messages: ", data["seq"] - last_seq - 1);
+            }
+            last_seq = data["seq"];
+            last_prediction = data;
             _processTotalPrediction(data);
             model_last_update_time = new Date();
         } else {
@@ -46,6 +62,24 @@ function _runWebsocket({url}){
 };
 
 
+function _applyDelta(old, delta){
+    let result = Object.assign({}, old);
+
+    for (let key in delta){
+        let value = delta[key];
+        if (value !== null && typeof value === "object" && typeof result[key] === "object"){
+            result[key] = _applyDelta(result[key], value);
+        } else if (value === null) {
+            delete result[key];
+        } else {
+            result[key] = value;
+        }
+    }
+
+    return result;
+}
+
+
 function _processTotalPrediction({external, predicted}){
     _processExternalData(external);
     _processPredictedData(predicted);